@@ -16,37 +16,31 @@ from botocore.exceptions import (
 from opentelemetry.sdk.trace import ReadableSpan
 from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
 from monocle_apptrace.exporters.base_exporter import SpanExporterBase
+from monocle_apptrace.exporters.batch_span_processor import flush_exporter
 from monocle_apptrace.exporters.exporter_processor import ExportTaskProcessor
 from typing import Sequence, Optional
 import json
+from functools import partial
+from monocle_apptrace.exporters.object_key import ObjectKeyBuilder
 logger = logging.getLogger(__name__)
 
 class S3SpanExporter(SpanExporterBase):
-    def __init__(self, bucket_name=None, region_name=None, task_processor: Optional[ExportTaskProcessor] = None):
+    def __init__(self, bucket_name=None, region_name=None, task_processor: Optional[ExportTaskProcessor] = None, key_prefix: str = ""):
         super().__init__()
         # Use environment variables if credentials are not provided
         DEFAULT_FILE_PREFIX = "monocle_trace_"
         DEFAULT_TIME_FORMAT = "%Y-%m-%d__%H.%M.%S"
-        self.max_batch_size = 500
+        self.init_export_queue(max_batch_size=500)
         self.export_interval = 1
-        if(os.getenv('MONOCLE_AWS_ACCESS_KEY_ID') and os.getenv('MONOCLE_AWS_SECRET_ACCESS_KEY')):
-            self.s3_client = boto3.client(
-                's3',
-                aws_access_key_id=os.getenv('MONOCLE_AWS_ACCESS_KEY_ID'),
-                aws_secret_access_key=os.getenv('MONOCLE_AWS_SECRET_ACCESS_KEY'),
-                region_name=region_name,
-            )
-        else:
-            self.s3_client = boto3.client(
-                's3',
-                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-                region_name=region_name,
-            )
+        self.region_name = region_name
+        self.s3_client = self.__create_s3_client(region_name)
         self.bucket_name = bucket_name or os.getenv('MONOCLE_S3_BUCKET_NAME','default-bucket')
         self.file_prefix = os.getenv('MONOCLE_S3_KEY_PREFIX', DEFAULT_FILE_PREFIX)
+        # eg. a route of the RoutingSpanExporter, "tenant_id=acme/"
+        self.key_prefix = key_prefix
         self.time_format = DEFAULT_TIME_FORMAT
-        self.export_queue = []
+        # partitions with MONOCLE_EXPORT_KEY_PARTITIONS, manifests with MONOCLE_EXPORT_MANIFESTS
+        self.key_builder = ObjectKeyBuilder(self.time_format, self.key_prefix)
         self.last_export_time = time.time()
         self.task_processor = task_processor
         if self.task_processor is not None:
@@ -64,6 +58,27 @@ class S3SpanExporter(SpanExporterBase):
                 logger.error(f"Error creating bucket {self.bucket_name}: {e}")
                 raise e
 
+    def __create_s3_client(self, region_name):
+        if(os.getenv('MONOCLE_AWS_ACCESS_KEY_ID') and os.getenv('MONOCLE_AWS_SECRET_ACCESS_KEY')):
+            return boto3.client(
+                's3',
+                aws_access_key_id=os.getenv('MONOCLE_AWS_ACCESS_KEY_ID'),
+                aws_secret_access_key=os.getenv('MONOCLE_AWS_SECRET_ACCESS_KEY'),
+                region_name=region_name,
+            )
+        return boto3.client(
+            's3',
+            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            region_name=region_name,
+        )
+
+    def reinit_after_fork(self) -> None:
+        # boto3 clients and their connection pools are not fork safe
+        super().reinit_after_fork()
+        self.s3_client = self.__create_s3_client(self.region_name)
+        self.key_builder.reset()
+
     def __bucket_exists(self, bucket_name):
         try:
             # Check if the bucket exists by calling head_bucket
@@ -108,7 +123,7 @@ class S3SpanExporter(SpanExporterBase):
             logger.info(f"__export_async {len(spans)} spans to S3.")
             # Add spans to the export queue
             for span in spans:
-                self.export_queue.append(span)
+                self.export_queue.put(span)
                 # If the queue reaches MAX_BATCH_SIZE, export the spans
                 if len(self.export_queue) >= self.max_batch_size:
                     await self.__export_spans()
@@ -147,37 +162,49 @@ class S3SpanExporter(SpanExporterBase):
             return
 
         # Take a batch of spans from the queue
-        batch_to_export = self.export_queue[:self.max_batch_size]
-        serialized_data = self.__serialize_spans(batch_to_export)
-        self.export_queue = self.export_queue[self.max_batch_size:]
+        batch_to_export = self.export_queue.take(self.max_batch_size)
         # to calculate is_root_span loop over each span in batch_to_export and check if parent id is none or null
         is_root_span = any(not span.parent for span in batch_to_export)
         logger.info(f"Exporting {len(batch_to_export)} spans to S3 is_root_span : {is_root_span}.")
-        if self.task_processor is not None and callable(getattr(self.task_processor, 'queue_task', None)):
-            self.task_processor.queue_task(self.__upload_to_s3, serialized_data, is_root_span)
-        else:
-            try:
-                self.__upload_to_s3(serialized_data)
-            except Exception as e:
-                logger.error(f"Failed to upload span batch: {e}")
+        for workflow_name, spans in self.key_builder.split_by_workflow(batch_to_export).items():
+            serialized_data = self.__serialize_spans(spans)
+            upload = partial(self.__upload_to_s3, workflow_name=workflow_name)
+            if self.task_processor is not None and callable(getattr(self.task_processor, 'queue_task', None)):
+                self.task_processor.queue_task(upload, serialized_data, is_root_span)
+            else:
+                try:
+                    upload(serialized_data)
+                except Exception as e:
+                    logger.error(f"Failed to upload span batch: {e}")
 
     @SpanExporterBase.retry_with_backoff(exceptions=(EndpointConnectionError, ConnectionClosedError, ReadTimeoutError, ConnectTimeoutError))
-    def __upload_to_s3(self, span_data_batch: str):
-        current_time = datetime.datetime.now().strftime(self.time_format)
+    def __upload_to_s3(self, span_data_batch: str, workflow_name: Optional[str] = None):
         prefix = self.file_prefix + os.environ.get('MONOCLE_S3_KEY_PREFIX_CURRENT', '')
-        file_name = f"{prefix}{current_time}.ndjson"
+        file_name, manifest = self.key_builder.get_key(prefix, workflow_name)
         self.s3_client.put_object(
             Bucket=self.bucket_name,
             Key=file_name,
             Body=span_data_batch
         )
         logger.debug(f"Span batch uploaded to AWS S3 as {file_name}.")
+        self.key_builder.record_upload(manifest, file_name, span_data_batch)
+        self.__upload_manifests(closed_only=True)
+
+    def __upload_manifests(self, closed_only: bool = False):
+        for manifest_key, manifest in self.key_builder.take_manifests(closed_only):
+            try:
+                self.s3_client.put_object(Bucket=self.bucket_name, Key=manifest_key, Body=manifest)
+            except Exception as e:
+                logger.error(f"Failed to upload manifest {manifest_key}: {e}")
 
     async def force_flush(self, timeout_millis: int = 30000) -> bool:
         await self.__export_spans()  # Export any remaining spans in the queue
+        self.__upload_manifests()
         return True
 
     def shutdown(self) -> None:
+        # uploads the queued spans and the pending manifests, also when the exporter isn't batched by Monocle
+        flush_exporter(self)
         if hasattr(self, 'task_processor') and self.task_processor is not None:
             self.task_processor.stop()
         logger.info("S3SpanExporter has been shut down.")
@@ -19,11 +19,10 @@ class OpenDALS3Exporter(SpanExporterBase):
         super().__init__()
         DEFAULT_FILE_PREFIX = "monocle_trace_"
         DEFAULT_TIME_FORMAT = "%Y-%m-%d__%H.%M.%S"
-        self.max_batch_size = 500
+        self.init_export_queue(max_batch_size=500)
         self.export_interval = 1
         self.file_prefix = DEFAULT_FILE_PREFIX
         self.time_format = DEFAULT_TIME_FORMAT
-        self.export_queue = []
         self.last_export_time = time.time()
         self.bucket_name = bucket_name or os.getenv("MONOCLE_S3_BUCKET_NAME", "default-bucket")
 
@@ -55,7 +54,7 @@ class OpenDALS3Exporter(SpanExporterBase):
         try:
             # Add spans to the export queue
             for span in spans:
-                self.export_queue.append(span)
+                self.export_queue.put(span)
                 if len(self.export_queue) >= self.max_batch_size:
                     await self.__export_spans()
 
@@ -88,9 +87,8 @@ class OpenDALS3Exporter(SpanExporterBase):
         if not self.export_queue:
             return
         # Take a batch of spans from the queue
-        batch_to_export = self.export_queue[:self.max_batch_size]
+        batch_to_export = self.export_queue.take(self.max_batch_size)
         serialized_data = self.__serialize_spans(batch_to_export)
-        self.export_queue = self.export_queue[self.max_batch_size:]
         
         # Calculate is_root_span by checking if any span has no parent
         is_root_span = any(not span.parent for span in batch_to_export)
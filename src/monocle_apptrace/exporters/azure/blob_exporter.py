@@ -10,17 +10,20 @@ from opentelemetry.sdk.trace import ReadableSpan
 from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
 from typing import Sequence, Optional
 from monocle_apptrace.exporters.base_exporter import SpanExporterBase
+from monocle_apptrace.exporters.batch_span_processor import flush_exporter
 from monocle_apptrace.exporters.exporter_processor import ExportTaskProcessor
 import json
+from functools import partial
+from monocle_apptrace.exporters.object_key import ObjectKeyBuilder
 from monocle_apptrace.instrumentation.common.constants import MONOCLE_SDK_VERSION
 logger = logging.getLogger(__name__)
 
 class AzureBlobSpanExporter(SpanExporterBase):
-    def __init__(self, connection_string=None, container_name=None, task_processor: Optional[ExportTaskProcessor] = None):
+    def __init__(self, connection_string=None, container_name=None, task_processor: Optional[ExportTaskProcessor] = None, key_prefix: str = ""):
         super().__init__()
         DEFAULT_FILE_PREFIX = "monocle_trace_"
         DEFAULT_TIME_FORMAT = "%Y-%m-%d_%H.%M.%S"
-        self.max_batch_size = 500
+        self.init_export_queue(max_batch_size=500)
         self.export_interval = 1
         # Use default values if none are provided
         if not connection_string:
@@ -31,10 +34,15 @@ class AzureBlobSpanExporter(SpanExporterBase):
         if not container_name:
             container_name = os.getenv('MONOCLE_BLOB_CONTAINER_NAME', 'default-container')
 
+        self.connection_string = connection_string
         self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
         self.container_name = container_name
         self.file_prefix = DEFAULT_FILE_PREFIX
+        # eg. a route of the RoutingSpanExporter, "tenant_id=acme/"
+        self.key_prefix = key_prefix
         self.time_format = DEFAULT_TIME_FORMAT
+        # partitions with MONOCLE_EXPORT_KEY_PARTITIONS, manifests with MONOCLE_EXPORT_MANIFESTS
+        self.key_builder = ObjectKeyBuilder(self.time_format, self.key_prefix)
 
         # Check if container exists or create it
         if not self.__container_exists(container_name):
@@ -49,6 +57,12 @@ class AzureBlobSpanExporter(SpanExporterBase):
         if self.task_processor is not None:
             self.task_processor.start()
 
+    def reinit_after_fork(self) -> None:
+        # the client's connection pool is shared with the parent
+        super().reinit_after_fork()
+        self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
+        self.key_builder.reset()
+
     def __container_exists(self, container_name):
         try:
             container_client = self.blob_service_client.get_container_client(container_name)
@@ -84,7 +98,7 @@ class AzureBlobSpanExporter(SpanExporterBase):
             # To avoid this, we check if the span has the Monocle SDK version attribute and skip it if it doesn't. That way the blob span genearted by Azure library are not exported.
             if self.skip_export(span):
                 continue
-            self.export_queue.append(span)
+            self.export_queue.put(span)
             if len(self.export_queue) >= self.max_batch_size:
                 await self.__export_spans()
 
@@ -113,34 +127,47 @@ class AzureBlobSpanExporter(SpanExporterBase):
         if len(self.export_queue) == 0:
             return
 
-        batch_to_export = self.export_queue[:self.max_batch_size]
-        serialized_data = self.__serialize_spans(batch_to_export)
-        self.export_queue = self.export_queue[self.max_batch_size:]
+        batch_to_export = self.export_queue.take(self.max_batch_size)
         
         # Calculate is_root_span by checking if any span has no parent
         is_root_span = any(not span.parent for span in batch_to_export)
         
-        if self.task_processor is not None and callable(getattr(self.task_processor, 'queue_task', None)):
-            self.task_processor.queue_task(self.__upload_to_blob, serialized_data, is_root_span)
-        else:
-            try:
-                self.__upload_to_blob(serialized_data, is_root_span)
-            except Exception as e:
-                logger.error(f"Failed to upload span batch: {e}")
+        for workflow_name, spans in self.key_builder.split_by_workflow(batch_to_export).items():
+            serialized_data = self.__serialize_spans(spans)
+            upload = partial(self.__upload_to_blob, is_root_span=is_root_span, workflow_name=workflow_name)
+            if self.task_processor is not None and callable(getattr(self.task_processor, 'queue_task', None)):
+                self.task_processor.queue_task(upload, serialized_data, is_root_span)
+            else:
+                try:
+                    upload(serialized_data)
+                except Exception as e:
+                    logger.error(f"Failed to upload span batch: {e}")
 
     @SpanExporterBase.retry_with_backoff(exceptions=(ResourceNotFoundError, ClientAuthenticationError, ServiceRequestError))
-    def __upload_to_blob(self, span_data_batch: str, is_root_span: bool = False):
-        current_time = datetime.datetime.now().strftime(self.time_format)
-        file_name = f"{self.file_prefix}{current_time}.ndjson"
+    def __upload_to_blob(self, span_data_batch: str, is_root_span: bool = False, workflow_name: Optional[str] = None):
+        file_name, manifest = self.key_builder.get_key(self.file_prefix, workflow_name)
         blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=file_name)
         blob_client.upload_blob(span_data_batch, overwrite=True)
         logger.info(f"Span batch uploaded to Azure Blob Storage as {file_name}. Is root span: {is_root_span}")
+        self.key_builder.record_upload(manifest, file_name, span_data_batch)
+        self.__upload_manifests(closed_only=True)
+
+    def __upload_manifests(self, closed_only: bool = False):
+        for manifest_name, manifest in self.key_builder.take_manifests(closed_only):
+            try:
+                blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=manifest_name)
+                blob_client.upload_blob(manifest, overwrite=True)
+            except Exception as e:
+                logger.error(f"Failed to upload manifest {manifest_name}: {e}")
 
     async def force_flush(self, timeout_millis: int = 30000) -> bool:
         await self.__export_spans()
+        self.__upload_manifests()
         return True
 
     def shutdown(self) -> None:
+        # uploads the queued spans and the pending manifests, also when the exporter isn't batched by Monocle
+        flush_exporter(self)
         if hasattr(self, 'task_processor') and self.task_processor is not None:
             self.task_processor.stop()
         logger.info("AzureBlobSpanExporter has been shut down.")
@@ -19,14 +19,13 @@ class OpenDALAzureExporter(SpanExporterBase):
         super().__init__()
         DEFAULT_FILE_PREFIX = "monocle_trace_"
         DEFAULT_TIME_FORMAT = "%Y-%m-%d_%H.%M.%S"
-        self.max_batch_size = 500
+        self.init_export_queue(max_batch_size=500)
         self.export_interval = 1
         self.container_name = container_name
 
         # Default values
         self.file_prefix = DEFAULT_FILE_PREFIX
         self.time_format = DEFAULT_TIME_FORMAT
-        self.export_queue = []  # Add this line to initialize export_queue
         self.last_export_time = time.time()  # Add this line to initialize last_export_time
 
         # Validate input
@@ -86,7 +85,7 @@ class OpenDALAzureExporter(SpanExporterBase):
         """The actual async export logic is run here."""
         # Add spans to the export queue
         for span in spans:
-            self.export_queue.append(span)
+            self.export_queue.put(span)
             if len(self.export_queue) >= self.max_batch_size:
                 await self.__export_spans()
 
@@ -115,9 +114,8 @@ class OpenDALAzureExporter(SpanExporterBase):
         if len(self.export_queue) == 0:
             return
 
-        batch_to_export = self.export_queue[:self.max_batch_size]
+        batch_to_export = self.export_queue.take(self.max_batch_size)
         serialized_data = self.__serialize_spans(batch_to_export)
-        self.export_queue = self.export_queue[self.max_batch_size:]
         
         # Calculate is_root_span by checking if any span has no parent
         is_root_span = any(not span.parent for span in batch_to_export)
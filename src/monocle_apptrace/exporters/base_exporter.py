@@ -1,21 +1,28 @@
 import time, os
 import random
 import logging
+import weakref
 from abc import ABC, abstractmethod
 from opentelemetry.sdk.trace import ReadableSpan
 from opentelemetry.sdk.trace.export import SpanExportResult
-from monocle_apptrace.instrumentation.common.constants import MONOCLE_SDK_VERSION
-from typing import Sequence
+from monocle_apptrace.exporters.span_queue import SpanRingBuffer, new_span_queue
+from monocle_apptrace.instrumentation.common.constants import MONOCLE_INSTRUMENTOR
+from typing import Optional, Sequence
 
 logger = logging.getLogger(__name__)
 
+# exporters of this process, reinitialized in the child after os.fork
+live_exporters = weakref.WeakSet()
+
 class SpanExporterBase(ABC):
     def __init__(self, export_monocle_only: bool = True):
         self.backoff_factor = 2
         self.max_retries = 10
-        self.export_queue = []
+        # set by the exporters that queue the spans, see init_export_queue
+        self.export_queue: Optional[SpanRingBuffer] = None
         self.last_export_time = time.time()
         self.export_monocle_only = export_monocle_only or os.environ.get("MONOCLE_EXPORTS_ONLY", True)
+        live_exporters.add(self)
 
     @abstractmethod
     async def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
@@ -28,8 +35,27 @@ class SpanExporterBase(ABC):
     def shutdown(self) -> None:
         pass
 
+    def init_export_queue(self, max_batch_size: int) -> None:
+        """ Queue of the exporters uploading the spans in batches of max_batch_size, eg. S3 and Blob.
+            The spans are queued and taken by the exporting thread, the queue holds at least a batch so that
+            it is drained before it's full, a full queue with the block policy would wait for its own thread. """
+        self.max_batch_size = max_batch_size
+        self.export_queue = new_span_queue(type(self).__name__, min_capacity=max_batch_size)
+
+    def prepare_fork(self) -> None:
+        """ Called in the parent before os.fork, eg. to flush buffers the child would otherwise write again """
+        pass
+
+    def reinit_after_fork(self) -> None:
+        """ Called in the child after os.fork, replaces the state shared with the parent.
+            The spans queued by the parent are exported by the parent. """
+        queue = self.export_queue
+        if queue is not None:
+            self.export_queue = SpanRingBuffer(queue.capacity, queue.policy, queue.block_timeout, queue.name)
+        self.last_export_time = time.time()
+
     def skip_export(self, span:ReadableSpan) -> bool:
-        if self.export_monocle_only and (not span.attributes.get(MONOCLE_SDK_VERSION)):
+        if self.export_monocle_only and (span.instrumentation_scope is None or span.instrumentation_scope.name != MONOCLE_INSTRUMENTOR):
             return True
         return False
 
@@ -51,4 +77,20 @@ class SpanExporterBase(ABC):
 
             return wrapper
 
-        return decorator
\ No newline at end of file
+        return decorator
+def prepare_exporters_for_fork() -> None:
+    for exporter in list(live_exporters):
+        try:
+            exporter.prepare_fork()
+        except Exception as e:
+            logger.warning(f"Error preparing {type(exporter).__name__} for fork: {e}")
+
+def reinit_exporters_after_fork() -> None:
+    for exporter in list(live_exporters):
+        try:
+            exporter.reinit_after_fork()
+        except Exception as e:
+            logger.warning(f"Error reinitializing {type(exporter).__name__} after fork: {e}")
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=prepare_exporters_for_fork, after_in_child=reinit_exporters_after_fork)
@@ -0,0 +1,223 @@
+import asyncio
+import inspect
+import os
+import threading
+import time
+import weakref
+from typing import List, Optional
+
+from opentelemetry.context import Context, _SUPPRESS_INSTRUMENTATION_KEY, attach, detach, set_value
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.export import SpanExporter
+
+from monocle_apptrace.exporters.span_queue import SpanRingBuffer, new_span_queue
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
+
+diagnostics = get_diagnostics_logger(__name__)
+
+BATCH_MAX_QUEUE_SIZE_ENV = "MONOCLE_BATCH_MAX_QUEUE_SIZE"
+BATCH_MAX_SIZE_ENV = "MONOCLE_BATCH_MAX_SIZE"
+BATCH_MAX_DELAY_MS_ENV = "MONOCLE_BATCH_MAX_DELAY_MS"
+
+DEFAULT_MAX_QUEUE_SIZE = 2048
+DEFAULT_MIN_BATCH_SIZE = 16
+DEFAULT_MAX_BATCH_SIZE = 512
+DEFAULT_MIN_DELAY_MS = 50
+DEFAULT_MAX_DELAY_MS = 5000
+# Keep the exporter busy at most 1/EXPORT_TIME_MULTIPLIER of the time
+EXPORT_TIME_MULTIPLIER = 10
+# Queue fill ratio over which the queue is drained without waiting for the schedule
+HIGH_WATERMARK = 0.5
+# Weight of the latest observation in the moving averages
+SMOOTHING = 0.3
+
+# processors of this process, reinitialized in the child after os.fork
+live_processors = weakref.WeakSet()
+
+def run_coroutine(coroutine):
+    """ Run a coroutine to completion from synchronous code, in a new thread if this thread runs an event loop """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    result = []
+    thread = threading.Thread(target=lambda: result.append(asyncio.run(coroutine)), name="MonocleFlush", daemon=True)
+    thread.start()
+    thread.join()
+    return result[0] if result else False
+
+def flush_exporter(exporter: SpanExporter, timeout_millis: int = 30000) -> bool:
+    """ The S3, Blob and OpenDAL exporters flush their own queue with a coroutine """
+    try:
+        result = exporter.force_flush(timeout_millis)
+        if inspect.iscoroutine(result):
+            result = run_coroutine(result)
+        return result is not False
+    except Exception as e:
+        diagnostics.error("flush", "Error flushing %s: %s", type(exporter).__name__, e)
+        return False
+
+class MonocleBatchSpanProcessor(SpanProcessor):
+    """
+    Batches spans to an exporter, adapting the schedule to the observed export latency and span rate:
+    the delay between exports is EXPORT_TIME_MULTIPLIER times the average export latency (within min and max delay),
+    the batch size is the number of spans expected within that delay (within min and max batch size).
+    A queue over half full is drained right away. Once the local root span of a trace ends (no parent, or a remote one)
+    the queued spans are exported without waiting, eg. before a Lambda invocation is frozen.
+    When the queue is full the queue policy (MONOCLE_EXPORT_QUEUE_POLICY) picks the dropped span, see SpanRingBuffer,
+    the dropped spans are counted in "monocle.spans.dropped".
+    """
+    def __init__(self, exporter: SpanExporter, max_queue_size: int = None, max_batch_size: int = None,
+                 max_delay_ms: float = None, min_batch_size: int = DEFAULT_MIN_BATCH_SIZE, min_delay_ms: float = DEFAULT_MIN_DELAY_MS,
+                 queue_policy: str = None):
+        self.exporter = exporter
+        self.max_queue_size = max_queue_size or int(os.environ.get(BATCH_MAX_QUEUE_SIZE_ENV, DEFAULT_MAX_QUEUE_SIZE))
+        self.queue: SpanRingBuffer = new_span_queue(type(exporter).__name__, self.max_queue_size, queue_policy)
+        self.max_batch_size = min(max_batch_size or int(os.environ.get(BATCH_MAX_SIZE_ENV, DEFAULT_MAX_BATCH_SIZE)), self.max_queue_size)
+        self.min_batch_size = min(min_batch_size, self.max_batch_size)
+        self.max_delay = (max_delay_ms or float(os.environ.get(BATCH_MAX_DELAY_MS_ENV, DEFAULT_MAX_DELAY_MS))) / 1000
+        self.min_delay = min(min_delay_ms / 1000, self.max_delay)
+        self.batch_size = self.min_batch_size
+        self.delay = self.min_delay
+        self.export_latency = 0.0
+        self.span_rate = 0.0
+        self.received_spans = 0
+        self.exported_spans = 0
+        self._init_worker()
+        live_processors.add(self)
+
+    def _init_worker(self) -> None:
+        self.condition = threading.Condition()
+        self.export_lock = threading.Lock()
+        self.flush_requested = False
+        self.done = False
+        # when the oldest queued span was queued, it waits at most the current delay
+        self.first_queued: Optional[float] = None
+        self.last_adapt = time.monotonic()
+        self.last_received_spans = self.received_spans
+        self.worker = threading.Thread(target=self._run, name="MonocleBatchSpanProcessor", daemon=True)
+        self.worker.start()
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        pass
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if self.done or not span.context.trace_flags.sampled:
+            return
+        if not self.queue.put(span):
+            return
+        is_local_root = span.parent is None or span.parent.is_remote
+        with self.condition:
+            if self.first_queued is None:
+                self.first_queued = time.monotonic()
+            self.received_spans += 1
+            if is_local_root:
+                self.flush_requested = True
+                self.condition.notify()
+            elif len(self.queue) >= self.batch_size:
+                self.condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                if not (self.done or self.flush_requested or len(self.queue) >= self.batch_size):
+                    if self.queue:
+                        self.condition.wait(max(0.0, self.next_export() - time.monotonic()))
+                    else:
+                        self.condition.wait()
+                if self.done and not self.queue:
+                    return
+                drain = self.flush_requested or self.done or len(self.queue) >= self.max_queue_size * HIGH_WATERMARK
+                self.flush_requested = False
+                if not self.queue:
+                    continue
+                if self.next_export() > time.monotonic() and not drain and len(self.queue) < self.batch_size:
+                    # woken up early, eg. by an exporter flush
+                    continue
+            self._export(drain)
+
+    def next_export(self) -> float:
+        return (self.first_queued or time.monotonic()) + self.delay
+
+    def _export(self, drain: bool) -> None:
+        """ Export a batch, or the whole queue in batches when draining """
+        with self.export_lock:
+            exported = False
+            while True:
+                batch = self.queue.take(self.max_batch_size if drain else self.batch_size)
+                with self.condition:
+                    self.first_queued = time.monotonic() if self.queue else None
+                if not batch:
+                    break
+                self._export_batch(batch)
+                exported = True
+                if not drain:
+                    break
+            if exported:
+                self._adapt()
+
+    def _export_batch(self, batch: List[ReadableSpan]) -> None:
+        token = attach(set_value(_SUPPRESS_INSTRUMENTATION_KEY, True))
+        start = time.monotonic()
+        try:
+            self.exporter.export(batch)
+            self.exported_spans += len(batch)
+        except Exception as e:
+            diagnostics.error("export", "Error exporting %d spans with %s: %s", len(batch), type(self.exporter).__name__, e)
+        finally:
+            detach(token)
+        latency = time.monotonic() - start
+        self.export_latency = latency if not self.export_latency else SMOOTHING * latency + (1 - SMOOTHING) * self.export_latency
+
+    def _adapt(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_adapt
+        if elapsed > 0:
+            rate = (self.received_spans - self.last_received_spans) / elapsed
+            self.span_rate = SMOOTHING * rate + (1 - SMOOTHING) * self.span_rate
+        self.last_adapt = now
+        self.last_received_spans = self.received_spans
+        self.delay = min(self.max_delay, max(self.min_delay, self.export_latency * EXPORT_TIME_MULTIPLIER))
+        self.batch_size = min(self.max_batch_size, max(self.min_batch_size, int(self.span_rate * self.delay)))
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        if self.done:
+            return True
+        self._export(drain=True)
+        return flush_exporter(self.exporter, timeout_millis)
+
+    def shutdown(self) -> None:
+        if self.done:
+            return
+        with self.condition:
+            self.done = True
+            self.condition.notify()
+        self.worker.join()
+        flush_exporter(self.exporter)
+        self.exporter.shutdown()
+
+    def reinit_after_fork(self) -> None:
+        """ The child gets an empty queue and its own worker, the spans queued in the parent are exported by the parent """
+        if not self.done:
+            queue = self.queue
+            self.queue = SpanRingBuffer(queue.capacity, queue.policy, queue.block_timeout, queue.name)
+            self._init_worker()
+
+    @property
+    def dropped_spans(self) -> int:
+        return self.queue.dropped_count()
+
+    def get_stats(self) -> dict:
+        return {"exporter": type(self.exporter).__name__, "queued": len(self.queue), "exported": self.exported_spans,
+                "dropped": self.dropped_spans, "batch_size": self.batch_size, "delay_ms": self.delay * 1000,
+                "export_latency_ms": self.export_latency * 1000}
+
+def reinit_processors_after_fork() -> None:
+    for processor in list(live_processors):
+        try:
+            processor.reinit_after_fork()
+        except Exception as e:
+            diagnostics.warning("reinit_after_fork", "Error reinitializing %s after fork: %s", type(processor.exporter).__name__, e)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reinit_processors_after_fork)
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from opentelemetry.sdk.resources import SERVICE_NAME
+from opentelemetry.sdk.trace import Event, ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from monocle_apptrace.exporters.base_exporter import SpanExporterBase
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_REFERENCE_PREFIX = "sha256:"
+DEFAULT_MIN_SEGMENT_SIZE = 1024
+DEFAULT_MAX_TRACKED_TRACES = 1024
+DEFAULT_SEGMENT_FILE_PREFIX = "monocle_segments_"
+DEFAULT_TIME_FORMAT = "%Y-%m-%d_%H.%M.%S"
+
+def is_segment_dedup_enabled() -> bool:
+    return os.environ.get("MONOCLE_DEDUP_SEGMENTS", "false").lower() == "true"
+
+def segment_hash(content: str) -> str:
+    return SEGMENT_REFERENCE_PREFIX + hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def is_segment_reference(value) -> bool:
+    return isinstance(value, str) and value.startswith(SEGMENT_REFERENCE_PREFIX) and len(value) == len(SEGMENT_REFERENCE_PREFIX) + 64
+
+class SegmentTableWriter:
+    """ Appends newly seen segments to a local ndjson side table, one {"hash", "trace_id", "content"} record per line.
+        Only needed when the referencing spans are read without the span holding the first occurrence,
+        rehydrate_spans takes the segments from the exported spans otherwise. """
+    def __init__(self, out_path: str = None, file_prefix: str = DEFAULT_SEGMENT_FILE_PREFIX, time_format: str = DEFAULT_TIME_FORMAT):
+        self.output_path = out_path or os.getenv("MONOCLE_TRACE_OUTPUT_PATH", ".")
+        self.file_prefix = file_prefix
+        self.time_format = time_format
+        self.file_path: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def write(self, service_name: str, segments: List[Tuple[str, int, str]]) -> None:
+        if not segments:
+            return
+        lines = [json.dumps({"hash": digest, "trace_id": hex(trace_id), "content": content}) for digest, trace_id, content in segments]
+        with self._lock:
+            if self.file_path is None:
+                self.file_path = os.path.join(self.output_path,
+                        self.file_prefix + service_name + "_" + datetime.now().strftime(self.time_format) + ".ndjson")
+            try:
+                with open(self.file_path, "a", encoding="UTF-8") as handle:
+                    handle.write("\n".join(lines) + "\n")
+            except Exception as e:
+                logger.warning("Error writing segment table %s: %s", self.file_path, e)
+
+class DedupSpanExporter(SpanExporterBase):
+    """ Replaces repeated large event segments (system prompts, tool schemas etc.) with a sha256 reference.
+        The first occurrence of a segment in a trace (or in the current window when window_seconds is set) is exported in full,
+        later occurrences are exported as "sha256:<hex>". Each segment is exported in full once, the exported first
+        occurrences are the hash to content mapping used by rehydrate_spans. The new segments are also written to the
+        segment_writer side table if one is given.
+    """
+    def __init__(
+            self,
+            exporter: SpanExporter,
+            min_segment_size: int = None,
+            window_seconds: float = None,
+            max_tracked_traces: int = DEFAULT_MAX_TRACKED_TRACES,
+            segment_writer: Optional[SegmentTableWriter] = None):
+        super().__init__()
+        self.exporter = exporter
+        self.min_segment_size = min_segment_size or int(os.environ.get("MONOCLE_DEDUP_MIN_SEGMENT_SIZE", DEFAULT_MIN_SEGMENT_SIZE))
+        self.window_seconds = window_seconds if window_seconds is not None else float(os.environ.get("MONOCLE_DEDUP_WINDOW_SECONDS", 0))
+        self.max_tracked_traces = max_tracked_traces
+        self.segment_writer = segment_writer
+        # {trace_id or window key: set of segment hashes already exported in full}
+        self.seen_segments: "OrderedDict[int, set]" = OrderedDict()
+        self.window_start = time.time()
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        new_segments: List[Tuple[str, int, str]] = []
+        with self._lock:
+            deduped_spans = [self._dedup_span(span, new_segments) for span in spans]
+        if new_segments and self.segment_writer is not None:
+            service_name = spans[0].resource.attributes.get(SERVICE_NAME, "unknown") if spans[0].resource else "unknown"
+            self.segment_writer.write(service_name, new_segments)
+        return self.exporter.export(deduped_spans)
+
+    def _get_seen_segments(self, trace_id: int) -> set:
+        if self.window_seconds > 0:
+            # All traces share one window, reset once the window has elapsed
+            if time.time() - self.window_start >= self.window_seconds:
+                self.seen_segments.clear()
+                self.window_start = time.time()
+            trace_id = 0
+        seen = self.seen_segments.get(trace_id)
+        if seen is None:
+            seen = set()
+            self.seen_segments[trace_id] = seen
+            if len(self.seen_segments) > self.max_tracked_traces:
+                self.seen_segments.popitem(last=False)
+        else:
+            self.seen_segments.move_to_end(trace_id)
+        return seen
+
+    def _dedup_value(self, value, seen: set, trace_id: int, new_segments: List[Tuple[str, int, str]]):
+        if isinstance(value, str):
+            if len(value) < self.min_segment_size:
+                return value
+            digest = segment_hash(value)
+            if digest in seen:
+                return digest
+            seen.add(digest)
+            new_segments.append((digest, trace_id, value))
+            return value
+        if isinstance(value, (list, tuple)) and any(isinstance(item, str) for item in value):
+            new_items = tuple(self._dedup_value(item, seen, trace_id, new_segments) for item in value)
+            if any(new_item is not item for new_item, item in zip(new_items, value)):
+                return new_items
+        return value
+
+    def _dedup_span(self, span: ReadableSpan, new_segments: List[Tuple[str, int, str]]) -> ReadableSpan:
+        if not span.events or span.context is None:
+            return span
+        seen = self._get_seen_segments(span.context.trace_id)
+        events: List[Event] = []
+        changed = False
+        for event in span.events:
+            attributes = {}
+            for key, value in (event.attributes or {}).items():
+                new_value = self._dedup_value(value, seen, span.context.trace_id, new_segments)
+                changed = changed or new_value is not value
+                attributes[key] = new_value
+            events.append(Event(name=event.name, attributes=attributes, timestamp=event.timestamp))
+        if not changed:
+            return span
+        return copy_span_with_events(span, events)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.exporter.force_flush(timeout_millis)
+
+    def shutdown(self) -> None:
+        self.exporter.shutdown()
+
+    def reinit_after_fork(self) -> None:
+        # a lock held by another thread of the parent at fork is never released in the child
+        super().reinit_after_fork()
+        self._lock = threading.Lock()
+        if self.segment_writer is not None:
+            self.segment_writer._lock = threading.Lock()
+
+def copy_span_with_events(span: ReadableSpan, events: Sequence[Event]) -> ReadableSpan:
+    return ReadableSpan(
+        name=span.name,
+        context=span.context,
+        parent=span.parent,
+        resource=span.resource,
+        attributes=span.attributes,
+        events=events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+def load_segment_table(file_paths: Iterable[str]) -> Dict[str, str]:
+    """ Load one or more segment side table files into a hash to content mapping """
+    segment_table: Dict[str, str] = {}
+    for file_path in file_paths:
+        with open(file_path, encoding="UTF-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    segment_table[record["hash"]] = record["content"]
+    return segment_table
+
+def rehydrate_spans(spans: List[dict], segment_table: Optional[Dict[str, str]] = None) -> List[dict]:
+    """ Replace sha256 segment references in exported span dicts with the full content.
+        Segments exported in full within the given spans are hashed and used in addition to the side table,
+        so the exported spans can be rehydrated without a local side table.
+    """
+    table: Dict[str, str] = dict(segment_table or {})
+
+    def collect(value):
+        if isinstance(value, str) and not is_segment_reference(value):
+            table.setdefault(segment_hash(value), value)
+        elif isinstance(value, list):
+            for item in value:
+                collect(item)
+
+    def resolve(value):
+        if is_segment_reference(value):
+            return table.get(value, value)
+        if isinstance(value, list):
+            return [resolve(item) for item in value]
+        return value
+
+    for span in spans:
+        for event in span.get("events", []):
+            for value in event.get("attributes", {}).values():
+                collect(value)
+    for span in spans:
+        for event in span.get("events", []):
+            attributes = event.get("attributes", {})
+            for key, value in attributes.items():
+                attributes[key] = resolve(value)
+    return spans
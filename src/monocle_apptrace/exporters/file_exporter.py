@@ -10,6 +10,9 @@ from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
 from opentelemetry.sdk.resources import SERVICE_NAME
 from monocle_apptrace.exporters.base_exporter import SpanExporterBase
 from monocle_apptrace.exporters.exporter_processor import ExportTaskProcessor
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
+
+diagnostics = get_diagnostics_logger(__name__)
 
 DEFAULT_FILE_PREFIX:str = "monocle_trace_"
 DEFAULT_TIME_FORMAT:str = "%Y-%m-%d_%H.%M.%S"
@@ -35,6 +38,8 @@ class FileSpanExporter(SpanExporterBase):
         self.service_name = service_name
         self.output_path = os.getenv("MONOCLE_TRACE_OUTPUT_PATH", out_path)
         self.file_prefix = file_prefix
+        # the forked children write to "<file_prefix><pid>_" files
+        self.base_file_prefix = file_prefix
         self.time_format = time_format
         self.task_processor = task_processor
         self.is_first_span_in_file = True  # Track if this is the first span in the current file
@@ -81,7 +86,7 @@ class FileSpanExporter(SpanExporterBase):
             self.file_handles[trace_id] = (handle, file_path, datetime.now(), True)
             return handle, file_path, True
         except Exception as e:
-            print(f"Error creating file {file_path}: {e}")
+            diagnostics.error("create_file", "Error creating file %s: %s", file_path, e)
             return None, file_path, True
 
     def _close_trace_handle(self, trace_id: int) -> None:
@@ -93,7 +98,7 @@ class FileSpanExporter(SpanExporterBase):
                     handle.write("]")
                     handle.close()
             except Exception as e:
-                print(f"Error closing file {file_path}: {e}")
+                diagnostics.error("close_file", "Error closing file %s: %s", file_path, e)
             finally:
                 del self.file_handles[trace_id]
 
@@ -134,7 +139,7 @@ class FileSpanExporter(SpanExporterBase):
                     try:
                         handle.write(",")
                     except Exception as e:
-                        print(f"Error writing comma to file {file_path} for span {span.context.span_id}: {e}")
+                        diagnostics.error("write_file", "Error writing comma to file %s for span %s: %s", file_path, span.context.span_id, e)
                         continue
                 
                 try:
@@ -143,7 +148,7 @@ class FileSpanExporter(SpanExporterBase):
                         self._mark_span_written(trace_id)
                         is_first_span = False
                 except Exception as e:
-                    print(f"Error formatting span {span.context.span_id}: {e}")
+                    diagnostics.error("format_span", "Error formatting span %s: %s", span.context.span_id, e)
                     continue
         
         # Close handles for traces with root spans
@@ -157,7 +162,7 @@ class FileSpanExporter(SpanExporterBase):
                     if handle is not None:
                         handle.flush()
                 except Exception as e:
-                    print(f"Error flushing file {file_path}: {e}")
+                    diagnostics.error("flush_file", "Error flushing file %s: %s", file_path, e)
         
         return SpanExportResult.SUCCESS
 
@@ -168,7 +173,7 @@ class FileSpanExporter(SpanExporterBase):
                 if handle is not None:
                     handle.flush()
             except Exception as e:
-                print(f"Error flushing file {file_path}: {e}")
+                diagnostics.error("flush_file", "Error flushing file %s: %s", file_path, e)
         return True
 
     def shutdown(self) -> None:
@@ -180,3 +185,21 @@ class FileSpanExporter(SpanExporterBase):
         trace_ids_to_close = list(self.file_handles.keys())
         for trace_id in trace_ids_to_close:
             self._close_trace_handle(trace_id)
+
+    def prepare_fork(self) -> None:
+        """Flush the open files so the child doesn't write the buffered spans again."""
+        self.force_flush()
+
+    def reinit_after_fork(self) -> None:
+        """Drop the files inherited from the parent without terminating them, the parent keeps writing those traces.
+        The child writes its spans of the same trace to its own file."""
+        super().reinit_after_fork()
+        inherited_handles = self.file_handles
+        self.file_handles = {}
+        for handle, _, _, _ in inherited_handles.values():
+            try:
+                if handle is not None:
+                    handle.close()
+            except Exception:
+                pass
+        self.file_prefix = f"{self.base_file_prefix}{os.getpid()}_"
@@ -0,0 +1,173 @@
+"""
+Local span aggregator for prefork servers. The workers export with MONOCLE_EXPORTER=local, the aggregator batches
+the spans of all the workers and runs the exporters configured with MONOCLE_LOCAL_EXPORTERS, eg.
+
+    MONOCLE_LOCAL_EXPORTERS=s3,okahu python -m monocle_apptrace.exporters.local.aggregator &
+    MONOCLE_EXPORTER=local gunicorn -w 16 app:app
+"""
+import logging
+import os
+import socket
+import socketserver
+import threading
+from typing import List, Optional
+
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.sdk.trace.export import SpanExporter
+
+from monocle_apptrace.exporters.batch_span_processor import MonocleBatchSpanProcessor
+from monocle_apptrace.exporters.local.local_exporter import (
+    SPOOL_FILE_PREFIX, SPOOL_FILE_SUFFIX, decode_spans, get_socket_path, get_spool_dir
+)
+
+logger = logging.getLogger(__name__)
+
+LOCAL_EXPORTERS_ENV = "MONOCLE_LOCAL_EXPORTERS"
+DEFAULT_LOCAL_EXPORTERS = "file"
+SPOOL_SCAN_SECONDS = 30.0
+
+def is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class SpanMessageHandler(socketserver.StreamRequestHandler):
+    """ Reads the newline terminated span batches of one worker connection """
+    def handle(self):
+        for message in self.rfile:
+            if not message.endswith(b"\n"):
+                # the worker disconnected while sending, it spools the batch
+                break
+            self.server.aggregator.process_message(message)
+
+class SpanAggregatorServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class LocalSpanAggregator:
+    """ Receives spans from the LocalSpanExporter of the local processes and feeds them to one set of span processors,
+        by default a MonocleBatchSpanProcessor per exporter. Spool files of exited processes are ingested at start and every scan_seconds. """
+    def __init__(self, exporters: List[SpanExporter] = None, socket_path: str = None, spool_dir: str = None,
+                 span_processors: List[SpanProcessor] = None, scan_seconds: float = SPOOL_SCAN_SECONDS):
+        if span_processors is None:
+            if exporters is None:
+                from monocle_apptrace.exporters.monocle_exporters import get_monocle_exporter
+                exporters = get_monocle_exporter(os.environ.get(LOCAL_EXPORTERS_ENV, DEFAULT_LOCAL_EXPORTERS))
+            span_processors = [MonocleBatchSpanProcessor(exporter) for exporter in exporters]
+        self.span_processors = span_processors
+        self.socket_path = get_socket_path(socket_path)
+        self.spool_dir = get_spool_dir(spool_dir)
+        self.scan_seconds = scan_seconds
+        self.received_spans = 0
+        self.server: Optional[SpanAggregatorServer] = None
+        self.stopped = threading.Event()
+        self.threads: List[threading.Thread] = []
+
+    def process_message(self, message: bytes) -> None:
+        try:
+            spans = decode_spans(message)
+        except Exception as e:
+            logger.warning(f"Dropping malformed span message: {e}")
+            return
+        self.received_spans += len(spans)
+        for span in spans:
+            for span_processor in self.span_processors:
+                span_processor.on_end(span)
+
+    def ingest_orphaned_spools(self) -> int:
+        """ Ingest the spool files of processes that exited before the aggregator came back, returns the span count """
+        if not os.path.isdir(self.spool_dir):
+            return 0
+        received_spans = self.received_spans
+        for file_name in os.listdir(self.spool_dir):
+            if not (file_name.startswith(SPOOL_FILE_PREFIX) and file_name.endswith(SPOOL_FILE_SUFFIX)):
+                continue
+            pid = file_name[len(SPOOL_FILE_PREFIX):-len(SPOOL_FILE_SUFFIX)]
+            if not pid.isdigit() or is_process_alive(int(pid)):
+                # a live process sends its own spool once it reconnects
+                continue
+            spool_file = os.path.join(self.spool_dir, file_name)
+            claimed_file = spool_file + ".ingesting"
+            try:
+                os.rename(spool_file, claimed_file)
+                with open(claimed_file, "rb") as f:
+                    for message in f:
+                        if message.endswith(b"\n"):
+                            self.process_message(message)
+                os.remove(claimed_file)
+            except OSError as e:
+                logger.warning(f"Error ingesting spool {spool_file}: {e}")
+        return self.received_spans - received_spans
+
+    def _bind(self) -> None:
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                raise RuntimeError(f"A Monocle aggregator is already listening on {self.socket_path}")
+            except OSError:
+                # stale socket of an aggregator that didn't shut down
+                os.remove(self.socket_path)
+            finally:
+                probe.close()
+        self.server = SpanAggregatorServer(self.socket_path, SpanMessageHandler)
+        self.server.aggregator = self
+        os.chmod(self.socket_path, 0o600)
+
+    def _scan_spools(self) -> None:
+        while not self.stopped.wait(self.scan_seconds):
+            self.ingest_orphaned_spools()
+
+    def start(self) -> None:
+        """ Serve in background threads """
+        self._bind()
+        self.ingest_orphaned_spools()
+        for target in (self.server.serve_forever, self._scan_spools):
+            thread = threading.Thread(target=target, daemon=True, name="MonocleAggregator")
+            thread.start()
+            self.threads.append(thread)
+
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            self.stopped.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return all(span_processor.force_flush(timeout_millis) for span_processor in self.span_processors)
+
+    def shutdown(self) -> None:
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+        for span_processor in self.span_processors:
+            span_processor.shutdown()
+
+def main(argv: List[str] = None) -> None:
+    import argparse
+    parser = argparse.ArgumentParser(description="Aggregate the spans of the local processes exporting with MONOCLE_EXPORTER=local")
+    parser.add_argument("--socket", default=None, help="Unix domain socket path, defaults to MONOCLE_LOCAL_SOCKET")
+    parser.add_argument("--spool-dir", default=None, help="spool directory, defaults to MONOCLE_LOCAL_SPOOL_DIR")
+    parser.add_argument("--exporters", default=None, help="comma separated exporters, defaults to MONOCLE_LOCAL_EXPORTERS or file")
+    options = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    exporters = None
+    if options.exporters:
+        from monocle_apptrace.exporters.monocle_exporters import get_monocle_exporter
+        exporters = get_monocle_exporter(options.exporters)
+    aggregator = LocalSpanAggregator(exporters, socket_path=options.socket, spool_dir=options.spool_dir)
+    logger.info(f"Monocle aggregator listening on {aggregator.socket_path}")
+    aggregator.serve_forever()
+
+if __name__ == "__main__":
+    main()
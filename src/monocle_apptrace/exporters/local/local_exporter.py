@@ -0,0 +1,247 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import Event, ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExportResult
+from opentelemetry.sdk.util.instrumentation import InstrumentationScope
+from opentelemetry.trace import Link, SpanContext, SpanKind, Status, StatusCode, TraceFlags, TraceState
+
+from monocle_apptrace.exporters.base_exporter import SpanExporterBase
+from monocle_apptrace.exporters.exporter_processor import ExportTaskProcessor
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
+
+diagnostics = get_diagnostics_logger(__name__)
+
+LOCAL_SOCKET_ENV = "MONOCLE_LOCAL_SOCKET"
+LOCAL_SPOOL_DIR_ENV = "MONOCLE_LOCAL_SPOOL_DIR"
+LOCAL_SPOOL_MAX_BYTES_ENV = "MONOCLE_LOCAL_SPOOL_MAX_BYTES"
+
+DEFAULT_SOCKET_NAME = "monocle_aggregator.sock"
+DEFAULT_SPOOL_DIR_NAME = "monocle_spool"
+DEFAULT_SPOOL_MAX_BYTES = 100 * 1024 * 1024
+SPOOL_FILE_PREFIX = "monocle_spool_"
+SPOOL_FILE_SUFFIX = ".ndjson"
+CONNECT_TIMEOUT_SECONDS = 1.0
+RECONNECT_SECONDS = 5.0
+
+def get_socket_path(socket_path: str = None) -> str:
+    return socket_path or os.environ.get(LOCAL_SOCKET_ENV, os.path.join(tempfile.gettempdir(), DEFAULT_SOCKET_NAME))
+
+def get_spool_dir(spool_dir: str = None) -> str:
+    return spool_dir or os.environ.get(LOCAL_SPOOL_DIR_ENV, os.path.join(tempfile.gettempdir(), DEFAULT_SPOOL_DIR_NAME))
+
+def get_spool_file(spool_dir: str, pid: int) -> str:
+    return os.path.join(spool_dir, f"{SPOOL_FILE_PREFIX}{pid}{SPOOL_FILE_SUFFIX}")
+
+def _context_to_list(context: SpanContext) -> list:
+    return [context.trace_id, context.span_id, int(context.trace_flags), context.is_remote, context.trace_state.to_header()]
+
+def _context_from_list(values: list) -> SpanContext:
+    trace_id, span_id, trace_flags, is_remote, trace_state = values
+    return SpanContext(trace_id, span_id, is_remote, TraceFlags(trace_flags), TraceState.from_header([trace_state]) if trace_state else None)
+
+def encode_spans(spans: Sequence[ReadableSpan]) -> bytes:
+    """ One newline terminated JSON message per batch, the resources shared by the spans are sent once """
+    resources: List[list] = []
+    resource_index: Dict[int, int] = {}
+    encoded_spans = []
+    for span in spans:
+        index = None
+        if span.resource is not None:
+            index = resource_index.get(id(span.resource))
+            if index is None:
+                index = resource_index[id(span.resource)] = len(resources)
+                resources.append([dict(span.resource.attributes), span.resource.schema_url])
+        scope = span.instrumentation_scope
+        encoded_spans.append({
+            "name": span.name,
+            "context": _context_to_list(span.context),
+            "parent": _context_to_list(span.parent) if span.parent else None,
+            "kind": span.kind.value,
+            "start_time": span.start_time,
+            "end_time": span.end_time,
+            "status": [span.status.status_code.value, span.status.description],
+            "attributes": dict(span.attributes or {}),
+            "events": [[event.name, event.timestamp, dict(event.attributes or {})] for event in span.events],
+            "links": [[_context_to_list(link.context), dict(link.attributes or {})] for link in span.links],
+            "resource": index,
+            "scope": [scope.name, scope.version, scope.schema_url] if scope else None,
+        })
+    return json.dumps({"resources": resources, "spans": encoded_spans}, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+
+def decode_spans(message: bytes) -> List[ReadableSpan]:
+    data = json.loads(message)
+    resources = [Resource(attributes, schema_url) for attributes, schema_url in data["resources"]]
+    spans = []
+    for span in data["spans"]:
+        status_code, description = span["status"]
+        status_code = StatusCode(status_code)
+        scope = span["scope"]
+        spans.append(ReadableSpan(
+            name=span["name"],
+            context=_context_from_list(span["context"]),
+            parent=_context_from_list(span["parent"]) if span["parent"] else None,
+            resource=resources[span["resource"]] if span["resource"] is not None else None,
+            attributes=span["attributes"],
+            events=[Event(name, attributes, timestamp) for name, timestamp, attributes in span["events"]],
+            links=[Link(_context_from_list(context), attributes) for context, attributes in span["links"]],
+            kind=SpanKind(span["kind"]),
+            status=Status(status_code, description if status_code == StatusCode.ERROR else None),
+            start_time=span["start_time"],
+            end_time=span["end_time"],
+            instrumentation_scope=InstrumentationScope(*scope) if scope else None,
+        ))
+    return spans
+
+class LocalSpanExporter(SpanExporterBase):
+    """ Sends the spans of this process over a Unix domain socket to the local aggregator, which batches the spans
+        of all the workers (eg. gunicorn or uvicorn workers) and runs the configured exporters once for the host.
+        See monocle_apptrace.exporters.local.aggregator.
+        While the aggregator is unreachable the spans are appended to a per process spool file, sent once the
+        connection is back. The aggregator picks up the spool files left by exited processes. """
+    def __init__(self, socket_path: str = None, spool_dir: str = None, spool_max_bytes: int = None,
+                 task_processor: Optional[ExportTaskProcessor] = None):
+        super().__init__()
+        self.socket_path = get_socket_path(socket_path)
+        self.spool_dir = get_spool_dir(spool_dir)
+        self.spool_max_bytes = spool_max_bytes if spool_max_bytes is not None else int(os.environ.get(LOCAL_SPOOL_MAX_BYTES_ENV, DEFAULT_SPOOL_MAX_BYTES))
+        self.connection: Optional[socket.socket] = None
+        self.retry_at = 0.0
+        self.spooled_spans = 0
+        self.dropped_spans = 0
+        self._lock = threading.Lock()
+        self.task_processor = task_processor
+        if self.task_processor is not None:
+            self.task_processor.start()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        spans = [span for span in spans if not self.skip_export(span)]
+        if not spans:
+            return SpanExportResult.SUCCESS
+        if self.task_processor is not None and callable(getattr(self.task_processor, 'queue_task', None)):
+            self.task_processor.queue_task(self._send_spans, spans, any(not span.parent for span in spans))
+            return SpanExportResult.SUCCESS
+        return self._send_spans(spans)
+
+    def _send_spans(self, spans: Sequence[ReadableSpan], is_root_span: bool = False) -> SpanExportResult:
+        message = encode_spans(spans)
+        with self._lock:
+            if self._send(message):
+                return SpanExportResult.SUCCESS
+            if self._spool(message, len(spans)):
+                return SpanExportResult.SUCCESS
+        return SpanExportResult.FAILURE
+
+    def _connect(self) -> bool:
+        if self.connection is not None:
+            return True
+        if time.monotonic() < self.retry_at:
+            return False
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(CONNECT_TIMEOUT_SECONDS)
+        try:
+            connection.connect(self.socket_path)
+        except OSError as e:
+            connection.close()
+            self.retry_at = time.monotonic() + RECONNECT_SECONDS
+            diagnostics.warning("aggregator_connect", "Monocle aggregator %s unreachable, spooling spans to %s: %s", self.socket_path, self.spool_dir, e)
+            return False
+        self.connection = connection
+        self._replay_spool()
+        return self.connection is not None
+
+    def _send(self, message: bytes) -> bool:
+        if not self._connect():
+            return False
+        try:
+            self.connection.sendall(message)
+            return True
+        except OSError as e:
+            # the aggregator drops the partial message with the connection
+            diagnostics.warning("aggregator_send", "Error sending spans to the Monocle aggregator %s: %s", self.socket_path, e)
+            self._disconnect()
+            return False
+
+    def _disconnect(self) -> None:
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except OSError:
+                pass
+            self.connection = None
+        self.retry_at = time.monotonic() + RECONNECT_SECONDS
+
+    def _spool(self, message: bytes, span_count: int) -> bool:
+        spool_file = get_spool_file(self.spool_dir, os.getpid())
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            if os.path.exists(spool_file) and os.path.getsize(spool_file) + len(message) > self.spool_max_bytes:
+                self.dropped_spans += span_count
+                diagnostics.error("spool_full", "Monocle spool %s is full, dropped %d spans", spool_file, span_count)
+                return False
+            with open(spool_file, "ab") as f:
+                f.write(message)
+            self.spooled_spans += span_count
+            return True
+        except OSError as e:
+            self.dropped_spans += span_count
+            diagnostics.error("spool_write", "Error writing the Monocle spool %s: %s", spool_file, e)
+            return False
+
+    def _replay_spool(self) -> None:
+        """ Send the spans spooled by this process. If the connection drops, the messages sent so far are removed
+            from the spool and the others are kept for the next connection. """
+        spool_file = get_spool_file(self.spool_dir, os.getpid())
+        if not os.path.exists(spool_file):
+            return
+        # end of the messages sent so far
+        offset = 0
+        try:
+            with open(spool_file, "rb") as f:
+                for message in f:
+                    if message.endswith(b"\n"):
+                        self.connection.sendall(message)
+                    offset += len(message)
+            os.remove(spool_file)
+        except OSError as e:
+            diagnostics.warning("spool_replay", "Error replaying the Monocle spool %s: %s", spool_file, e)
+            self._disconnect()
+            self._truncate_spool(spool_file, offset)
+
+    def _truncate_spool(self, spool_file: str, offset: int) -> None:
+        """ Remove the messages before offset from the spool """
+        if offset == 0:
+            return
+        remaining_file = f"{spool_file}.remaining"
+        try:
+            with open(spool_file, "rb") as f, open(remaining_file, "wb") as remaining:
+                f.seek(offset)
+                shutil.copyfileobj(f, remaining)
+            os.replace(remaining_file, spool_file)
+        except OSError as e:
+            diagnostics.error("spool_truncate", "Error removing the replayed spans from the Monocle spool %s: %s", spool_file, e)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        if hasattr(self, 'task_processor') and self.task_processor is not None:
+            self.task_processor.stop()
+        with self._lock:
+            self._disconnect()
+
+    def reinit_after_fork(self) -> None:
+        # the child gets its own connection and spool file
+        super().reinit_after_fork()
+        self._lock = threading.Lock()
+        if self.connection is not None:
+            self.connection.close()
+        self.connection = None
+        self.retry_at = 0.0
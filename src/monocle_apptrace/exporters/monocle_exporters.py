@@ -1,10 +1,11 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import os
 import logging, warnings
 from importlib import import_module
 from opentelemetry.sdk.trace.export import SpanExporter, ConsoleSpanExporter
 from monocle_apptrace.exporters.exporter_processor import LambdaExportTaskProcessor, is_aws_lambda_environment
 from monocle_apptrace.exporters.file_exporter import FileSpanExporter
+from monocle_apptrace.exporters.dedup_exporter import DedupSpanExporter, is_segment_dedup_enabled
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +14,8 @@ monocle_exporters: Dict[str, Any] = {
     "blob": {"module": "monocle_apptrace.exporters.azure.blob_exporter", "class": "AzureBlobSpanExporter"},
     "okahu": {"module": "monocle_apptrace.exporters.okahu.okahu_exporter", "class": "OkahuSpanExporter"},
     "file": {"module": "monocle_apptrace.exporters.file_exporter", "class": "FileSpanExporter"},
+    "routing": {"module": "monocle_apptrace.exporters.routing_exporter", "class": "RoutingSpanExporter"},
+    "local": {"module": "monocle_apptrace.exporters.local.local_exporter", "class": "LocalSpanExporter"},
     "memory": {"module": "opentelemetry.sdk.trace.export.in_memory_span_exporter", "class": "InMemorySpanExporter"},
     "console": {"module": "opentelemetry.sdk.trace.export", "class": "ConsoleSpanExporter"}
 }
@@ -30,29 +33,36 @@ def get_monocle_exporter(exporters_list:str=None) -> List[SpanExporter]:
     task_processor = LambdaExportTaskProcessor() if is_aws_lambda_environment() else None
 
     for exporter_name in exporter_names:
-        exporter_name = exporter_name.strip()
-        try:
-            exporter_class_path = monocle_exporters[exporter_name]
-        except KeyError:
-            warnings.warn(f"Unsupported Monocle span exporter '{exporter_name}', skipping.")
-            continue
-        try:
-            exporter_module = import_module(exporter_class_path["module"])
-            exporter_class = getattr(exporter_module, exporter_class_path["class"])
-            # Pass task_processor to all exporters when in AWS Lambda environment
-            if task_processor is not None and exporter_module.__name__.startswith("monocle_apptrace"):
-                exporters.append(exporter_class(task_processor=task_processor))
-            else:
-                exporters.append(exporter_class())
-        except Exception as ex:
-            warnings.warn(
-                f"Unable to initialize Monocle span exporter '{exporter_name}', error: {ex}. Using ConsoleSpanExporter as a fallback.")
-            exporters.append(ConsoleSpanExporter())
-            continue
+        exporter = create_monocle_exporter(exporter_name.strip(), task_processor)
+        if exporter is not None:
+            exporters.append(exporter)
 
     # If no exporters were created, default to FileSpanExporter
     if not exporters:
         logger.debug("No valid Monocle span exporters configured. Defaulting to FileSpanExporter.")
         exporters.append(FileSpanExporter())
 
+    if is_segment_dedup_enabled():
+        exporters = [DedupSpanExporter(exporter) for exporter in exporters]
     return exporters
+
+def create_monocle_exporter(exporter_name: str, task_processor=None, **kwargs) -> Optional[SpanExporter]:
+    """ Create one exporter by name, kwargs are passed to the Monocle exporters, eg. the key_prefix of a route """
+    try:
+        exporter_class_path = monocle_exporters[exporter_name]
+    except KeyError:
+        warnings.warn(f"Unsupported Monocle span exporter '{exporter_name}', skipping.")
+        return None
+    try:
+        exporter_module = import_module(exporter_class_path["module"])
+        exporter_class = getattr(exporter_module, exporter_class_path["class"])
+        if not exporter_module.__name__.startswith("monocle_apptrace"):
+            return exporter_class()
+        # Pass task_processor to all exporters when in AWS Lambda environment
+        if task_processor is not None:
+            kwargs["task_processor"] = task_processor
+        return exporter_class(**kwargs)
+    except Exception as ex:
+        warnings.warn(
+            f"Unable to initialize Monocle span exporter '{exporter_name}', error: {ex}. Using ConsoleSpanExporter as a fallback.")
+        return ConsoleSpanExporter()
@@ -0,0 +1,137 @@
+"""
+Object keys of the S3 and Blob exporters. With MONOCLE_EXPORT_KEY_PARTITIONS=workflow,date,hour the batches are
+written under Hive style partitions that Athena, DuckDB or Spark prune on, eg.
+
+    tenant_id=acme/workflow=chatbot/date=2025-01-31/hour=09/monocle_trace_2025-01-31__09.15.02_4211-9f2c1a-000042.ndjson
+
+With MONOCLE_EXPORT_MANIFESTS=true each process also writes a manifest of the files it uploaded in each hour, named
+_manifest_<date>T<hour>_<instance>.json in the same partition (the query engines skip the files starting with "_").
+"""
+import datetime
+import json
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from itertools import count
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from opentelemetry.sdk.trace import ReadableSpan
+
+from monocle_apptrace.instrumentation.common.constants import WORKFLOW_NAME
+
+EXPORT_KEY_PARTITIONS_ENV = "MONOCLE_EXPORT_KEY_PARTITIONS"
+EXPORT_MANIFESTS_ENV = "MONOCLE_EXPORT_MANIFESTS"
+
+WORKFLOW_PARTITION = "workflow"
+DATE_PARTITION = "date"
+HOUR_PARTITION = "hour"
+KEY_PARTITIONS = (WORKFLOW_PARTITION, DATE_PARTITION, HOUR_PARTITION)
+UNKNOWN_WORKFLOW = "unknown"
+MANIFEST_PREFIX = "_manifest_"
+# manifests of the past hours kept to merge late uploads, eg. retried ones, into the manifest already written
+MAX_CLOSED_MANIFESTS = 256
+
+def get_key_partitions(partitions: str = None) -> List[str]:
+    partitions = partitions if partitions is not None else os.environ.get(EXPORT_KEY_PARTITIONS_ENV, "")
+    names = [name.strip().lower() for name in partitions.split(",") if name.strip()]
+    unsupported = [name for name in names if name not in KEY_PARTITIONS]
+    if unsupported:
+        raise ValueError(f"Unsupported key partitions {unsupported}, expected some of {', '.join(KEY_PARTITIONS)}")
+    return names
+
+def get_workflow_name(span: ReadableSpan) -> str:
+    # on the span when the tracer provider wasn't created by Monocle, see SpanHandler.set_default_monocle_attributes
+    workflow_name = span.attributes.get(WORKFLOW_NAME) if span.attributes else None
+    if workflow_name is None and span.resource is not None:
+        workflow_name = span.resource.attributes.get(WORKFLOW_NAME)
+    return str(workflow_name or UNKNOWN_WORKFLOW).replace("/", "_")
+
+class ObjectKeyBuilder:
+    """
+    Builds the key of each uploaded batch: key_prefix, the configured partitions, then the file prefix, the time
+    and a name unique to the upload (process id, random process token and sequence number) so that batches
+    uploaded in the same second, by another process or host, don't overwrite each other.
+    Records the uploads of each hour for the manifests when enabled.
+    """
+    def __init__(self, time_format: str, key_prefix: str = "", partitions: str = None, manifests: bool = None):
+        self.time_format = time_format
+        self.key_prefix = key_prefix
+        self.partitions = get_key_partitions(partitions)
+        if manifests is None:
+            manifests = os.environ.get(EXPORT_MANIFESTS_ENV, "false").lower() == "true"
+        self.manifests_enabled = manifests
+        self.reset()
+
+    def reset(self) -> None:
+        """ New instance id and sequence, eg. in the child after os.fork """
+        # a lock held by another thread of the parent at fork is never released in the child
+        self.lock = threading.Lock()
+        self.instance_id = f"{os.getpid()}-{secrets.token_hex(3)}"
+        self.sequence = count(1)
+        # (partition path, date, hour) -> manifest entries, ordered by hour
+        self.manifests: "OrderedDict[Tuple[str, str, str], List[dict]]" = OrderedDict()
+        self.dirty_manifests = set()
+
+    def split_by_workflow(self, spans: Sequence[ReadableSpan]) -> Dict[Optional[str], List[ReadableSpan]]:
+        """ A batch goes to one object per workflow partition """
+        if WORKFLOW_PARTITION not in self.partitions:
+            return {None: list(spans)}
+        batches: Dict[Optional[str], List[ReadableSpan]] = {}
+        for span in spans:
+            batches.setdefault(get_workflow_name(span), []).append(span)
+        return batches
+
+    def get_partition_path(self, workflow_name: Optional[str], utc_now: datetime.datetime) -> str:
+        values = {WORKFLOW_PARTITION: workflow_name or UNKNOWN_WORKFLOW,
+                  DATE_PARTITION: utc_now.strftime("%Y-%m-%d"), HOUR_PARTITION: utc_now.strftime("%H")}
+        return "".join(f"{name}={values[name]}/" for name in self.partitions)
+
+    def get_key(self, file_prefix: str, workflow_name: Optional[str] = None) -> Tuple[str, Tuple[str, str, str]]:
+        """ Returns the object key and the manifest it belongs to """
+        # one UTC time for the file name and the date and hour partitions
+        utc_now = datetime.datetime.now(datetime.timezone.utc)
+        current_time = utc_now.strftime(self.time_format)
+        # a folder in the file prefix, eg. MONOCLE_S3_KEY_PREFIX=traces/monocle_, stays above the partitions
+        folder, _, file_prefix = file_prefix.rpartition("/")
+        partition_path = f"{folder}/" if folder else ""
+        partition_path += self.get_partition_path(workflow_name, utc_now)
+        key = (f"{self.key_prefix}{partition_path}{file_prefix}{current_time}"
+               f"_{self.instance_id}-{next(self.sequence):06d}.ndjson")
+        return key, (partition_path, utc_now.strftime("%Y-%m-%d"), utc_now.strftime("%H"))
+
+    def record_upload(self, manifest: Tuple[str, str, str], key: str, data: str) -> None:
+        if not self.manifests_enabled:
+            return
+        with self.lock:
+            self.manifests.setdefault(manifest, []).append({
+                "key": key, "spans": data.count("\n"), "bytes": len(data.encode("utf-8")),
+                "uploaded": datetime.datetime.now(datetime.timezone.utc).isoformat()})
+            self.dirty_manifests.add(manifest)
+
+    def get_manifest_key(self, manifest: Tuple[str, str, str]) -> str:
+        partition_path, date, hour = manifest
+        return f"{self.key_prefix}{partition_path}{MANIFEST_PREFIX}{date}T{hour}_{self.instance_id}.json"
+
+    def take_manifests(self, closed_only: bool = False) -> List[Tuple[str, str]]:
+        """ (key, body) of the manifests updated since they were last taken, with all the files of their hour.
+            With closed_only, only the manifests of the past hours are taken. """
+        if not self.manifests_enabled:
+            return []
+        current_hour = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d%H")
+        manifests = []
+        with self.lock:
+            closed_manifests = []
+            for manifest, files in self.manifests.items():
+                closed = manifest[1] + manifest[2] < current_hour
+                if manifest in self.dirty_manifests and (closed or not closed_only):
+                    self.dirty_manifests.discard(manifest)
+                    body = {"date": manifest[1], "hour": manifest[2], "instance": self.instance_id,
+                            "spans": sum(entry["spans"] for entry in files), "files": files}
+                    manifests.append((self.get_manifest_key(manifest), json.dumps(body)))
+                if closed and manifest not in self.dirty_manifests:
+                    closed_manifests.append(manifest)
+            # the oldest written manifests of the past hours are forgotten
+            for manifest in closed_manifests[:max(0, len(closed_manifests) - MAX_CLOSED_MANIFESTS)]:
+                del self.manifests[manifest]
+        return manifests
@@ -109,6 +109,14 @@ class OkahuSpanExporter(SpanExporterBase):
             self.session.close()
         self._closed = True
 
+    def reinit_after_fork(self) -> None:
+        # the session's pooled connections are shared with the parent
+        super().reinit_after_fork()
+        if hasattr(self, 'session'):
+            session = requests.Session()
+            session.headers.update(self.session.headers)
+            self.session = session
+
     def force_flush(self, timeout_millis: int = 30000) -> bool:
         return True
 
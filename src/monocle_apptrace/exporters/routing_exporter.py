@@ -0,0 +1,162 @@
+"""
+Routes the spans of each tenant to its own exporters, eg. with MONOCLE_EXPORTER=routing,
+MONOCLE_ROUTE_ATTRIBUTE=scope.tenant_id and MONOCLE_ROUTE_EXPORTERS=s3 the spans of tenant "acme" are uploaded
+under the "tenant_id=acme/" key prefix.
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from monocle_apptrace.exporters.base_exporter import SpanExporterBase
+from monocle_apptrace.exporters.batch_span_processor import MonocleBatchSpanProcessor
+from monocle_apptrace.exporters.exporter_processor import ExportTaskProcessor
+from monocle_apptrace.instrumentation.common.constants import WORKFLOW_NAME
+
+logger = logging.getLogger(__name__)
+
+ROUTE_ATTRIBUTE_ENV = "MONOCLE_ROUTE_ATTRIBUTE"
+ROUTE_EXPORTERS_ENV = "MONOCLE_ROUTE_EXPORTERS"
+ROUTE_MAX_ROUTES_ENV = "MONOCLE_ROUTE_MAX_ROUTES"
+
+DEFAULT_ROUTE_EXPORTERS = "file"
+DEFAULT_MAX_ROUTES = 64
+DEFAULT_ROUTE = "default"
+# traces whose route is remembered for the spans without the route attribute
+MAX_CACHED_TRACES = 4096
+
+def sanitize_route(value) -> str:
+    """ Route values end up in object keys and file names """
+    return re.sub(r"[^A-Za-z0-9._=-]", "_", str(value))[:128] or DEFAULT_ROUTE
+
+class RouteExporterFactory:
+    """ Creates the exporters of a route from the Monocle exporter names, the s3 and blob exporters write under
+        the "<attribute>=<route>/" key prefix, the file exporter adds the route to the file prefix.
+        The other exporters are created unchanged, eg. pass a custom factory to send each tenant to its own Okahu project. """
+    def __init__(self, exporter_names: str, route_attribute: str, task_processor: Optional[ExportTaskProcessor] = None):
+        self.exporter_names = [name.strip() for name in exporter_names.split(",") if name.strip()]
+        self.partition_name = route_attribute.split(".")[-1]
+        self.task_processor = task_processor
+
+    def get_exporter_kwargs(self, exporter_name: str, route: str) -> dict:
+        if exporter_name in ("s3", "blob"):
+            return {"key_prefix": f"{self.partition_name}={route}/"}
+        if exporter_name == "file":
+            return {"file_prefix": f"monocle_trace_{route}_"}
+        return {}
+
+    def __call__(self, route: str) -> List[SpanExporter]:
+        from monocle_apptrace.exporters.monocle_exporters import create_monocle_exporter
+        exporters = []
+        for exporter_name in self.exporter_names:
+            exporter = create_monocle_exporter(exporter_name, self.task_processor, **self.get_exporter_kwargs(exporter_name, route))
+            if exporter is not None:
+                exporters.append(exporter)
+        return exporters
+
+class RoutingSpanExporter(SpanExporterBase):
+    """
+    Partitions each batch by the route attribute of the spans, a span attribute such as "scope.tenant_id"
+    or a resource attribute such as "workflow.name" (the default). Spans without the attribute follow the route
+    of their trace if it was seen, else they go to the "default" route.
+    Each route gets its exporters from exporter_factory(route) when its first span arrives, each exporter is
+    batched by its own MonocleBatchSpanProcessor. At most max_routes routes are kept, the least recently used
+    route is flushed and shut down to make room for a new one.
+    """
+    def __init__(self, exporter_factory: Callable[[str], List[SpanExporter]] = None, route_attribute: str = None,
+                 max_routes: int = None, task_processor: Optional[ExportTaskProcessor] = None):
+        super().__init__()
+        self.route_attribute = route_attribute or os.environ.get(ROUTE_ATTRIBUTE_ENV, WORKFLOW_NAME)
+        self.max_routes = max(1, max_routes or int(os.environ.get(ROUTE_MAX_ROUTES_ENV, DEFAULT_MAX_ROUTES)))
+        self.exporter_factory = exporter_factory or RouteExporterFactory(
+            os.environ.get(ROUTE_EXPORTERS_ENV, DEFAULT_ROUTE_EXPORTERS), self.route_attribute, task_processor)
+        self.routes: "OrderedDict[str, List[MonocleBatchSpanProcessor]]" = OrderedDict()
+        self.trace_routes: "OrderedDict[int, str]" = OrderedDict()
+        self.evicted_routes = 0
+        self.lock = threading.Lock()
+
+    def get_route(self, span: ReadableSpan) -> str:
+        value = span.attributes.get(self.route_attribute) if span.attributes else None
+        if value is None and span.resource is not None:
+            value = span.resource.attributes.get(self.route_attribute)
+        trace_id = span.context.trace_id
+        if value is None:
+            return self.trace_routes.get(trace_id, DEFAULT_ROUTE)
+        route = sanitize_route(value)
+        self.trace_routes[trace_id] = route
+        self.trace_routes.move_to_end(trace_id)
+        if len(self.trace_routes) > MAX_CACHED_TRACES:
+            self.trace_routes.popitem(last=False)
+        return route
+
+    def _create_processors(self, route: str) -> List[MonocleBatchSpanProcessor]:
+        """ Called without the lock held, except in the rare case described in _get_processors,
+            creating the exporters can take network calls, eg. the S3 bucket check """
+        try:
+            exporters = self.exporter_factory(route)
+        except Exception as e:
+            logger.warning(f"Unable to create the exporters of route {route}: {e}")
+            exporters = []
+        return [MonocleBatchSpanProcessor(exporter) for exporter in exporters]
+
+    def _get_processors(self, route: str, created: Dict[str, List[MonocleBatchSpanProcessor]],
+                        stale: List[MonocleBatchSpanProcessor]) -> List[MonocleBatchSpanProcessor]:
+        """ The processors of the route, a new route gets its processors from created. The processors of the routes
+            evicted to make room and the ones created for a route another thread added meanwhile are added to stale """
+        processors = self.routes.get(route)
+        if processors is not None:
+            self.routes.move_to_end(route)
+            stale.extend(created.pop(route, []))
+            return processors
+        while len(self.routes) >= self.max_routes:
+            stale.extend(self.routes.popitem(last=False)[1])
+            self.evicted_routes += 1
+        processors = created.pop(route, None)
+        if processors is None:
+            # evicted by another route of the same batch, only when a batch has more routes than max_routes
+            processors = self._create_processors(route)
+        self.routes[route] = processors
+        return processors
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        partitions: Dict[str, List[ReadableSpan]] = {}
+        created: Dict[str, List[MonocleBatchSpanProcessor]] = {}
+        stale: List[MonocleBatchSpanProcessor] = []
+        with self.lock:
+            for span in spans:
+                partitions.setdefault(self.get_route(span), []).append(span)
+        while True:
+            with self.lock:
+                missing = [route for route in partitions if route not in self.routes and route not in created]
+                if not missing:
+                    for route, route_spans in partitions.items():
+                        for processor in self._get_processors(route, created, stale):
+                            for span in route_spans:
+                                processor.on_end(span)
+                    break
+            # a new route doesn't block the other routes while its exporters are created
+            for route in missing:
+                created[route] = self._create_processors(route)
+        # exports the spans queued for the evicted routes and flushes their exporters, without blocking the other routes
+        for processor in stale:
+            processor.shutdown()
+        return SpanExportResult.SUCCESS
+
+    def get_processors(self) -> List[MonocleBatchSpanProcessor]:
+        with self.lock:
+            return [processor for processors in self.routes.values() for processor in processors]
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return all([processor.force_flush(timeout_millis) for processor in self.get_processors()])
+
+    def shutdown(self) -> None:
+        processors = self.get_processors()
+        with self.lock:
+            self.routes.clear()
+        for processor in processors:
+            processor.shutdown()
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+import weakref
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+
+from opentelemetry.metrics import CallbackOptions, MeterProvider, Observation, get_meter
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.trace import StatusCode
+
+from monocle_apptrace.instrumentation.common.constants import MONOCLE_INSTRUMENTOR
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
+
+diagnostics = get_diagnostics_logger(__name__)
+
+EXPORT_QUEUE_SIZE_ENV = "MONOCLE_EXPORT_QUEUE_SIZE"
+EXPORT_QUEUE_POLICY_ENV = "MONOCLE_EXPORT_QUEUE_POLICY"
+EXPORT_QUEUE_BLOCK_TIMEOUT_ENV = "MONOCLE_EXPORT_QUEUE_BLOCK_TIMEOUT"
+
+DEFAULT_QUEUE_SIZE = 5000
+DEFAULT_BLOCK_TIMEOUT_SECONDS = 1.0
+
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+DROP_BY_PRIORITY = "priority"
+BLOCK = "block"
+QUEUE_POLICIES = (DROP_NEWEST, DROP_OLDEST, DROP_BY_PRIORITY, BLOCK)
+
+# drop reasons
+QUEUE_FULL = "queue_full"
+EVICTED = "evicted"
+BLOCK_TIMEOUT = "block_timeout"
+
+def is_priority_span(span: ReadableSpan) -> bool:
+    """ Error spans and local root spans are kept by the priority policy """
+    return span.status.status_code == StatusCode.ERROR or span.parent is None or span.parent.is_remote
+
+def get_span_type(span: ReadableSpan) -> str:
+    return span.attributes.get("span.type", "unknown") if span.attributes else "unknown"
+
+class SpanRingBuffer:
+    """
+    Bounded span queue with O(1) puts and takes. When full, the policy decides which span is dropped:
+    drop_newest drops the incoming span, drop_oldest evicts the oldest queued span,
+    priority evicts the oldest span that is neither an error nor a root span (or drops the incoming one if all are),
+    block waits up to block_timeout seconds for a consumer on another thread to make room, then drops the incoming span.
+    Dropped spans are counted by (reason, span type).
+    """
+    def __init__(self, capacity: int = DEFAULT_QUEUE_SIZE, policy: str = DROP_NEWEST,
+                 block_timeout: float = DEFAULT_BLOCK_TIMEOUT_SECONDS, name: str = "export_queue"):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unsupported export queue policy '{policy}', expected one of {', '.join(QUEUE_POLICIES)}")
+        self.capacity = max(1, capacity)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.name = name
+        # the priority policy queues the error and root spans apart, the takes merge both queues by end time
+        self.spans: deque = deque()
+        self.priority_spans: deque = deque()
+        self.dropped: Counter = Counter()
+        self.condition = threading.Condition()
+        span_queues.add(self)
+
+    def __len__(self) -> int:
+        return len(self.spans) + len(self.priority_spans)
+
+    def put(self, span: ReadableSpan) -> bool:
+        """ Queue the span, returns False if it was dropped """
+        with self.condition:
+            if len(self) >= self.capacity and not self._make_room(span):
+                return False
+            if self.policy == DROP_BY_PRIORITY and is_priority_span(span):
+                self.priority_spans.append(span)
+            else:
+                self.spans.append(span)
+            return True
+
+    def _make_room(self, span: ReadableSpan) -> bool:
+        if self.policy == DROP_OLDEST:
+            self._record_drop(self._pop_oldest(), EVICTED)
+            return True
+        if self.policy == DROP_BY_PRIORITY:
+            if self.spans:
+                self._record_drop(self.spans.popleft(), EVICTED)
+                return True
+            if is_priority_span(span):
+                self._record_drop(self.priority_spans.popleft(), EVICTED)
+                return True
+        elif self.policy == BLOCK:
+            deadline = time.monotonic() + self.block_timeout
+            while len(self) >= self.capacity:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._record_drop(span, BLOCK_TIMEOUT)
+                    return False
+                self.condition.wait(remaining)
+            return True
+        self._record_drop(span, QUEUE_FULL)
+        return False
+
+    def _pop_oldest(self) -> ReadableSpan:
+        if not self.priority_spans or (self.spans and (self.spans[0].end_time or 0) <= (self.priority_spans[0].end_time or 0)):
+            return self.spans.popleft()
+        return self.priority_spans.popleft()
+
+    def _record_drop(self, span: ReadableSpan, reason: str) -> None:
+        self.dropped[(reason, get_span_type(span))] += 1
+        diagnostics.warning(f"drop_{reason}", "Monocle %s dropped a %s span (%s), %d spans dropped so far",
+                            self.name, get_span_type(span), reason, self.dropped_count())
+
+    def take(self, max_spans: int) -> List[ReadableSpan]:
+        """ Dequeue up to max_spans spans, oldest first """
+        with self.condition:
+            count = min(max_spans, len(self))
+            if not self.priority_spans:
+                batch = [self.spans.popleft() for _ in range(count)]
+            else:
+                batch = [self._pop_oldest() for _ in range(count)]
+            if batch and self.policy == BLOCK:
+                self.condition.notify_all()
+            return batch
+
+    def clear(self) -> None:
+        with self.condition:
+            self.spans.clear()
+            self.priority_spans.clear()
+            self.condition.notify_all()
+
+    def dropped_count(self) -> int:
+        return sum(self.dropped.values())
+
+    def get_dropped(self) -> Dict[Tuple[str, str], int]:
+        return dict(self.dropped)
+
+def new_span_queue(name: str, capacity: int = None, policy: str = None, min_capacity: int = 1) -> SpanRingBuffer:
+    """ Span queue configured with MONOCLE_EXPORT_QUEUE_SIZE, MONOCLE_EXPORT_QUEUE_POLICY and MONOCLE_EXPORT_QUEUE_BLOCK_TIMEOUT """
+    capacity = max(min_capacity, capacity or int(os.environ.get(EXPORT_QUEUE_SIZE_ENV, DEFAULT_QUEUE_SIZE)))
+    block_timeout = float(os.environ.get(EXPORT_QUEUE_BLOCK_TIMEOUT_ENV, DEFAULT_BLOCK_TIMEOUT_SECONDS))
+    policy = policy or os.environ.get(EXPORT_QUEUE_POLICY_ENV, DROP_NEWEST)
+    try:
+        return SpanRingBuffer(capacity, policy, block_timeout, name)
+    except ValueError as e:
+        diagnostics.warning("queue_policy", "%s, using %s", e, DROP_NEWEST)
+        return SpanRingBuffer(capacity, DROP_NEWEST, block_timeout, name)
+
+span_queues = weakref.WeakSet()
+span_queue_metrics_registered = False
+
+def observe_dropped_spans(options: CallbackOptions):
+    for span_queue in list(span_queues):
+        for (reason, span_type), count in list(span_queue.dropped.items()):
+            yield Observation(count, {"queue": span_queue.name, "reason": reason, "span_type": span_type})
+
+def register_span_queue_metrics(meter_provider: MeterProvider = None) -> None:
+    """ Report the spans dropped by the Monocle span queues as the "monocle.spans.dropped" counter, one point per queue, reason and span type """
+    global span_queue_metrics_registered
+    if span_queue_metrics_registered:
+        return
+    span_queue_metrics_registered = True
+    meter = get_meter(MONOCLE_INSTRUMENTOR, meter_provider=meter_provider)
+    meter.create_observable_counter("monocle.spans.dropped", callbacks=[observe_dropped_spans],
+                                    description="Spans dropped by the Monocle span queues, by reason and span type")
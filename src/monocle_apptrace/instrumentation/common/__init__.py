@@ -15,3 +15,8 @@ from .instrumentor import (
     is_valid_trace_id_uuid
 )
 from .utils import MonocleSpanException
+from .switchboard import set_method_switch, reset_method_switches
+from .utils import enable_monocle_tracing, disable_monocle_tracing
+from .utils import get_process_context, attach_process_context, detach_process_context, with_process_context
+from .profiler import enable_profiling, dump_profile
+from .accessor_breaker import get_disabled_accessors
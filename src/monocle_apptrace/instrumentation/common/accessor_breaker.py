@@ -0,0 +1,114 @@
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from opentelemetry.metrics import CallbackOptions, Observation, get_meter
+
+from monocle_apptrace.instrumentation.common.constants import MONOCLE_INSTRUMENTOR
+
+logger = logging.getLogger(__name__)
+
+FAILURE_THRESHOLD_ENV = "MONOCLE_ACCESSOR_FAILURE_THRESHOLD"
+COOLOFF_SECONDS_ENV = "MONOCLE_ACCESSOR_COOLOFF_SECONDS"
+MAX_COOLOFF_SECONDS_ENV = "MONOCLE_ACCESSOR_MAX_COOLOFF_SECONDS"
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLOFF_SECONDS = 30.0
+DEFAULT_MAX_COOLOFF_SECONDS = 3600.0
+
+class AccessorBreaker:
+    """ Failure state of one accessor, open (skipped) until retry_at after threshold consecutive failures """
+    __slots__ = ("entity", "site", "failures", "trips", "retry_at", "last_error")
+
+    def __init__(self, entity: str, site: str):
+        self.entity = entity
+        self.site = site
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = 0.0
+        self.last_error = None
+
+    def is_open(self) -> bool:
+        return self.retry_at > 0 and time.monotonic() < self.retry_at
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = 0.0
+
+class AccessorBreakers:
+    """
+    Tracks accessor failures per (entity, attribute) of the output processors.
+    After threshold consecutive failures the accessor is skipped for a cool-off period, doubled on every trip in a row
+    up to max_cooloff_seconds. Once the cool-off expires the accessor is called again, a success closes the breaker.
+    MonocleSpanException is an error reported by the accessor on purpose and is not counted as a failure.
+    """
+    def __init__(self, threshold: int = DEFAULT_FAILURE_THRESHOLD, cooloff_seconds: float = DEFAULT_COOLOFF_SECONDS,
+                 max_cooloff_seconds: float = DEFAULT_MAX_COOLOFF_SECONDS):
+        self.threshold = threshold
+        self.cooloff_seconds = cooloff_seconds
+        self.max_cooloff_seconds = max_cooloff_seconds
+        # (entity, site) -> breaker, shared by the copies of a method config
+        self.breakers: Dict[Tuple[str, str], AccessorBreaker] = {}
+
+    def get(self, entity: str, site: str) -> Optional[AccessorBreaker]:
+        return self.breakers.get((entity, site))
+
+    def record_failure(self, entity: str, site: str, error: Exception) -> AccessorBreaker:
+        breaker = self.breakers.get((entity, site))
+        if breaker is None:
+            breaker = self.breakers.setdefault((entity, site), AccessorBreaker(entity, site))
+        breaker.failures += 1
+        breaker.last_error = repr(error)
+        # a failure right after a cool-off trips the breaker again with a longer cool-off
+        if breaker.failures >= self.threshold or breaker.trips > 0:
+            cooloff = min(self.cooloff_seconds * (2 ** breaker.trips), self.max_cooloff_seconds)
+            breaker.trips += 1
+            breaker.failures = 0
+            breaker.retry_at = time.monotonic() + cooloff
+            logger.warning("Skipping Monocle accessor %s of %s for %.0fs after repeated failures, last error: %s",
+                           breaker.site, breaker.entity, cooloff, breaker.last_error)
+        return breaker
+
+    def get_disabled_accessors(self) -> List[dict]:
+        return [{"entity": breaker.entity, "site": breaker.site, "trips": breaker.trips,
+                 "retry_in_seconds": breaker.retry_at - time.monotonic(), "last_error": breaker.last_error}
+                for breaker in list(self.breakers.values()) if breaker.is_open()]
+
+    def observe_disabled_accessors(self, options: CallbackOptions):
+        for accessor in self.get_disabled_accessors():
+            yield Observation(1, {"entity": accessor["entity"], "site": accessor["site"], "trips": accessor["trips"]})
+
+    def reset(self) -> None:
+        self.breakers = {}
+
+def configure_accessor_breakers_from_env() -> AccessorBreakers:
+    try:
+        return AccessorBreakers(
+            threshold=int(os.environ.get(FAILURE_THRESHOLD_ENV, DEFAULT_FAILURE_THRESHOLD)),
+            cooloff_seconds=float(os.environ.get(COOLOFF_SECONDS_ENV, DEFAULT_COOLOFF_SECONDS)),
+            max_cooloff_seconds=float(os.environ.get(MAX_COOLOFF_SECONDS_ENV, DEFAULT_MAX_COOLOFF_SECONDS)))
+    except Exception as e:
+        logger.warning("Invalid Monocle accessor breaker settings, using defaults, error: %s", e)
+        return AccessorBreakers()
+
+accessor_breakers = configure_accessor_breakers_from_env()
+breaker_metrics_registered = False
+
+def get_accessor_breakers() -> AccessorBreakers:
+    return accessor_breakers
+
+def get_disabled_accessors() -> List[dict]:
+    """ Accessors currently skipped after repeated failures, with their entity, site, trip count and last error """
+    return accessor_breakers.get_disabled_accessors()
+
+def register_accessor_breaker_metrics(meter_provider=None) -> None:
+    """ Report the disabled accessors as the "monocle.accessor.disabled" gauge, one point per disabled accessor """
+    global breaker_metrics_registered
+    if breaker_metrics_registered:
+        return
+    breaker_metrics_registered = True
+    meter = get_meter(MONOCLE_INSTRUMENTOR, meter_provider=meter_provider)
+    meter.create_observable_gauge("monocle.accessor.disabled", callbacks=[accessor_breakers.observe_disabled_accessors],
+                                  description="Monocle accessors skipped after repeated failures")
@@ -77,16 +77,23 @@ SESSION_PROPERTIES_KEY = "session"
 INFRA_SERVICE_KEY = "infra_service_name"
 META_DATA = 'metadata'
 MONOCLE_SCOPE_NAME_PREFIX = "monocle.scope."
+MONOCLE_SCOPE_ATTRIBUTES_KEY = "monocle.scope_attributes"
 SCOPE_METHOD_LIST = 'MONOCLE_SCOPE_METHODS'
 SCOPE_METHOD_FILE = 'monocle_scopes.json'
 SCOPE_CONFIG_PATH = 'MONOCLE_SCOPE_CONFIG_PATH'
 TRACE_PROPOGATION_URLS = "MONOCLE_TRACE_PROPAGATATION_URLS"
 WORKFLOW_TYPE_KEY = "monocle.workflow_type"
 ADD_NEW_WORKFLOW = "monocle.add_new_workflow"
+FANOUT_LINK_KEY = "monocle.fanout_link"
 WORKFLOW_TYPE_GENERIC = "workflow.generic"
 MONOCLE_SDK_VERSION = "monocle_apptrace.version"
 MONOCLE_SDK_LANGUAGE = "monocle_apptrace.language"
+WORKFLOW_NAME = "workflow.name"
+APP_HOSTING_TYPE = "app_hosting.type"
+APP_HOSTING_NAME = "app_hosting.name"
 MONOCLE_DETECTED_SPAN_ERROR = "monocle_apptrace.detected_span_error"
+# set on the first span of a request when it also carries the workflow entities, see COMPACT_WORKFLOW_SPAN
+MONOCLE_WORKFLOW_ROOT = "monocle_apptrace.workflow_root"
 HTTP_SUCCESS_CODES = ('200', '201', '202', '204', '205', '206')
 CHILD_ERROR_CODE = "child.error.code"
 
@@ -95,3 +102,12 @@ AGENT_PREFIX_KEY = "monocle.agent.prefix"
 INFERENCE_AGENT_DELEGATION = "delegation"
 INFERENCE_TOOL_CALL = "tool_call"
 INFERENCE_COMMUNICATION = "turn"
+
+TRACING_ENABLED = "MONOCLE_TRACING_ENABLED"
+COMPACT_WORKFLOW_SPAN = "MONOCLE_COMPACT_WORKFLOW_SPAN"
+EXECUTOR_CONTEXT_PROPAGATION = "MONOCLE_EXECUTOR_CONTEXT_PROPAGATION"
+
+VECTOR_CAPTURE_MODE = "MONOCLE_VECTOR_CAPTURE"
+VECTOR_CAPTURE_SUMMARY = "summary"
+VECTOR_CAPTURE_FLOAT16 = "float16"
+VECTOR_PREFIX_LENGTH = "MONOCLE_VECTOR_PREFIX_LENGTH"
@@ -0,0 +1,141 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+DIAGNOSTICS_RATE_ENV = "MONOCLE_DIAGNOSTICS_RATE"
+DIAGNOSTICS_BURST_ENV = "MONOCLE_DIAGNOSTICS_BURST"
+DIAGNOSTICS_SUMMARY_SECONDS_ENV = "MONOCLE_DIAGNOSTICS_SUMMARY_SECONDS"
+
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 10
+DEFAULT_SUMMARY_SECONDS = 60.0
+
+# LogRecord attribute carrying the message key, eg. for log handlers that group Monocle diagnostics
+DIAGNOSTIC_KEY_ATTRIBUTE = "monocle_diagnostic"
+
+class DiagnosticCounter:
+    """ Token bucket and counters of one message key """
+    __slots__ = ("tokens", "updated", "count", "suppressed")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+        self.count = 0
+        self.suppressed = 0
+
+class MonocleDiagnostics:
+    """
+    Rate limited channel for Monocle's own warnings and errors, eg. accessors failing on every call under an SDK mismatch.
+    Messages use lazy %-style arguments, formatted by logging only when the level is enabled and the message is emitted.
+    Each (logger, key) pair gets a token bucket of burst messages refilled at rate messages per second,
+    the messages over the limit are counted and summarized at the end of the summary period, by a timer started
+    with the first suppressed message, and at exit.
+    """
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST, summary_seconds: float = DEFAULT_SUMMARY_SECONDS):
+        self.rate = rate
+        self.burst = burst
+        self.summary_seconds = summary_seconds
+        self.counters: Dict[Tuple[str, str], DiagnosticCounter] = {}
+        self.summary_timer: Optional[threading.Timer] = None
+        self.lock = threading.Lock()
+
+    def log(self, logger: logging.Logger, level: int, key: str, msg: str, *args, **kwargs) -> bool:
+        """ Returns True if the message was emitted """
+        if not logger.isEnabledFor(level):
+            return False
+        now = time.monotonic()
+        counter = self.counters.get((logger.name, key))
+        if counter is None:
+            counter = self.counters.setdefault((logger.name, key), DiagnosticCounter(self.burst, now))
+        counter.count += 1
+        counter.tokens = min(self.burst, counter.tokens + (now - counter.updated) * self.rate)
+        counter.updated = now
+        emitted = counter.tokens >= 1
+        if emitted:
+            counter.tokens -= 1
+            extra = kwargs.pop("extra", None) or {}
+            extra[DIAGNOSTIC_KEY_ATTRIBUTE] = key
+            logger.log(level, msg, *args, extra=extra, **kwargs)
+        else:
+            counter.suppressed += 1
+            timer = self.summary_timer
+            # the timer thread of the parent doesn't run in a forked child
+            if timer is None or not timer.is_alive():
+                self.schedule_summary()
+        return emitted
+
+    def schedule_summary(self) -> None:
+        with self.lock:
+            if self.summary_timer is not None and self.summary_timer.is_alive():
+                return
+            self.summary_timer = threading.Timer(self.summary_seconds, self.summarize)
+            self.summary_timer.daemon = True
+            self.summary_timer.start()
+
+    def summarize(self) -> Dict[Tuple[str, str], int]:
+        """ Log and reset the number of suppressed messages per key since the last summary, on the logger of the messages """
+        with self.lock:
+            timer, self.summary_timer = self.summary_timer, None
+            if timer is not None and timer is not threading.current_thread():
+                timer.cancel()
+            suppressed: Dict[str, Dict[str, int]] = {}
+            for (name, key), counter in list(self.counters.items()):
+                if counter.suppressed:
+                    suppressed.setdefault(name, {})[key] = counter.suppressed
+                    counter.suppressed = 0
+        for name, counts in suppressed.items():
+            logging.getLogger(name).warning("Monocle diagnostics suppressed %s", ", ".join(
+                f"{count} '{key}' messages from {name}" for key, count in counts.items()),
+                extra={DIAGNOSTIC_KEY_ATTRIBUTE: "summary"})
+        return {(name, key): count for name, counts in suppressed.items() for key, count in counts.items()}
+
+    def get_counters(self) -> Dict[str, dict]:
+        return {f"{name}:{key}": {"count": counter.count, "suppressed": counter.suppressed}
+                for (name, key), counter in list(self.counters.items())}
+
+    def reset(self) -> None:
+        self.counters = {}
+
+def configure_diagnostics_from_env() -> MonocleDiagnostics:
+    try:
+        return MonocleDiagnostics(
+            rate=float(os.environ.get(DIAGNOSTICS_RATE_ENV, DEFAULT_RATE)),
+            burst=int(os.environ.get(DIAGNOSTICS_BURST_ENV, DEFAULT_BURST)),
+            summary_seconds=float(os.environ.get(DIAGNOSTICS_SUMMARY_SECONDS_ENV, DEFAULT_SUMMARY_SECONDS)))
+    except Exception as e:
+        logging.getLogger(__name__).warning("Invalid Monocle diagnostics settings, using defaults, error: %s", e)
+        return MonocleDiagnostics()
+
+monocle_diagnostics = configure_diagnostics_from_env()
+
+@atexit.register
+def summarize_at_exit() -> None:
+    monocle_diagnostics.summarize()
+
+def get_diagnostics() -> MonocleDiagnostics:
+    return monocle_diagnostics
+
+class DiagnosticsLogger:
+    """ Per module view of the diagnostics channel, eg. diagnostics = get_diagnostics_logger(__name__) """
+    __slots__ = ("logger",)
+
+    def __init__(self, name: str):
+        self.logger = logging.getLogger(name)
+
+    def debug(self, key: str, msg: str, *args, **kwargs) -> bool:
+        return monocle_diagnostics.log(self.logger, logging.DEBUG, key, msg, *args, **kwargs)
+
+    def info(self, key: str, msg: str, *args, **kwargs) -> bool:
+        return monocle_diagnostics.log(self.logger, logging.INFO, key, msg, *args, **kwargs)
+
+    def warning(self, key: str, msg: str, *args, **kwargs) -> bool:
+        return monocle_diagnostics.log(self.logger, logging.WARNING, key, msg, *args, **kwargs)
+
+    def error(self, key: str, msg: str, *args, **kwargs) -> bool:
+        return monocle_diagnostics.log(self.logger, logging.ERROR, key, msg, *args, **kwargs)
+
+def get_diagnostics_logger(name: str) -> DiagnosticsLogger:
+    return DiagnosticsLogger(name)
@@ -1,5 +1,6 @@
 import logging
 import inspect
+import os
 from typing import Collection, Dict, List, Union
 import uuid
 import inspect
@@ -10,11 +11,13 @@ from opentelemetry.instrumentation.utils import unwrap
 from opentelemetry.sdk.trace import TracerProvider, Span
 from opentelemetry.sdk.resources import SERVICE_NAME, Resource
 from opentelemetry.sdk.trace import Span, TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanProcessor
+from opentelemetry.sdk.trace.export import SpanProcessor
 from opentelemetry.sdk.trace.export import SpanExporter
 from opentelemetry.trace import get_tracer
 from wrapt import wrap_function_wrapper
 from monocle_apptrace.exporters.monocle_exporters import get_monocle_exporter
+from monocle_apptrace.exporters.batch_span_processor import MonocleBatchSpanProcessor
+from monocle_apptrace.exporters.span_queue import register_span_queue_metrics
 from monocle_apptrace.instrumentation.common.span_handler import SpanHandler, NonFrameworkSpanHandler
 from monocle_apptrace.instrumentation.common.wrapper_method import (
     DEFAULT_METHODS_LIST,
@@ -23,9 +26,16 @@ from monocle_apptrace.instrumentation.common.wrapper_method import (
 )
 from monocle_apptrace.instrumentation.common.wrapper import scope_wrapper, ascope_wrapper, monocle_wrapper, amonocle_wrapper
 from monocle_apptrace.instrumentation.common.utils import (
+    get_monocle_version,
     load_scopes
 )
-from monocle_apptrace.instrumentation.common.constants import MONOCLE_INSTRUMENTOR
+from monocle_apptrace.instrumentation.common.payload_offload import configure_payload_offload_from_env
+from monocle_apptrace.instrumentation.common.switchboard import configure_switchboard_from_env
+from monocle_apptrace.instrumentation.common.overhead_governor import configure_overhead_governor_from_env, register_overhead_governor_metrics, TimedSpanExporter
+from monocle_apptrace.instrumentation.common.accessor_breaker import register_accessor_breaker_metrics
+from monocle_apptrace.instrumentation.common.profiler import get_profiler, configure_profiler_from_env
+from monocle_apptrace.instrumentation.common.constants import MONOCLE_INSTRUMENTOR, EXECUTOR_CONTEXT_PROPAGATION
+from monocle_apptrace.instrumentation.metamodel.executors.methods import EXECUTOR_METHODS
 from functools import wraps
 
 logger = logging.getLogger(__name__)
@@ -88,18 +98,22 @@ class MonocleInstrumentor(BaseInstrumentor):
     def _instrument(self, **kwargs):
         tracer_provider: TracerProvider = kwargs.get("tracer_provider")
         set_tracer_provider(tracer_provider)
-        tracer = get_tracer(instrumenting_module_name=MONOCLE_INSTRUMENTOR, tracer_provider=tracer_provider)
+        tracer = get_tracer(instrumenting_module_name=MONOCLE_INSTRUMENTOR, instrumenting_library_version=get_monocle_version(), tracer_provider=tracer_provider)
 
         final_method_list = []
         if self.union_with_default_methods is True:
             final_method_list= final_method_list + DEFAULT_METHODS_LIST
 
+        if os.environ.get(EXECUTOR_CONTEXT_PROPAGATION, "false").lower() == "true":
+            final_method_list = final_method_list + EXECUTOR_METHODS
+
         for method in self.user_wrapper_methods:
             if isinstance(method, dict):
                 final_method_list.append(method)
             elif isinstance(method, WrapperMethod):
                 final_method_list.append(method.to_dict())
 
+        profiler = get_profiler()
         for method in load_scopes():
             if method.get('async', False):
                 method['wrapper_method'] = ascope_wrapper
@@ -120,10 +134,13 @@ class MonocleInstrumentor(BaseInstrumentor):
                     logger.warning("incorrect or empty handler falling back to default handler")
                     handler = self.handlers.get('default')
                 handler.set_instrumentor(self.get_instrumentor(tracer))
+                wrap_config = method_config
+                if profiler is not None:
+                    wrap_config, handler = profiler.profile_method(method_config, handler_key, handler)
                 wrap_function_wrapper(
                     target_package,
                     f"{target_object}.{target_method}" if target_object else target_method,
-                    wrapped_by(tracer, handler, method_config),
+                    wrapped_by(tracer, handler, wrap_config),
                 )
                 self.instrumented_method_list.append(method_config)
             except ModuleNotFoundError as e:
@@ -175,7 +192,7 @@ def setup_monocle_telemetry(
         The name of the workflow to be used as the service name in telemetry.
     span_processors : List[SpanProcessor], optional
         Custom span processors to use instead of the default ones. If None, 
-        BatchSpanProcessors with Monocle exporters will be used. This can't be combined with `monocle_exporters_list`.
+        MonocleBatchSpanProcessors with Monocle exporters will be used. This can't be combined with `monocle_exporters_list`.
     span_handlers : Dict[str, SpanHandler], optional
         Dictionary of span handlers to be used by the instrumentor, mapping handler names to handler objects.
     wrapper_methods : List[Union[dict, WrapperMethod]], optional
@@ -188,14 +205,24 @@ def setup_monocle_telemetry(
         Supported exporters are: s3, blob, okahu, file, memory, console. This can't be combined with `span_processors`.
     """
     resource = Resource(attributes={
-        SERVICE_NAME: workflow_name
+        SERVICE_NAME: workflow_name,
+        **SpanHandler.get_monocle_resource_attributes(workflow_name)
     })
     if span_processors and monocle_exporters_list:
         raise ValueError("span_processors and monocle_exporters_list can't be used together")
     exporters:List[SpanExporter] = get_monocle_exporter(monocle_exporters_list)
-    span_processors = span_processors or [BatchSpanProcessor(exporter) for exporter in exporters]
+    overhead_governor = configure_overhead_governor_from_env()
+    if overhead_governor is not None:
+        exporters = [TimedSpanExporter(exporter, overhead_governor) for exporter in exporters]
+    span_processors = span_processors or [MonocleBatchSpanProcessor(exporter) for exporter in exporters]
     set_tracer_provider(TracerProvider(resource=resource))
     attach(set_value("workflow_name", workflow_name))
+    configure_payload_offload_from_env()
+    configure_switchboard_from_env()
+    configure_profiler_from_env()
+    register_accessor_breaker_metrics()
+    register_span_queue_metrics()
+    register_overhead_governor_metrics()
     tracer_provider_default = trace.get_tracer_provider()
     provider_type = type(tracer_provider_default).__name__
     is_proxy_provider = "Proxy" in provider_type
@@ -11,12 +11,14 @@ from contextlib import contextmanager, asynccontextmanager
 from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
 from monocle_apptrace.instrumentation.common.wrapper import atask_wrapper, get_current_monocle_span, set_monocle_span_in_context, task_wrapper
 from monocle_apptrace.instrumentation.common.utils import (
-    set_scope, remove_scope, http_route_handler, http_async_route_handler
+    set_scope, remove_scope, http_route_handler, http_async_route_handler, get_monocle_version
 )
 from monocle_apptrace.instrumentation.common.constants import MONOCLE_INSTRUMENTOR
 from monocle_apptrace.instrumentation.common.instrumentor import get_tracer_provider
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 
 
@@ -44,7 +46,7 @@ def start_trace(
         Exception: The function catches all exceptions internally and logs a warning.
     """
     try:
-        tracer = get_tracer(instrumenting_module_name= MONOCLE_INSTRUMENTOR, tracer_provider= get_tracer_provider())
+        tracer = get_tracer(instrumenting_module_name=MONOCLE_INSTRUMENTOR, instrumenting_library_version=get_monocle_version(), tracer_provider=get_tracer_provider())
         span_name = span_name or "custom_span"
         span = tracer.start_span(name=span_name)
         updated_span_context = set_monocle_span_in_context(span=span)
@@ -60,7 +62,7 @@ def start_trace(
         token = attach(updated_span_context)
         return token
     except Exception as e:
-        logger.warning(f"Failed to start trace: {e}")
+        diagnostics.warning("start_trace", "Failed to start trace: %s", e)
         return None
 
 def stop_trace(
@@ -88,7 +90,7 @@ def stop_trace(
         if token is not None:
             detach(token)
     except Exception as e:
-        logger.warning(f"Failed to stop trace: {e}")
+        diagnostics.warning("stop_trace", "Failed to stop trace: %s", e)
 
 def start_scope(
     scope_name: str, 
@@ -110,7 +112,7 @@ def start_scope(
         token = set_scope(scope_name, scope_value)
         return token
     except Exception as e:
-        logger.warning(f"Failed to start scope: {e}")
+        diagnostics.warning("start_scope", "Failed to start scope: %s", e)
         return None
 
 def stop_scope(
@@ -129,7 +131,7 @@ def stop_scope(
         # Remove the scope
         remove_scope(token)
     except Exception as e:
-        logger.warning(f"Failed to stop scope: {e}")
+        diagnostics.warning("stop_scope", "Failed to stop scope: %s", e)
     return
 
 
@@ -148,7 +150,7 @@ def monocle_trace(
         events: Optional list of events to add to the span at start.
     """
     try:
-        tracer = get_tracer(instrumenting_module_name=MONOCLE_INSTRUMENTOR, tracer_provider=get_tracer_provider())
+        tracer = get_tracer(instrumenting_module_name=MONOCLE_INSTRUMENTOR, instrumenting_library_version=get_monocle_version(), tracer_provider=get_tracer_provider())
         span_name = span_name or "custom_span"
                 
         with tracer.start_as_current_span(span_name) as span:
@@ -167,7 +169,7 @@ def monocle_trace(
 
             
     except Exception as e:
-        logger.warning(f"Failed in monocle_trace: {e}")
+        diagnostics.warning("monocle_trace", "Failed in monocle_trace: %s", e)
         yield  # Still yield to not break the context manager
 
 @asynccontextmanager
@@ -185,7 +187,7 @@ async def amonocle_trace(
         events: Optional list of events to add to the span at start.
     """
     try:
-        tracer = get_tracer(instrumenting_module_name=MONOCLE_INSTRUMENTOR, tracer_provider=get_tracer_provider())
+        tracer = get_tracer(instrumenting_module_name=MONOCLE_INSTRUMENTOR, instrumenting_library_version=get_monocle_version(), tracer_provider=get_tracer_provider())
         span_name = span_name or "custom_span"
 
         with tracer.start_as_current_span(span_name) as span:
@@ -204,7 +206,7 @@ async def amonocle_trace(
                 
             
     except Exception as e:
-        logger.warning(f"Failed in amonocle_trace: {e}")
+        diagnostics.warning("amonocle_trace", "Failed in amonocle_trace: %s", e)
         yield  # Still yield to not break the context manager
 
 @contextmanager
@@ -286,7 +288,7 @@ def monocle_trace_method(
     """
     
     def decorator(func):
-        tracer = get_tracer(instrumenting_module_name=MONOCLE_INSTRUMENTOR, tracer_provider=get_tracer_provider())
+        tracer = get_tracer(instrumenting_module_name=MONOCLE_INSTRUMENTOR, instrumenting_library_version=get_monocle_version(), tracer_provider=get_tracer_provider())
         handler = SpanHandler()
         source_path= func.__code__.co_filename + ":" + str(func.__code__.co_firstlineno)
         # Use function name as span name if not provided
@@ -0,0 +1,173 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional, Sequence
+
+from opentelemetry.metrics import CallbackOptions, MeterProvider, Observation, get_meter
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from monocle_apptrace.instrumentation.common.constants import MONOCLE_INSTRUMENTOR
+
+logger = logging.getLogger(__name__)
+
+OVERHEAD_BUDGET_ENV = "MONOCLE_OVERHEAD_BUDGET"
+OVERHEAD_WINDOW_SECONDS_ENV = "MONOCLE_OVERHEAD_WINDOW_SECONDS"
+OVERHEAD_SAMPLE_RATE_ENV = "MONOCLE_OVERHEAD_SAMPLE_RATE"
+
+DEFAULT_WINDOW_SECONDS = 10.0
+DEFAULT_EVALUATION_SECONDS = 1.0
+DEFAULT_SAMPLE_RATE = 0.1
+# Step back up a level only when the overhead is well under the budget, to avoid flapping between levels
+RECOVERY_RATIO = 0.5
+
+LEVEL_FULL = 0
+LEVEL_NO_EVENTS = 1
+LEVEL_NO_ATTRIBUTES = 2
+LEVEL_SAMPLED = 3
+LEVEL_NAMES = ("full", "no_events", "no_attributes", "sampled")
+# set in the context of a request whose root wasn't traced, the calls it makes aren't traced either, see wrapper.unsampled_scope
+UNSAMPLED_TRACE_KEY = "monocle.overhead.unsampled"
+
+class OverheadGovernor:
+    """
+    Measures the time spent by Monocle (span processing, accessors and exporters) against the wall time of the traced requests.
+    Every evaluation interval the overhead ratio is checked against the budget, eg. 0.02 for 2% of the request time.
+    Over budget, the governor steps down one level: drop span events, then attributes, then sample spans.
+    It steps back up once the ratio stays under half of the budget for a full window at the current level.
+    """
+    def __init__(self, budget: float, window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                 evaluation_seconds: float = DEFAULT_EVALUATION_SECONDS, sample_rate: float = DEFAULT_SAMPLE_RATE):
+        self.budget = budget
+        self.evaluation_ns = int(evaluation_seconds * 1e9)
+        self.sample_rate = sample_rate
+        self.level = LEVEL_FULL
+        self.overhead_ratio = 0.0
+        # (overhead ns, request ns) per evaluation interval at the current level
+        self.intervals = deque(maxlen=max(1, int(window_seconds / evaluation_seconds)))
+        self.overhead_ns = 0
+        self.request_ns = 0
+        self.next_evaluation_ns = time.perf_counter_ns() + self.evaluation_ns
+        self.lock = threading.Lock()
+
+    def record_overhead(self, overhead_ns: int) -> None:
+        with self.lock:
+            self.overhead_ns += overhead_ns
+
+    def record_request(self, request_ns: int) -> None:
+        with self.lock:
+            self.request_ns += request_ns
+        now = time.perf_counter_ns()
+        if now >= self.next_evaluation_ns:
+            self.evaluate(now)
+
+    def evaluate(self, now: int = None) -> int:
+        now = now or time.perf_counter_ns()
+        with self.lock:
+            self.next_evaluation_ns = now + self.evaluation_ns
+            overhead_ns, request_ns = self.overhead_ns, self.request_ns
+            self.overhead_ns = self.request_ns = 0
+            if request_ns <= 0:
+                return self.level
+            self.intervals.append((overhead_ns, request_ns))
+            self.overhead_ratio = overhead_ns / request_ns
+            if self.overhead_ratio > self.budget and self.level < LEVEL_SAMPLED:
+                self.set_level(self.level + 1)
+            elif self.level > LEVEL_FULL and len(self.intervals) == self.intervals.maxlen:
+                window_ratio = sum(interval[0] for interval in self.intervals) / sum(interval[1] for interval in self.intervals)
+                if window_ratio < self.budget * RECOVERY_RATIO:
+                    self.set_level(self.level - 1)
+            return self.level
+
+    def set_level(self, level: int) -> None:
+        logger.debug("Monocle overhead %.4f, budget %.4f, switching to level %s",
+                     self.overhead_ratio, self.budget, LEVEL_NAMES[level])
+        self.level = level
+        self.intervals.clear()
+
+    def apply(self, to_wrap: dict, in_trace: bool = False) -> Optional[dict]:
+        """ Returns the wrapper method to trace the call with at the current level, None if the call isn't sampled.
+            The sampling decision is taken once at the root of the trace, the calls made in a traced request (in_trace)
+            are traced and the calls made in a request that wasn't sampled never get here, see wrapper.apply_tracing_level. """
+        level = self.level
+        if level == LEVEL_FULL:
+            return to_wrap
+        if level == LEVEL_SAMPLED and not in_trace and random.random() >= self.sample_rate:
+            return None
+        output_processor = to_wrap.get("output_processor")
+        if not output_processor:
+            return to_wrap
+        dropped = ("events",) if level == LEVEL_NO_EVENTS else ("events", "attributes")
+        return {**to_wrap, "output_processor": {key: value for key, value in output_processor.items() if key not in dropped}}
+
+    def observe_level(self, options: CallbackOptions):
+        yield Observation(self.level)
+
+    def observe_overhead_ratio(self, options: CallbackOptions):
+        yield Observation(self.overhead_ratio)
+
+class TimedSpanExporter(SpanExporter):
+    """ Adds the export time of the wrapped exporter to the overhead governor """
+    def __init__(self, exporter: SpanExporter, governor: OverheadGovernor):
+        self.exporter = exporter
+        self.governor = governor
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        start = time.perf_counter_ns()
+        try:
+            return self.exporter.export(spans)
+        finally:
+            self.governor.record_overhead(time.perf_counter_ns() - start)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.exporter.force_flush(timeout_millis)
+
+    def shutdown(self) -> None:
+        self.exporter.shutdown()
+
+overhead_governor: Optional[OverheadGovernor] = None
+governor_metrics_registered = False
+
+def observe_level(options: CallbackOptions):
+    if overhead_governor is not None:
+        yield from overhead_governor.observe_level(options)
+
+def observe_overhead_ratio(options: CallbackOptions):
+    if overhead_governor is not None:
+        yield from overhead_governor.observe_overhead_ratio(options)
+
+def set_overhead_governor(governor: Optional[OverheadGovernor]) -> None:
+    """ Set the process wide governor """
+    global overhead_governor
+    overhead_governor = governor
+
+def register_overhead_governor_metrics(meter_provider: MeterProvider = None) -> None:
+    """ Report the level and overhead ratio of the process wide governor as gauges of the meter provider """
+    global governor_metrics_registered
+    if governor_metrics_registered:
+        return
+    governor_metrics_registered = True
+    meter = get_meter(MONOCLE_INSTRUMENTOR, meter_provider=meter_provider)
+    meter.create_observable_gauge("monocle.overhead.level", callbacks=[observe_level],
+                                  description="Monocle degradation level, 0 full, 1 no events, 2 no attributes, 3 sampled")
+    meter.create_observable_gauge("monocle.overhead.ratio", callbacks=[observe_overhead_ratio],
+                                  description="Monocle time as a fraction of the traced request time")
+
+def get_overhead_governor() -> Optional[OverheadGovernor]:
+    return overhead_governor
+
+def configure_overhead_governor_from_env() -> Optional[OverheadGovernor]:
+    budget = float(os.environ.get(OVERHEAD_BUDGET_ENV, 0))
+    if budget <= 0:
+        return None
+    try:
+        set_overhead_governor(OverheadGovernor(
+            budget,
+            window_seconds=float(os.environ.get(OVERHEAD_WINDOW_SECONDS_ENV, DEFAULT_WINDOW_SECONDS)),
+            sample_rate=float(os.environ.get(OVERHEAD_SAMPLE_RATE_ENV, DEFAULT_SAMPLE_RATE))))
+    except Exception as e:
+        logger.warning("Unable to initialize Monocle overhead governor, error: %s", e)
+    return overhead_governor
@@ -0,0 +1,216 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+OFFLOAD_THRESHOLD_ENV = "MONOCLE_OFFLOAD_THRESHOLD_BYTES"
+OFFLOAD_STORE_ENV = "MONOCLE_OFFLOAD_STORE"
+OFFLOAD_PATH_ENV = "MONOCLE_OFFLOAD_PATH"
+OFFLOAD_PREFIX_ENV = "MONOCLE_OFFLOAD_PREFIX"
+OFFLOAD_MAX_WORKERS_ENV = "MONOCLE_OFFLOAD_MAX_WORKERS"
+OFFLOAD_MAX_PENDING_ENV = "MONOCLE_OFFLOAD_MAX_PENDING"
+
+DEFAULT_OFFLOAD_PREFIX = "monocle_payload/"
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_MAX_PENDING = 64
+OFFLOAD_SIZE_SUFFIX = ".size"
+OFFLOAD_HASH_SUFFIX = ".sha256"
+OFFLOAD_TRUNCATED_SUFFIX = ".truncated"
+
+class PayloadStore(ABC):
+
+    @abstractmethod
+    def write(self, key: str, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def uri(self, key: str) -> str:
+        pass
+
+class LocalPayloadStore(PayloadStore):
+    def __init__(self, out_path: str = None):
+        self.out_path = os.path.abspath(out_path or os.getenv(OFFLOAD_PATH_ENV, os.getenv("MONOCLE_TRACE_OUTPUT_PATH", ".")))
+
+    def write(self, key: str, data: bytes) -> None:
+        file_path = os.path.join(self.out_path, key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(data)
+
+    def uri(self, key: str) -> str:
+        return "file://" + os.path.join(self.out_path, key)
+
+class S3PayloadStore(PayloadStore):
+    def __init__(self, bucket_name: str = None, region_name: str = None):
+        import boto3
+        self.bucket_name = bucket_name or os.getenv("MONOCLE_S3_BUCKET_NAME", "default-bucket")
+        self.s3_client = boto3.client(
+            's3',
+            aws_access_key_id=os.getenv('MONOCLE_AWS_ACCESS_KEY_ID', os.getenv('AWS_ACCESS_KEY_ID')),
+            aws_secret_access_key=os.getenv('MONOCLE_AWS_SECRET_ACCESS_KEY', os.getenv('AWS_SECRET_ACCESS_KEY')),
+            region_name=region_name,
+        )
+
+    def write(self, key: str, data: bytes) -> None:
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=data)
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket_name}/{key}"
+
+class AzureBlobPayloadStore(PayloadStore):
+    def __init__(self, connection_string: str = None, container_name: str = None):
+        from azure.storage.blob import BlobServiceClient
+        connection_string = connection_string or os.getenv('MONOCLE_BLOB_CONNECTION_STRING')
+        if not connection_string:
+            raise ValueError("Azure Storage connection string is not provided or set in environment variables.")
+        self.container_name = container_name or os.getenv('MONOCLE_BLOB_CONTAINER_NAME', 'default-container')
+        self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+
+    def write(self, key: str, data: bytes) -> None:
+        blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=key)
+        blob_client.upload_blob(data, overwrite=True)
+
+    def uri(self, key: str) -> str:
+        return f"{self.blob_service_client.url.rstrip('/')}/{self.container_name}/{key}"
+
+class OpenDALPayloadStore(PayloadStore):
+    """ Payload store backed by an OpenDAL operator, eg. OpenDALPayloadStore("s3", bucket="my-bucket", region="us-east-1") """
+    def __init__(self, scheme: str, **operator_config):
+        from opendal import Operator
+        self.scheme = scheme
+        self.location = operator_config.get("bucket") or operator_config.get("container") or ""
+        self.operator = Operator(scheme, **operator_config)
+
+    def write(self, key: str, data: bytes) -> None:
+        self.operator.write(key, data)
+
+    def uri(self, key: str) -> str:
+        return f"{self.scheme}://{self.location}/{key}"
+
+class PayloadOffloader:
+    """ Moves event payloads larger than threshold bytes to a payload store.
+        The event attribute is replaced by the payload URI, with the payload size and sha256 in companion attributes,
+        so the span queue only holds the pointer. Writes run on a dedicated thread pool and at most max_pending writes
+        can be in flight; payloads beyond that are truncated to the threshold instead of blocking the application.
+    """
+    def __init__(self, store: PayloadStore, threshold_bytes: int, key_prefix: str = DEFAULT_OFFLOAD_PREFIX,
+                 max_workers: int = DEFAULT_MAX_WORKERS, max_pending: int = DEFAULT_MAX_PENDING):
+        self.store = store
+        self.threshold_bytes = threshold_bytes
+        self.key_prefix = key_prefix
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="monocle_offload")
+        self.pending = threading.BoundedSemaphore(max_pending)
+
+    def offload_attributes(self, attributes: Dict[str, object]) -> Dict[str, object]:
+        offloaded: Dict[str, object] = None
+        for key, value in attributes.items():
+            if isinstance(value, str):
+                if len(value) <= self.threshold_bytes // 4:
+                    # Can't exceed the threshold even with 4 byte utf-8 characters
+                    continue
+                data = value.encode("utf-8")
+            elif isinstance(value, (list, tuple)) and value and isinstance(value[0], str):
+                if sum(len(item) for item in value if isinstance(item, str)) <= self.threshold_bytes // 4:
+                    continue
+                data = json.dumps(list(value)).encode("utf-8")
+            else:
+                continue
+            if len(data) <= self.threshold_bytes:
+                continue
+            if offloaded is None:
+                offloaded = dict(attributes)
+            offloaded.update(self.offload(key, value, data))
+        return offloaded if offloaded is not None else attributes
+
+    def offload(self, attribute_key: str, value, data: bytes) -> Dict[str, object]:
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.pending.acquire(blocking=False):
+            logger.debug("Payload offload queue is full, truncating %s", attribute_key)
+            truncated = value[:self.threshold_bytes] if isinstance(value, str) else data[:self.threshold_bytes].decode("utf-8", "ignore")
+            return {attribute_key: truncated, attribute_key + OFFLOAD_TRUNCATED_SUFFIX: True,
+                    attribute_key + OFFLOAD_SIZE_SUFFIX: len(data), attribute_key + OFFLOAD_HASH_SUFFIX: digest}
+        object_key = f"{self.key_prefix}{digest}"
+        try:
+            self.executor.submit(self._write, object_key, data)
+        except Exception:
+            self.pending.release()
+            raise
+        return {attribute_key: self.store.uri(object_key), attribute_key + OFFLOAD_SIZE_SUFFIX: len(data),
+                attribute_key + OFFLOAD_HASH_SUFFIX: digest}
+
+    def _write(self, object_key: str, data: bytes) -> None:
+        try:
+            self.store.write(object_key, data)
+        except Exception as e:
+            logger.warning("Failed to offload payload %s: %s", object_key, e)
+        finally:
+            self.pending.release()
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
+
+payload_offloader: Optional[PayloadOffloader] = None
+
+def get_payload_store(store_name: str) -> PayloadStore:
+    if store_name == "file":
+        return LocalPayloadStore()
+    if store_name == "s3":
+        return S3PayloadStore()
+    if store_name == "blob":
+        return AzureBlobPayloadStore()
+    if store_name == "opendal_s3":
+        return OpenDALPayloadStore("s3", root="/", bucket=os.getenv("MONOCLE_S3_BUCKET_NAME", "default-bucket"),
+                                   region=os.getenv("AWS_REGION"), access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                                   secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"))
+    if store_name == "opendal_blob":
+        connection_params = dict(item.split('=', 1) for item in os.getenv('MONOCLE_BLOB_CONNECTION_STRING', '').split(';') if '=' in item)
+        account_name = connection_params.get('AccountName')
+        return OpenDALPayloadStore("azblob", endpoint=f"https://{account_name}.blob.{connection_params.get('EndpointSuffix')}",
+                                   account_name=account_name, account_key=connection_params.get('AccountKey'),
+                                   container=os.getenv('MONOCLE_BLOB_CONTAINER_NAME', 'default-container'))
+    raise ValueError(f"Unsupported Monocle payload store '{store_name}'")
+
+def set_payload_offloader(offloader: Optional[PayloadOffloader]) -> None:
+    global payload_offloader
+    if payload_offloader is not None and payload_offloader is not offloader:
+        payload_offloader.shutdown(wait=False)
+    payload_offloader = offloader
+
+def get_payload_offloader() -> Optional[PayloadOffloader]:
+    return payload_offloader
+
+def configure_payload_offload_from_env() -> Optional[PayloadOffloader]:
+    threshold = int(os.environ.get(OFFLOAD_THRESHOLD_ENV, 0))
+    if threshold <= 0:
+        return None
+    try:
+        store = get_payload_store(os.environ.get(OFFLOAD_STORE_ENV, "file"))
+        set_payload_offloader(PayloadOffloader(
+            store, threshold,
+            key_prefix=os.environ.get(OFFLOAD_PREFIX_ENV, DEFAULT_OFFLOAD_PREFIX),
+            max_workers=int(os.environ.get(OFFLOAD_MAX_WORKERS_ENV, DEFAULT_MAX_WORKERS)),
+            max_pending=int(os.environ.get(OFFLOAD_MAX_PENDING_ENV, DEFAULT_MAX_PENDING))))
+    except Exception as e:
+        logger.warning("Unable to initialize Monocle payload offload, error: %s", e)
+    return payload_offloader
+
+def offload_event_payloads(attributes: Dict[str, object]) -> Dict[str, object]:
+    if payload_offloader is None or not attributes:
+        return attributes
+    try:
+        return payload_offloader.offload_attributes(attributes)
+    except Exception as e:
+        logger.debug("Error offloading event payload: %s", e)
+        return attributes
+
+@atexit.register
+def _shutdown_payload_offloader():
+    if payload_offloader is not None:
+        payload_offloader.shutdown(wait=True)
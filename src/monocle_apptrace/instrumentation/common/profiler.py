@@ -0,0 +1,219 @@
+import atexit
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV = "MONOCLE_PROFILE"
+PROFILE_FILE_ENV = "MONOCLE_PROFILE_FILE"
+
+PROFILED_HANDLER_METHODS = ("pre_tracing", "skip_span", "hydrate_span", "post_tracing")
+
+# Latencies are bucketed by their top 3 significant bits, ie. 4 buckets per power of two (within 25% of the value)
+LINEAR_BUCKETS = 8
+SUB_BUCKETS = 4
+BUCKET_COUNT = LINEAR_BUCKETS + (64 - 3) * SUB_BUCKETS
+
+def bucket_index(elapsed_ns: int) -> int:
+    if elapsed_ns < LINEAR_BUCKETS:
+        return max(elapsed_ns, 0)
+    shift = elapsed_ns.bit_length() - 3
+    return LINEAR_BUCKETS + (shift - 1) * SUB_BUCKETS + (elapsed_ns >> shift) - SUB_BUCKETS
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    if index < LINEAR_BUCKETS:
+        return index, index + 1
+    shift, sub_bucket = divmod(index - LINEAR_BUCKETS, SUB_BUCKETS)
+    shift += 1
+    return (SUB_BUCKETS + sub_bucket) << shift, (SUB_BUCKETS + sub_bucket + 1) << shift
+
+class LatencyHistogram:
+    """ Log-linear latency histogram, recording a call is a couple of integer operations and list increments.
+        Counts are updated without a lock, concurrent calls may rarely lose a count which is fine for profiling. """
+    __slots__ = ("counts", "count", "errors", "total_ns")
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.errors = 0
+        self.total_ns = 0
+
+    def record(self, elapsed_ns: int, error: bool = False) -> None:
+        self.counts[bucket_index(elapsed_ns)] += 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """ Approximate latency in ns at the given quantile, the midpoint of the bucket holding it """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                lower, upper = bucket_bounds(index)
+                return (lower + upper) / 2
+        return 0.0
+
+class ProfiledSpanHandler:
+    """ Times the tracing hooks of a span handler for one wrapped method, everything else goes to the handler """
+    def __init__(self, handler, profiler: "AccessorProfiler", entity: str, handler_name: str):
+        self.handler = handler
+        for method in PROFILED_HANDLER_METHODS:
+            setattr(self, method, profiler.timed(getattr(handler, method), entity, f"{handler_name}.{method}"))
+
+    def __getattr__(self, name):
+        return getattr(self.handler, name)
+
+class AccessorProfiler:
+    """
+    Keeps a latency histogram and an error count per call site: every accessor of the output_processor attributes
+    and events of the wrapped methods, plus the pre_tracing, skip_span, hydrate_span and post_tracing hooks of their span handlers.
+    Call sites are keyed by entity (the span name of the wrapped method) and site, eg. "entity.2.inference_endpoint"
+    or "events.data.input.input".
+    """
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    def get_histogram(self, entity: str, site: str) -> LatencyHistogram:
+        return self.histograms.setdefault((entity, site), LatencyHistogram())
+
+    def timed(self, function, entity: str, site: str):
+        histogram = self.get_histogram(entity, site)
+        perf_counter_ns = time.perf_counter_ns
+        def profiled(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                result = function(*args, **kwargs)
+            except BaseException:
+                histogram.record(perf_counter_ns() - start, True)
+                raise
+            histogram.record(perf_counter_ns() - start)
+            return result
+        return profiled
+
+    def profile_method(self, method_config: dict, handler_name: str, handler) -> Tuple[dict, ProfiledSpanHandler]:
+        """ Returns the wrapper method with timed accessors and the timed span handler to instrument it with """
+        entity = get_entity_name(method_config)
+        output_processor = method_config.get("output_processor")
+        if isinstance(output_processor, dict):
+            method_config = {**method_config, "output_processor": self.profile_output_processor(output_processor, entity)}
+        return method_config, ProfiledSpanHandler(handler, self, entity, handler_name)
+
+    def profile_output_processor(self, output_processor: dict, entity: str) -> dict:
+        output_processor = dict(output_processor)
+        if output_processor.get("attributes"):
+            output_processor["attributes"] = [
+                [self.profile_accessor(processor, entity, f"entity.{index + 1}.{processor.get('attribute')}")
+                 for processor in processors]
+                for index, processors in enumerate(output_processor["attributes"])]
+        if output_processor.get("events"):
+            output_processor["events"] = [
+                {**event, "attributes": [
+                    self.profile_accessor(attribute, entity, f"events.{event.get('name')}.{attribute.get('attribute') or '*'}")
+                    for attribute in event.get("attributes", [])]}
+                for event in output_processor["events"]]
+        return output_processor
+
+    def profile_accessor(self, processor: dict, entity: str, site: str) -> dict:
+        if not isinstance(processor, dict) or not callable(processor.get("accessor")):
+            return processor
+        return {**processor, "accessor": self.timed(processor["accessor"], entity, site)}
+
+    def report(self) -> List[dict]:
+        """ Call sites ranked by the total time spent in them """
+        rows = []
+        for (entity, site), histogram in list(self.histograms.items()):
+            if histogram.count == 0:
+                continue
+            rows.append({
+                "entity": entity,
+                "site": site,
+                "calls": histogram.count,
+                "total_ms": histogram.total_ns / 1e6,
+                "p50_us": histogram.quantile(0.5) / 1e3,
+                "p99_us": histogram.quantile(0.99) / 1e3,
+                "error_rate": histogram.errors / histogram.count,
+            })
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows
+
+    def reset(self) -> None:
+        for histogram in list(self.histograms.values()):
+            histogram.__init__()
+
+def get_entity_name(method_config: dict) -> str:
+    if method_config.get("span_name"):
+        return method_config["span_name"]
+    return ".".join(part for part in (method_config.get("package"), method_config.get("object"), method_config.get("method")) if part)
+
+def format_report(rows: List[dict], top: int = None) -> str:
+    header = ("entity", "site", "calls", "total ms", "p50 us", "p99 us", "errors")
+    lines = [(row["entity"], row["site"], str(row["calls"]), f"{row['total_ms']:.2f}",
+              f"{row['p50_us']:.1f}", f"{row['p99_us']:.1f}", f"{row['error_rate']:.1%}")
+             for row in rows[:top]]
+    widths = [max(len(line[column]) for line in [header] + lines) for column in range(len(header))]
+    return "\n".join("  ".join(value.ljust(width) if column < 2 else value.rjust(width)
+                               for column, (value, width) in enumerate(zip(line, widths)))
+                     for line in [header] + lines)
+
+accessor_profiler: Optional[AccessorProfiler] = None
+
+def get_profiler() -> Optional[AccessorProfiler]:
+    return accessor_profiler
+
+def enable_profiling() -> AccessorProfiler:
+    """ Profile the methods instrumented after this call, eg. before setup_monocle_telemetry """
+    global accessor_profiler
+    if accessor_profiler is None:
+        accessor_profiler = AccessorProfiler()
+    return accessor_profiler
+
+def configure_profiler_from_env() -> Optional[AccessorProfiler]:
+    if os.environ.get(PROFILE_ENV, "false").lower() == "true" or os.environ.get(PROFILE_FILE_ENV):
+        return enable_profiling()
+    return accessor_profiler
+
+def dump_profile(file: TextIO = None, top: int = None) -> List[dict]:
+    """ Print the ranked call site table and return its rows """
+    rows = accessor_profiler.report() if accessor_profiler is not None else []
+    print(format_report(rows, top), file=file or sys.stdout)
+    return rows
+
+def save_profile(path: str) -> None:
+    """ Write the ranked call site rows as json, to be printed with python -m monocle_apptrace.instrumentation.common.profiler """
+    if accessor_profiler is None:
+        return
+    with open(path, "w") as f:
+        json.dump(accessor_profiler.report(), f, indent=2)
+
+@atexit.register
+def _save_profile_on_exit():
+    path = os.environ.get(PROFILE_FILE_ENV)
+    if path and accessor_profiler is not None:
+        try:
+            save_profile(path)
+        except Exception as e:
+            logger.warning("Unable to save Monocle profile to %s, error: %s", path, e)
+
+def main(argv: List[str] = None) -> None:
+    import argparse
+    parser = argparse.ArgumentParser(description="Print the Monocle instrumentation hot paths saved in MONOCLE_PROFILE_FILE")
+    parser.add_argument("profile_file")
+    parser.add_argument("--top", type=int, default=None, help="number of call sites to show")
+    parser.add_argument("--sort", choices=("total_ms", "p50_us", "p99_us", "error_rate", "calls"), default="total_ms")
+    options = parser.parse_args(argv)
+    with open(options.profile_file) as f:
+        rows = json.load(f)
+    rows.sort(key=lambda row: row[options.sort], reverse=True)
+    print(format_report(rows, options.top))
+
+if __name__ == "__main__":
+    main()
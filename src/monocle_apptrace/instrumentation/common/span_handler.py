@@ -8,12 +8,18 @@ from monocle_apptrace.instrumentation.common.constants import (
     QUERY,
     service_name_map,
     service_type_map,
-    MONOCLE_SDK_VERSION, MONOCLE_SDK_LANGUAGE, MONOCLE_DETECTED_SPAN_ERROR
+    MONOCLE_SDK_VERSION, MONOCLE_SDK_LANGUAGE, MONOCLE_DETECTED_SPAN_ERROR,
+    APP_HOSTING_TYPE, APP_HOSTING_NAME, WORKFLOW_NAME, MONOCLE_WORKFLOW_ROOT
 )
-from monocle_apptrace.instrumentation.common.utils import set_attribute, get_scopes, MonocleSpanException, get_monocle_version
+from monocle_apptrace.instrumentation.common.utils import set_attribute, get_scope_attributes, MonocleSpanException, get_monocle_version
+from monocle_apptrace.instrumentation.common.payload_offload import offload_event_payloads
+from monocle_apptrace.instrumentation.common.accessor_breaker import get_accessor_breakers
+from monocle_apptrace.instrumentation.common.profiler import get_entity_name
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 from monocle_apptrace.instrumentation.common.constants import WORKFLOW_TYPE_KEY, WORKFLOW_TYPE_GENERIC, CHILD_ERROR_CODE
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 WORKFLOW_TYPE_MAP = {
     "llama_index.core.agent.workflow": WORKFLOW_TYPE_GENERIC,
@@ -36,6 +42,8 @@ FRAMEWORK_WORKFLOW_LIST = [
     "workflow.litellm",
 ]
 class SpanHandler:
+    # (type, name) of the app hosting service, detected once per process
+    app_hosting_identifier = None
 
     def __init__(self,instrumentor=None):
         self.instrumentor=instrumentor
@@ -73,15 +81,29 @@ class SpanHandler:
 
     @staticmethod
     def set_default_monocle_attributes(span: Span, source_path = "" ):
-        """ Set default monocle attributes for all spans """
+        """ Set default monocle attributes for all spans.
+            The sdk version, language and workflow name are also carried by the resource of the tracer provider created by
+            setup_monocle_telemetry, see get_monocle_resource_attributes. They stay on the span as the file, S3 and Okahu
+            exporters write the spans one by one and their readers take these attributes from the span. """
         span.set_attribute(MONOCLE_SDK_VERSION, get_monocle_version())
         span.set_attribute(MONOCLE_SDK_LANGUAGE, "python")
         span.set_attribute("span_source", source_path)
-        for scope_key, scope_value in get_scopes().items():
-            span.set_attribute(f"scope.{scope_key}", scope_value)
         workflow_name = SpanHandler.get_workflow_name(span=span)
         if workflow_name:
-            span.set_attribute("workflow.name", workflow_name)
+            span.set_attribute(WORKFLOW_NAME, workflow_name)
+        span.set_attributes(get_scope_attributes())
+
+    @staticmethod
+    def get_monocle_resource_attributes(workflow_name: str) -> dict:
+        """ Attributes that are constant for the process and are set once on the tracer provider resource """
+        app_hosting_type, app_hosting_name = SpanHandler.detect_app_hosting_identifier()
+        return {
+            MONOCLE_SDK_VERSION: get_monocle_version(),
+            MONOCLE_SDK_LANGUAGE: "python",
+            WORKFLOW_NAME: workflow_name,
+            APP_HOSTING_TYPE: app_hosting_type,
+            APP_HOSTING_NAME: app_hosting_name,
+        }
 
     @staticmethod
     def set_workflow_properties(span: Span, to_wrap = None):
@@ -89,6 +111,20 @@ class SpanHandler:
         SpanHandler.set_workflow_attributes(to_wrap, span)
         SpanHandler.set_app_hosting_identifier_attribute(span)
 
+    @staticmethod
+    def set_compact_workflow_properties(span: Span, to_wrap = None):
+        """ Set the workflow and app hosting entities on the first span of a request, instead of a separate workflow span """
+        workflow_name = SpanHandler.get_workflow_name(span=span)
+        if workflow_name:
+            span.set_attribute("entity.1.name", workflow_name)
+        span.set_attribute("entity.1.type", SpanHandler.get_workflow_type(to_wrap))
+        SpanHandler.set_app_hosting_identifier_attribute(span)
+        span.set_attribute(MONOCLE_WORKFLOW_ROOT, True)
+
+    @staticmethod
+    def is_workflow_root(span: Span) -> bool:
+        return SpanHandler.is_root_span(span) or (span.attributes is not None and span.attributes.get(MONOCLE_WORKFLOW_ROOT) is True)
+
     @staticmethod
     def set_non_workflow_properties(span: Span, to_wrap = None):
         span.set_attribute("span.type", "generic")
@@ -109,7 +145,7 @@ class SpanHandler:
     def hydrate_attributes(self, to_wrap, wrapped, instance, args, kwargs, result, span:Span, parent_span:Span) -> bool:
         detected_error:bool = False
         span_index = 0
-        if SpanHandler.is_root_span(span):
+        if SpanHandler.is_workflow_root(span):
             span_index = 2 # root span will have workflow and hosting entities pre-populated
         if 'output_processor' in to_wrap and to_wrap["output_processor"] is not None:
             output_processor=to_wrap['output_processor']
@@ -118,6 +154,8 @@ class SpanHandler:
 
             if 'attributes' in output_processor and 'attributes' not in skip_processors:
                 arguments = {"instance":instance, "args":args, "kwargs":kwargs, "result":result, "parent_span":parent_span, "span":span}
+                breakers = get_accessor_breakers()
+                entity_name = get_entity_name(to_wrap)
                 for processors in output_processor["attributes"]:
                     for processor in processors:
                         attribute = processor.get('attribute')
@@ -125,23 +163,29 @@ class SpanHandler:
 
                         if attribute and accessor:
                             attribute_name = f"entity.{span_index+1}.{attribute}"
+                            # skip accessors that keep failing, eg. when the provider version doesn't match the metamodel
+                            breaker = breakers.get(entity_name, attribute_name)
+                            if breaker is not None and breaker.is_open():
+                                continue
                             try:
                                 processor_result = accessor(arguments)
+                                if breaker is not None:
+                                    breaker.record_success()
                                 if processor_result and isinstance(processor_result, (str, list)):
                                     span.set_attribute(attribute_name, processor_result)
                             except MonocleSpanException as e:
                                 span.set_status(StatusCode.ERROR, e.message)
                                 detected_error = True
                             except Exception as e:
-                                logger.debug(f"Error processing accessor: {e}")
+                                breakers.record_failure(entity_name, attribute_name, e)
+                                diagnostics.debug(attribute_name, "Error processing accessor %s: %s", attribute_name, e)
                         else:
-                            logger.debug(f"{' and '.join([key for key in ['attribute', 'accessor'] if not processor.get(key)])} not found or incorrect in entity JSON")
+                            diagnostics.debug("entity_json", "%s not found or incorrect in entity JSON",
+                                              " and ".join([key for key in ['attribute', 'accessor'] if not processor.get(key)]))
                     span_index += 1
 
-        # set scopes as attributes by calling get_scopes()
-        # scopes is a Mapping[str:object], iterate directly with .items()
-        for scope_key, scope_value in get_scopes().items():
-            span.set_attribute(f"scope.{scope_key}", scope_value)
+        # set scopes as attributes, the snapshot is only rebuilt when scopes change
+        span.set_attributes(get_scope_attributes())
         
         if span_index > 0:
             span.set_attribute("entity.count", span_index)
@@ -158,6 +202,8 @@ class SpanHandler:
             # In case of inference.modelapi skip the event processing unless the span has an exception
             if 'events' in output_processor and ('events' not in skip_processors or ex is not None):
                 events = output_processor['events']
+                breakers = get_accessor_breakers()
+                entity_name = get_entity_name(to_wrap)
                 for event in events:
                     event_name = event.get("name")
                     if 'events.'+event_name in skip_processors and ex is None:
@@ -168,8 +214,14 @@ class SpanHandler:
                         attribute_key = attribute.get("attribute")
                         accessor = attribute.get("accessor")
                         if accessor:
+                            site = f"events.{event_name}.{attribute_key or '*'}"
+                            breaker = breakers.get(entity_name, site)
+                            if breaker is not None and breaker.is_open():
+                                continue
                             try:
                                 result = accessor(arguments)
+                                if breaker is not None:
+                                    breaker.record_success()
                                 if result and isinstance(result, dict):
                                     result = dict((key, value) for key, value in result.items() if value is not None)
                                 if result and isinstance(result, (int, str, list, dict)):
@@ -181,7 +233,9 @@ class SpanHandler:
                                 span.set_status(StatusCode.ERROR, e.message)
                                 detected_error = True
                             except Exception as e:
-                                logger.debug(f"Error evaluating accessor for attribute '{attribute_key}': {e}")
+                                breakers.record_failure(entity_name, site, e)
+                                diagnostics.debug(f"events.{event_name}", "Error evaluating accessor for attribute '%s': %s", attribute_key, e)
+                    event_attributes = offload_event_payloads(event_attributes)
                     matching_timestamp = getattr(ret_result, "timestamps", {}).get(event_name, None)
                     if isinstance(matching_timestamp, int):
                         span.add_event(name=event_name, attributes=event_attributes, timestamp=matching_timestamp)
@@ -222,23 +276,31 @@ class SpanHandler:
                     break
         return workflow_type
 
-    def set_app_hosting_identifier_attribute(span):
-        span_index = 2
-        # Search env to indentify the infra service type, if found check env for service name if possible
-        span.set_attribute(f"entity.{span_index}.type", f"app_hosting.generic")
-        span.set_attribute(f"entity.{span_index}.name", "generic")
+    def detect_app_hosting_identifier() -> tuple:
+        """ Search env to indentify the infra service type, if found check env for service name if possible.
+            The result is cached, it's refreshed by setup_monocle_telemetry """
+        app_hosting_type, app_hosting_name = "app_hosting.generic", "generic"
         for type_env, type_name in service_type_map.items():
             if type_env in os.environ:
-                span.set_attribute(f"entity.{span_index}.type", f"app_hosting.{type_name}")
+                app_hosting_type = f"app_hosting.{type_name}"
                 entity_name_env = service_name_map.get(type_name, "unknown")
-                span.set_attribute(f"entity.{span_index}.name", os.environ.get(entity_name_env, "generic"))
+                app_hosting_name = os.environ.get(entity_name_env, "generic")
+        SpanHandler.app_hosting_identifier = (app_hosting_type, app_hosting_name)
+        return SpanHandler.app_hosting_identifier
+
+    @staticmethod
+    def set_app_hosting_identifier_attribute(span):
+        span_index = 2
+        app_hosting_type, app_hosting_name = SpanHandler.app_hosting_identifier or SpanHandler.detect_app_hosting_identifier()
+        span.set_attribute(f"entity.{span_index}.type", app_hosting_type)
+        span.set_attribute(f"entity.{span_index}.name", app_hosting_name)
 
     @staticmethod
     def get_workflow_name(span: Span) -> str:
         try:
             return get_value("workflow_name") or span.resource.attributes.get("service.name")
         except Exception as e:
-            logger.exception(f"Error getting workflow name: {e}")
+            diagnostics.error("workflow_name", "Error getting workflow name: %s", e)
             return None
 
     @staticmethod
@@ -247,7 +309,7 @@ class SpanHandler:
             if curr_span is not None and hasattr(curr_span, "parent") or  curr_span.context.trace_state:
                 return curr_span.parent is None
         except Exception as e:
-            logger.warning(f"Error finding root span: {e}")
+            diagnostics.warning("root_span", "Error finding root span: %s", e)
 
     @staticmethod
     def attach_workflow_type(to_wrap=None, context=None): 
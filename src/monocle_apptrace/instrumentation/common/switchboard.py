@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import random
+import threading
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+SWITCHBOARD_ENV = "MONOCLE_SWITCHBOARD"
+SWITCHBOARD_FILE_ENV = "MONOCLE_SWITCHBOARD_FILE"
+SWITCHBOARD_POLL_SECONDS_ENV = "MONOCLE_SWITCHBOARD_POLL_SECONDS"
+DEFAULT_POLL_SECONDS = 5.0
+
+SwitchKey = Union[str, Tuple[str, str, str]]
+
+class MethodSwitch(NamedTuple):
+    """ Runtime tracing flags of an instrumented method.
+        enabled: False calls the method without any tracing.
+        sample_rate: fraction of the calls that are traced, the others are passed through.
+        events: False creates the span with its attributes but skips the input/output events. """
+    enabled: bool = True
+    sample_rate: float = 1.0
+    events: bool = True
+
+    def is_traced(self) -> bool:
+        return self.enabled and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+
+class Switchboard:
+    """
+    Registry of method switches keyed by (package, object, method) or by the span_name of the wrapper method,
+    eg. {"package": "langchain_core.prompts.base", "object": "BasePromptTemplate", "method": "invoke", "enabled": false}
+    or {"span_name": "http.send", "sample_rate": 0.1}.
+    Updates replace the whole switch map, so a wrapped call always sees a consistent set of switches without locking.
+    """
+    def __init__(self):
+        self.switches: Dict[SwitchKey, MethodSwitch] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_key(target: dict) -> SwitchKey:
+        if target.get("package") or target.get("object") or target.get("method"):
+            return (target.get("package"), target.get("object"), target.get("method"))
+        if target.get("span_name"):
+            return target["span_name"]
+        raise ValueError(f"Monocle switch needs package/object/method or span_name: {target}")
+
+    def lookup(self, to_wrap: dict) -> Optional[MethodSwitch]:
+        switches = self.switches
+        if not switches:
+            return None
+        switch = switches.get((to_wrap.get("package"), to_wrap.get("object"), to_wrap.get("method")))
+        if switch is None and "span_name" in to_wrap:
+            switch = switches.get(to_wrap["span_name"])
+        return switch
+
+    def set(self, target: dict, enabled: bool = None, sample_rate: float = None, events: bool = None) -> MethodSwitch:
+        key = self.get_key(target)
+        with self.lock:
+            switch = self.switches.get(key, MethodSwitch())
+            switch = switch._replace(**{name: value for name, value in
+                                        (("enabled", enabled), ("sample_rate", sample_rate), ("events", events))
+                                        if value is not None})
+            switches = dict(self.switches)
+            switches[key] = switch
+            self.switches = switches
+        return switch
+
+    def remove(self, target: dict) -> None:
+        key = self.get_key(target)
+        with self.lock:
+            switches = dict(self.switches)
+            switches.pop(key, None)
+            self.switches = switches
+
+    def load(self, config: Iterable[dict]) -> None:
+        """ Replace all the switches with the given list of switch definitions """
+        switches: Dict[SwitchKey, MethodSwitch] = {}
+        for entry in config:
+            switches[self.get_key(entry)] = MethodSwitch(enabled=bool(entry.get("enabled", True)),
+                                                         sample_rate=float(entry.get("sample_rate", 1.0)),
+                                                         events=bool(entry.get("events", True)))
+        with self.lock:
+            self.switches = switches
+
+    def reset(self) -> None:
+        with self.lock:
+            self.switches = {}
+
+class SwitchboardFileWatcher:
+    """ Reloads the switchboard when the switch file changes, checked every poll_seconds on a daemon thread """
+    def __init__(self, board: Switchboard, file_path: str, poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.board = board
+        self.file_path = file_path
+        self.poll_seconds = poll_seconds
+        self.last_modified = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="monocle_switchboard", daemon=True)
+
+    def start(self) -> None:
+        self.check()
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def check(self) -> None:
+        try:
+            modified = os.stat(self.file_path).st_mtime_ns
+        except OSError:
+            return
+        if modified == self.last_modified:
+            return
+        self.last_modified = modified
+        try:
+            with open(self.file_path) as f:
+                self.board.load(json.load(f))
+        except Exception as e:
+            logger.warning("Unable to load Monocle switchboard from %s, error: %s", self.file_path, e)
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.poll_seconds):
+            self.check()
+
+switchboard = Switchboard()
+switchboard_watcher: Optional[SwitchboardFileWatcher] = None
+
+def get_switchboard() -> Switchboard:
+    return switchboard
+
+def set_method_switch(target: dict, enabled: bool = None, sample_rate: float = None, events: bool = None) -> MethodSwitch:
+    """ Update the switch of a method, eg. set_method_switch({"span_name": "http.send"}, enabled=False) """
+    return switchboard.set(target, enabled=enabled, sample_rate=sample_rate, events=events)
+
+def reset_method_switches() -> None:
+    switchboard.reset()
+
+def configure_switchboard_from_env() -> Switchboard:
+    global switchboard_watcher
+    try:
+        if os.environ.get(SWITCHBOARD_ENV):
+            switchboard.load(json.loads(os.environ[SWITCHBOARD_ENV]))
+        file_path = os.environ.get(SWITCHBOARD_FILE_ENV)
+        if file_path and (switchboard_watcher is None or switchboard_watcher.file_path != file_path):
+            if switchboard_watcher is not None:
+                switchboard_watcher.stop()
+            switchboard_watcher = SwitchboardFileWatcher(
+                switchboard, file_path, float(os.environ.get(SWITCHBOARD_POLL_SECONDS_ENV, DEFAULT_POLL_SECONDS)))
+            switchboard_watcher.start()
+    except Exception as e:
+        logger.warning("Unable to initialize Monocle switchboard, error: %s", e)
+    return switchboard
+
+def apply_method_switch(to_wrap: dict) -> Optional[dict]:
+    """ Returns the wrapper method to trace the call with, None if the call should be passed through untraced """
+    switch = switchboard.lookup(to_wrap)
+    if switch is None:
+        return to_wrap
+    if not switch.is_traced():
+        return None
+    return to_wrap if switch.events else without_events(to_wrap)
+
+def without_events(to_wrap: dict) -> dict:
+    output_processor = to_wrap.get("output_processor")
+    if not output_processor or "events" not in output_processor:
+        return to_wrap
+    return {**to_wrap, "output_processor": {key: value for key, value in output_processor.items() if key != "events"}}
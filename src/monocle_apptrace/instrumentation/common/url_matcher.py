@@ -0,0 +1,78 @@
+import logging
+import os
+import re
+from typing import Iterable, List, Optional, Union
+from monocle_apptrace.instrumentation.common.constants import TRACE_PROPOGATION_URLS
+
+logger = logging.getLogger(__name__)
+
+# Per pattern flags, eg. MONOCLE_TRACE_PROPAGATATION_URLS="https://*.internal.svc;propagate,https://api.example.com/v1"
+PROPAGATE_AND_SPAN = "span"
+PROPAGATE_ONLY = "propagate"
+URL_FLAGS = (PROPAGATE_AND_SPAN, PROPAGATE_ONLY)
+FLAG_SEPARATOR = ";"
+HOST_WILDCARD = "*"
+
+class UrlMatcher:
+    """
+    Matches outbound request URLs against the configured trace propagation URL prefixes.
+    All patterns are compiled into a single anchored regex, the first matching pattern wins.
+    A "*" in a pattern matches any run of characters up to the next "/", "?" or "#", eg. "https://*.example.com".
+    Each pattern can be suffixed with ";span" (default, create a span and propagate the trace context)
+    or ";propagate" (only inject the trace context headers).
+    """
+    def __init__(self, patterns: Union[str, Iterable[str], None] = None):
+        if patterns is None:
+            patterns = os.environ.get(TRACE_PROPOGATION_URLS, "")
+        if isinstance(patterns, str):
+            patterns = patterns.split(',')
+        self.patterns: List[str] = []
+        self.flags: List[str] = []
+        for pattern in patterns:
+            pattern, flag = self._parse(pattern)
+            if pattern:
+                self.patterns.append(pattern)
+                self.flags.append(flag)
+        self.regex = self._compile(self.patterns)
+
+    @staticmethod
+    def _parse(pattern: str) -> tuple:
+        pattern = pattern.strip()
+        flag = PROPAGATE_AND_SPAN
+        if FLAG_SEPARATOR in pattern:
+            pattern, flag = pattern.rsplit(FLAG_SEPARATOR, 1)
+            pattern, flag = pattern.strip(), flag.strip().lower()
+            if flag not in URL_FLAGS:
+                logger.warning("Unknown trace propagation flag '%s' for %s, using '%s'", flag, pattern, PROPAGATE_AND_SPAN)
+                flag = PROPAGATE_AND_SPAN
+        return pattern, flag
+
+    @staticmethod
+    def _compile(patterns: List[str]):
+        if not patterns:
+            return None
+        alternatives = []
+        for index, pattern in enumerate(patterns):
+            expression = r"[^/?#]*".join(re.escape(part) for part in pattern.split(HOST_WILDCARD))
+            alternatives.append(f"(?P<p{index}>{expression})")
+        return re.compile("|".join(alternatives))
+
+    def match(self, url: str) -> Optional[str]:
+        """ Returns the flag of the first matching pattern, None if the url doesn't match any pattern """
+        if self.regex is None or not url:
+            return None
+        matched = self.regex.match(url)
+        if matched is None:
+            return None
+        return self.flags[int(matched.lastgroup[1:])]
+
+url_matcher = UrlMatcher()
+
+def get_url_matcher() -> UrlMatcher:
+    return url_matcher
+
+def reload_url_matcher(patterns: Union[str, Iterable[str], None] = None) -> UrlMatcher:
+    """ Rebuild the propagation URL matcher, from MONOCLE_TRACE_PROPAGATATION_URLS if no patterns are given """
+    global url_matcher
+    url_matcher = UrlMatcher(patterns)
+    return url_matcher
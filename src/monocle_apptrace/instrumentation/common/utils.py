@@ -1,15 +1,30 @@
 import logging, json
+import multiprocessing
+import multiprocessing.util
 import os
+import math
+import base64
+import struct
+import threading
 import traceback
+import weakref
+from functools import lru_cache, partial, wraps
+from types import MappingProxyType
 from typing import Callable, Generic, Optional, TypeVar, Mapping
 
 from opentelemetry.context import attach, detach, get_current, get_value, set_value, Context
-from opentelemetry.trace import NonRecordingSpan, Span
-from opentelemetry.trace.propagation import _SPAN_KEY
+from opentelemetry import trace
+from opentelemetry.trace import NonRecordingSpan, Span, NoOpTracer, ProxyTracer, set_span_in_context
+from opentelemetry.trace.propagation import _SPAN_KEY, get_current_span
 from opentelemetry.sdk.trace import id_generator, TracerProvider
-from opentelemetry.propagate import extract
+from opentelemetry.propagate import extract, inject
+from opentelemetry.propagators.textmap import Getter, default_getter
 from opentelemetry import baggage
-from monocle_apptrace.instrumentation.common.constants import MONOCLE_SCOPE_NAME_PREFIX, SCOPE_METHOD_FILE, SCOPE_CONFIG_PATH, llm_type_map, MONOCLE_SDK_VERSION, ADD_NEW_WORKFLOW
+from opentelemetry.baggage import _BAGGAGE_KEY
+from monocle_apptrace.instrumentation.common.constants import MONOCLE_SCOPE_NAME_PREFIX, SCOPE_METHOD_FILE, SCOPE_CONFIG_PATH, llm_type_map, MONOCLE_SDK_VERSION, ADD_NEW_WORKFLOW, MONOCLE_SCOPE_ATTRIBUTES_KEY
+from monocle_apptrace.instrumentation.common.constants import TRACING_ENABLED
+from monocle_apptrace.instrumentation.common.constants import VECTOR_CAPTURE_MODE, VECTOR_CAPTURE_SUMMARY, VECTOR_CAPTURE_FLOAT16, VECTOR_PREFIX_LENGTH
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 from importlib.metadata import version
 from opentelemetry.trace.span import INVALID_SPAN
 _MONOCLE_SPAN_KEY = "monocle" + _SPAN_KEY
@@ -18,10 +33,14 @@ T = TypeVar('T')
 U = TypeVar('U')
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 embedding_model_context = {}
 scope_id_generator = id_generator.RandomIdGenerator()
 http_scopes:dict[str:str] = {}
+monocle_tracing_enabled = os.environ.get(TRACING_ENABLED, "true").lower() != "false"
+# process that registered the shutdown of its spans at multiprocessing worker exit
+process_shutdown_pid = None
 
 try:
     monocle_sdk_version = version("monocle_apptrace")
@@ -68,11 +87,34 @@ def dont_throw(func):
 
     return wrapper
 
+def enable_monocle_tracing() -> None:
+    global monocle_tracing_enabled
+    monocle_tracing_enabled = True
+
+def disable_monocle_tracing() -> None:
+    """ Global kill switch, instrumented methods are called without any tracing until tracing is enabled again """
+    global monocle_tracing_enabled
+    monocle_tracing_enabled = False
+
+def is_monocle_tracing_enabled() -> bool:
+    return monocle_tracing_enabled
+
+def is_recording_tracer(tracer) -> bool:
+    """ False if the tracer can't record spans, ie. a no-op tracer or an SDK tracer without any span processor """
+    if type(tracer) is ProxyTracer:
+        tracer = tracer._tracer
+    if type(tracer) is NoOpTracer:
+        return False
+    span_processor = getattr(tracer, "span_processor", None)
+    return span_processor is None or len(getattr(span_processor, "_span_processors", (None,))) > 0
+
 def with_tracer_wrapper(func):
     """Helper for providing tracer for wrapper functions."""
 
     def _with_tracer(tracer, handler, to_wrap):
         def wrapper(wrapped, instance, args, kwargs, source_path=None):
+            if not monocle_tracing_enabled or not is_recording_tracer(tracer):
+                return wrapped(*args, **kwargs)
             try:
                 # get and log the parent span context if injected by the application
                 # This is useful for debugging and tracing of Azure functions
@@ -200,10 +242,29 @@ def set_scopes(scopes:dict[str, object], baggage_context:Context = None) -> obje
         if scope_value is None:
             scope_value = __generate_scope_id()
         baggage_context = baggage.set_baggage(f"{MONOCLE_SCOPE_NAME_PREFIX}{scope_name}", scope_value, baggage_context)
-        
+    baggage_context = set_value(MONOCLE_SCOPE_ATTRIBUTES_KEY, __build_scope_attributes(baggage_context), baggage_context)
     token:object = attach(baggage_context)
     return token
 
+def __build_scope_attributes(context:Context = None) -> tuple:
+    """ Snapshot of the scopes in the baggage as span attributes, with the baggage it was built from """
+    baggage_map = get_value(_BAGGAGE_KEY, context)
+    attributes = {}
+    if baggage_map:
+        for key, val in baggage_map.items():
+            if key.startswith(MONOCLE_SCOPE_NAME_PREFIX):
+                attributes[f"scope.{key[len(MONOCLE_SCOPE_NAME_PREFIX):]}"] = val
+    return (baggage_map, MappingProxyType(attributes))
+
+def get_scope_attributes() -> Mapping[str, object]:
+    """ Active scopes as pre-prefixed span attributes ("scope.<name>": value).
+        The snapshot is rebuilt by set_scopes, remove_scopes restores the previous one with the context.
+        If the baggage was replaced outside of set_scopes (eg. extracted from headers) it's rebuilt here. """
+    snapshot = get_value(MONOCLE_SCOPE_ATTRIBUTES_KEY)
+    if snapshot is None or snapshot[0] is not get_value(_BAGGAGE_KEY):
+        snapshot = __build_scope_attributes()
+    return snapshot[1]
+
 def remove_scope(token:object) -> None:
     remove_scopes(token)
 
@@ -238,14 +299,22 @@ def get_parent_span() -> Span:
         parent_span = _parent_span_context.get(_SPAN_KEY, None)    
     return parent_span
 
-def extract_http_headers(headers) -> object:
+def extract_http_headers(headers, getter:Getter = default_getter, monocle_parent: bool = False) -> object:
+    """ Extract trace context and configured http scopes from request headers.
+        The getter reads a header from the carrier, eg. a WSGI environ getter avoids building a headers dict per request.
+        With monocle_parent the incoming remote span is also the parent of the isolated monocle spans, eg. for the ASGI middleware """
     global http_scopes
-    trace_context:Context = extract(headers, context=get_current())
+    trace_context:Context = extract(headers, context=get_current(), getter=getter)
+    if monocle_parent:
+        remote_span = get_current_span(trace_context)
+        if remote_span.get_span_context().is_valid:
+            trace_context = set_monocle_span_in_context(remote_span, trace_context)
     trace_context = set_value(ADD_NEW_WORKFLOW, True, trace_context)
     imported_scope:dict[str, object] = {}
     for http_header, http_scope in http_scopes.items():
-        if http_header in headers:
-            imported_scope[http_scope] = f"{http_header}: {headers[http_header]}"
+        header_values = getter.get(headers, http_header)
+        if header_values:
+            imported_scope[http_scope] = f"{http_header}: {header_values[0]}"
     token = set_scopes(imported_scope, trace_context)
     return token
 
@@ -253,6 +322,65 @@ def clear_http_scopes(token:object) -> None:
     global http_scopes
     remove_scopes(token)
 
+def get_process_context() -> dict[str, str]:
+    """ Serialize the current trace context and scopes (as W3C trace context and baggage) to pass to another process """
+    carrier:dict[str, str] = {}
+    span = get_current_monocle_span()
+    inject(carrier, context=set_span_in_context(span) if span.get_span_context().is_valid else None)
+    return carrier
+
+def attach_process_context(carrier:dict[str, str]) -> object:
+    """ Restore the trace context and scopes serialized by get_process_context, the next span starts a workflow of this process """
+    context:Context = extract(carrier or {})
+    remote_span = get_current_span(context)
+    if remote_span.get_span_context().is_valid:
+        context = set_monocle_span_in_context(remote_span, context)
+    context = set_value(ADD_NEW_WORKFLOW, True, context)
+    return attach(context)
+
+def detach_process_context(token:object) -> None:
+    if token is not None:
+        detach(token)
+
+def run_with_process_context(carrier:dict[str, str], fn, *args, **kwargs):
+    """ Run fn in the restored context. In a multiprocessing worker the spans are flushed after each task,
+        the pool may terminate the worker without running its exit handlers.
+        Workers started with the spawn or forkserver start methods don't inherit the Monocle setup of the parent,
+        call setup_monocle_telemetry in the pool initializer to trace them. """
+    token = attach_process_context(carrier)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        detach_process_context(token)
+        if multiprocessing.parent_process() is not None:
+            register_process_shutdown()
+            flush_process_spans()
+
+def flush_process_spans(shutdown:bool = False) -> None:
+    tracer_provider = trace.get_tracer_provider()
+    try:
+        if shutdown and hasattr(tracer_provider, "shutdown"):
+            tracer_provider.shutdown()
+        elif hasattr(tracer_provider, "force_flush"):
+            tracer_provider.force_flush()
+    except Exception as e:
+        diagnostics.warning("flush_process_spans", "Error flushing spans of process %d: %s", os.getpid(), e)
+
+def register_process_shutdown() -> None:
+    """ multiprocessing workers exit without the atexit handlers, shut the tracer provider down with the worker's finalizers """
+    global process_shutdown_pid
+    if process_shutdown_pid != os.getpid():
+        process_shutdown_pid = os.getpid()
+        if not isinstance(trace.get_tracer_provider(), TracerProvider):
+            diagnostics.warning("process_not_set_up", "Monocle isn't set up in worker process %d, its spans are not recorded. "
+                                "Call setup_monocle_telemetry in the pool initializer when the workers are spawned.", os.getpid())
+        multiprocessing.util.Finalize(None, flush_process_spans, kwargs={"shutdown": True}, exitpriority=0)
+
+def with_process_context(fn):
+    """ Bind the current trace context and scopes to fn for a task of another process,
+        eg. pool.map(with_process_context(embed), texts). Picklable if fn is. """
+    return partial(run_with_process_context, get_process_context(), fn)
+
 def http_route_handler(func, *args, **kwargs):
     if 'req' in kwargs and hasattr(kwargs['req'], 'headers'):
         headers = kwargs['req'].headers
@@ -325,6 +453,43 @@ def add_monocle_trace_state(headers:dict[str:str]) -> None:
     else:
         headers['tracestate'] = monocle_trace_state
 
+vector_capture_mode = os.environ.get(VECTOR_CAPTURE_MODE, VECTOR_CAPTURE_SUMMARY).lower()
+vector_prefix_length = int(os.environ.get(VECTOR_PREFIX_LENGTH, 8))
+
+def format_vector(vector) -> str:
+    """
+    Compact representation of an embedding vector for span events. The full vector is never formatted as text.
+    In summary mode (default) only dimension, norm, dtype and a short prefix are recorded.
+    With MONOCLE_VECTOR_CAPTURE=float16 the vector is packed as little endian float16 and base64 encoded.
+    """
+    if vector is None:
+        return None
+    if isinstance(vector, (str, bytes)):
+        # Embeddings requested with encoding_format=base64 are already packed
+        return get_json_dumps({"dimension": None, "dtype": "base64", "length": len(vector)})
+    dimension = len(vector)
+    if hasattr(vector, "dtype"):
+        dtype = str(vector.dtype)
+        norm = float(math.sqrt(float((vector * vector).sum()))) if dimension else 0.0
+        values = vector.tolist() if vector_capture_mode == VECTOR_CAPTURE_FLOAT16 else [float(v) for v in vector[:vector_prefix_length]]
+    else:
+        dtype = type(vector[0]).__name__ if dimension else "float"
+        norm = math.hypot(*vector) if dimension else 0.0
+        values = vector
+    summary = {"dimension": dimension, "norm": round(norm, 6), "dtype": dtype}
+    if vector_capture_mode == VECTOR_CAPTURE_FLOAT16:
+        try:
+            summary["dtype"] = "float16"
+            summary["encoding"] = "base64"
+            summary["array"] = base64.b64encode(struct.pack(f"<{dimension}e", *values)).decode("ascii")
+            return get_json_dumps(summary)
+        except (OverflowError, struct.error) as e:
+            logger.debug("Unable to pack vector as float16, falling back to summary: %s", e)
+            summary["dtype"] = dtype
+            summary.pop("encoding", None)
+    summary["prefix"] = [round(float(v), 6) for v in values[:vector_prefix_length]]
+    return get_json_dumps(summary)
+
 def get_json_dumps(obj) -> str:
     try:
         return json.dumps(obj)
@@ -363,13 +528,102 @@ def try_option(func: Callable[..., T], *args, **kwargs) -> Option[T]:
 
 def get_llm_type(instance):
     try:
-        t_name = type(instance).__name__.lower()
-        t_name = t_name.replace("async", "") if "async" in t_name else t_name
-        llm_type = llm_type_map.get(t_name)
-        return llm_type
+        return _get_llm_type_for_class(type(instance))
     except:
         pass
 
+@lru_cache(maxsize=256)
+def _get_llm_type_for_class(instance_type) -> Optional[str]:
+    t_name = instance_type.__name__.lower()
+    t_name = t_name.replace("async", "") if "async" in t_name else t_name
+    return llm_type_map.get(t_name)
+
+def _get_attribute_path(instance, path: str):
+    for name in path.split("."):
+        instance = getattr(instance, name, None)
+        if instance is None:
+            break
+    return instance
+
+def _watch_value(value):
+    """ A weak reference to the watched value, or the value itself if it can't be weakly referenced (eg. a str).
+        Ids alone can't be compared, a new value can reuse the address of a collected one. """
+    try:
+        return weakref.ref(value)
+    except TypeError:
+        return value
+
+def _is_watched_value(watched, value) -> bool:
+    if isinstance(watched, weakref.ref):
+        return watched() is value
+    try:
+        return watched is value or bool(watched == value)
+    except Exception:
+        return False
+
+class InstanceAttributeCache:
+    """
+    Per client instance cache of derived entity attributes like provider name, endpoint and inference type.
+    Entries are keyed by the instance identity and dropped when the instance is garbage collected. Most framework
+    clients are pydantic models which are not hashable, so a WeakKeyDictionary can't be used directly.
+    A cached value is recomputed when the value at any of its watched attribute paths changes, the paths must
+    reach what the helper reads (eg. "_client.base_url", not "_client").
+    """
+    def __init__(self):
+        self._entries = {}
+        # reentrant, a collection triggered by an allocation under the lock runs the removers in the same thread
+        self._lock = threading.RLock()
+
+    def get(self, instance, name: str, compute: Callable, watched=()):
+        values = [_get_attribute_path(instance, path) for path in watched]
+        entry = self._entries.get(id(instance))
+        if entry is not None and entry[0]() is instance:
+            cached = entry[1].get(name)
+            if cached is not None and all(_is_watched_value(watched_value, value)
+                                          for watched_value, value in zip(cached[0], values)):
+                return cached[1]
+        version = tuple(_watch_value(value) for value in values)
+        value = compute(instance)
+        try:
+            with self._lock:
+                entry = self._entries.get(id(instance))
+                if entry is None or entry[0]() is not instance:
+                    entry = (weakref.ref(instance, self._remover(id(instance))), {})
+                    self._entries[id(instance)] = entry
+                entry[1][name] = (version, value)
+        except TypeError:
+            # instance doesn't support weak references, don't cache
+            pass
+        return value
+
+    def _remover(self, key: int):
+        def remove(ref):
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] is ref:
+                    del self._entries[key]
+        return remove
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+instance_attribute_cache = InstanceAttributeCache()
+
+def cached_instance_attribute(*watched: str):
+    """
+    Decorator for helpers that derive an entity attribute only from the client instance.
+    The result is cached per instance until the value at one of the watched attribute paths (eg. "_client.base_url") changes,
+    watch every path the helper reads.
+    """
+    def decorator(func):
+        name = func.__module__ + "." + func.__qualname__
+        @wraps(func)
+        def wrapper(instance):
+            return instance_attribute_cache.get(instance, name, func, watched)
+        return wrapper
+    return decorator
+
 def get_status(arguments):
     if arguments['exception'] is not None:
         return 'error'
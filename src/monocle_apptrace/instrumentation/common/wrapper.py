@@ -1,6 +1,7 @@
 # pylint: disable=protected-access
 from contextlib import contextmanager
 import os
+import time
 from typing import AsyncGenerator, Iterator, Optional
 import logging
 from opentelemetry.trace import Tracer
@@ -20,9 +21,52 @@ from monocle_apptrace.instrumentation.common.utils import (
     get_current_monocle_span,
     set_monocle_span_in_context
 )
-from monocle_apptrace.instrumentation.common.constants import WORKFLOW_TYPE_KEY, ADD_NEW_WORKFLOW
+from monocle_apptrace.instrumentation.common.constants import WORKFLOW_TYPE_KEY, ADD_NEW_WORKFLOW, COMPACT_WORKFLOW_SPAN, FANOUT_LINK_KEY
+from monocle_apptrace.instrumentation.common.switchboard import apply_method_switch
+from monocle_apptrace.instrumentation.common.overhead_governor import UNSAMPLED_TRACE_KEY, OverheadGovernor, get_overhead_governor
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 ISOLATE_MONOCLE_SPANS = os.getenv("MONOCLE_ISOLATE_SPANS", "true").lower() == "true"
+# Record the workflow entities on the first span of a request instead of opening a separate workflow span
+COMPACT_WORKFLOW_SPANS = os.getenv(COMPACT_WORKFLOW_SPAN, "false").lower() == "true"
+
+def is_workflow_span(span, add_workflow_span: bool) -> bool:
+    """ True if the span is the separate workflow span of a request, the real call then runs in a child span """
+    return not COMPACT_WORKFLOW_SPANS and (SpanHandler.is_root_span(span) or add_workflow_span)
+
+def get_monocle_parent_span() -> Span:
+    """ The span the next Monocle span will be the child of """
+    return get_current_monocle_span() if ISOLATE_MONOCLE_SPANS else get_current_span()
+
+def in_monocle_trace() -> bool:
+    """ True if the call is made in a span traced by Monocle """
+    return get_monocle_parent_span().is_recording()
+
+def apply_tracing_level(to_wrap) -> Optional[dict]:
+    """ Apply the method switch and the overhead governor level, None if the call should not be traced.
+        The calls made in a request whose root wasn't traced aren't traced either, see unsampled_scope """
+    in_trace = in_monocle_trace()
+    if not in_trace and get_value(UNSAMPLED_TRACE_KEY):
+        return None
+    to_wrap = apply_method_switch(to_wrap)
+    governor = get_overhead_governor()
+    if to_wrap is not None and governor is not None:
+        to_wrap = governor.apply(to_wrap, in_trace)
+    return to_wrap
+
+@contextmanager
+def unsampled_scope():
+    """ Runs a call that isn't traced. If it's the root of a request, sampled out or switched off by the switchboard
+        or the overhead governor, the calls it makes aren't traced either instead of starting new traces. """
+    if get_value(UNSAMPLED_TRACE_KEY) or in_monocle_trace():
+        yield
+        return
+    token = attach(set_value(UNSAMPLED_TRACE_KEY, True))
+    try:
+        yield
+    finally:
+        detach(token)
 
 def get_auto_close_span(to_wrap, kwargs):
     try:
@@ -30,34 +74,36 @@ def get_auto_close_span(to_wrap, kwargs):
             return to_wrap.get("output_processor").get("is_auto_close")(kwargs)
         return True
     except Exception as e:
-        logger.warning("Warning: Error occurred in get_auto_close_span: %s", str(e))
+        diagnostics.warning("get_auto_close_span", "Error occurred in get_auto_close_span: %s", e)
         return True
 
 def pre_process_span(name, tracer, handler, add_workflow_span, to_wrap, wrapped, instance, args, kwargs, span, source_path):
     SpanHandler.set_default_monocle_attributes(span, source_path)
-    if SpanHandler.is_root_span(span) or add_workflow_span:
+    if is_workflow_span(span, add_workflow_span):
         # This is a direct API call of a non-framework type
         SpanHandler.set_workflow_properties(span, to_wrap)
     else:
+        if SpanHandler.is_root_span(span) or add_workflow_span:
+            SpanHandler.set_compact_workflow_properties(span, to_wrap)
         SpanHandler.set_non_workflow_properties(span)
         try:
             handler.pre_task_processing(to_wrap, wrapped, instance, args, kwargs, span)
         except Exception as e:
-            logger.info(f"Warning: Error occurred in pre_task_processing: {e}")
+            diagnostics.info("pre_task_processing", "Error occurred in pre_task_processing: %s", e)
 
 def post_process_span(handler, to_wrap, wrapped, instance, args, kwargs, return_value, span, parent_span, ex):
-    if not (SpanHandler.is_root_span(span) or get_value(ADD_NEW_WORKFLOW) == True):
+    if not is_workflow_span(span, get_value(ADD_NEW_WORKFLOW) == True):
         try:
             if parent_span == INVALID_SPAN:
                 parent_span = None
             handler.hydrate_span(to_wrap, wrapped, instance, args, kwargs, return_value, span, parent_span, ex)
         except Exception as e:
-            logger.info(f"Warning: Error occurred in hydrate_span: {e}")
+            diagnostics.info("hydrate_span", "Error occurred in hydrate_span: %s", e)
         
         try:
             handler.post_task_processing(to_wrap, wrapped, instance, args, kwargs, return_value, ex, span, parent_span)
         except Exception as e:
-            logger.info(f"Warning: Error occurred in post_task_processing: {e}")
+            diagnostics.info("post_task_processing", "Error occurred in post_task_processing: %s", e)
 
 def get_span_name(to_wrap, instance):
     if to_wrap.get("span_name"):
@@ -66,6 +112,13 @@ def get_span_name(to_wrap, instance):
         name = to_wrap.get("package", "") + "." + to_wrap.get("object", "") + "." + to_wrap.get("method", "")
     return name
 
+def record_overhead(governor: OverheadGovernor, is_request: bool, start_ns: int, call_ns: int) -> None:
+    elapsed_ns = time.perf_counter_ns() - start_ns
+    if is_request:
+        governor.record_request(elapsed_ns)
+    if call_ns:
+        governor.record_overhead(elapsed_ns - call_ns)
+
 def monocle_wrapper_span_processor(tracer: Tracer, handler: SpanHandler, to_wrap, wrapped, instance, source_path, add_workflow_span, args, kwargs):
     # Main span processing logic
     name = get_span_name(to_wrap, instance)
@@ -73,10 +126,13 @@ def monocle_wrapper_span_processor(tracer: Tracer, handler: SpanHandler, to_wrap
     span_status = None
     auto_close_span = get_auto_close_span(to_wrap, kwargs)
     parent_span = get_current_monocle_span()
+    start_ns = time.perf_counter_ns()
+    call_ns = 0
     with start_as_monocle_span(tracer, name, auto_close_span) as span:
         pre_process_span(name, tracer, handler, add_workflow_span, to_wrap, wrapped, instance, args, kwargs, span, source_path)
         
-        if SpanHandler.is_root_span(span) or add_workflow_span:
+        is_request = SpanHandler.is_root_span(span) or add_workflow_span
+        if is_workflow_span(span, add_workflow_span):
             # Recursive call for the actual span
             return_value, span_status = monocle_wrapper_span_processor(tracer, handler, to_wrap, wrapped, instance, source_path, False, args, kwargs)
             span.set_status(span_status)
@@ -84,6 +140,7 @@ def monocle_wrapper_span_processor(tracer: Tracer, handler: SpanHandler, to_wrap
                 span.end()
         else:
             ex:Exception = None
+            call_start_ns = time.perf_counter_ns()
             try:
                 with SpanHandler.workflow_type(to_wrap, span):
                     return_value = wrapped(*args, **kwargs)
@@ -91,6 +148,7 @@ def monocle_wrapper_span_processor(tracer: Tracer, handler: SpanHandler, to_wrap
                 ex = e
                 raise
             finally:
+                call_ns = time.perf_counter_ns() - call_start_ns
                 def post_process_span_internal(ret_val):
                     post_process_span(handler, to_wrap, wrapped, instance, args, kwargs, ret_val, span, parent_span ,ex)
                     if not auto_close_span:
@@ -100,9 +158,17 @@ def monocle_wrapper_span_processor(tracer: Tracer, handler: SpanHandler, to_wrap
                 else:
                     post_process_span_internal(return_value)
             span_status = span.status
+    governor = get_overhead_governor()
+    if governor is not None:
+        record_overhead(governor, is_request, start_ns, call_ns)
     return return_value, span_status
 
 def monocle_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap, wrapped, instance, source_path, args, kwargs):
+    traced_to_wrap = apply_tracing_level(to_wrap)
+    if traced_to_wrap is None:
+        with unsampled_scope():
+            return wrapped(*args, **kwargs)
+    to_wrap = traced_to_wrap
     return_value = None
     pre_trace_token = None
     token = None
@@ -110,7 +176,7 @@ def monocle_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap, wrapped, inst
         try:
             pre_trace_token = handler.pre_tracing(to_wrap, wrapped, instance, args, kwargs)
         except Exception as e:
-            logger.info(f"Warning: Error occurred in pre_tracing: {e}")
+            diagnostics.info("pre_tracing", "Error occurred in pre_tracing: %s", e)
         if to_wrap.get('skip_span', False) or handler.skip_span(to_wrap, wrapped, instance, args, kwargs):
             return_value = wrapped(*args, **kwargs)
         else:
@@ -125,7 +191,7 @@ def monocle_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap, wrapped, inst
         try:
             handler.post_tracing(to_wrap, wrapped, instance, args, kwargs, return_value, token=pre_trace_token)
         except Exception as e:
-            logger.info(f"Warning: Error occurred in post_tracing: {e}")
+            diagnostics.info("post_tracing", "Error occurred in post_tracing: %s", e)
 
 async def amonocle_wrapper_span_processor(tracer: Tracer, handler: SpanHandler, to_wrap, wrapped, instance, source_path, add_workflow_span,
                                         args, kwargs):
@@ -135,10 +201,13 @@ async def amonocle_wrapper_span_processor(tracer: Tracer, handler: SpanHandler,
     span_status = None
     auto_close_span = get_auto_close_span(to_wrap, kwargs)
     parent_span = get_current_monocle_span()
+    start_ns = time.perf_counter_ns()
+    call_ns = 0
     with start_as_monocle_span(tracer, name, auto_close_span) as span:
         pre_process_span(name, tracer, handler, add_workflow_span, to_wrap, wrapped, instance, args, kwargs, span, source_path)
         
-        if SpanHandler.is_root_span(span) or add_workflow_span:
+        is_request = SpanHandler.is_root_span(span) or add_workflow_span
+        if is_workflow_span(span, add_workflow_span):
             # Recursive call for the actual span
             return_value, span_status = await amonocle_wrapper_span_processor(tracer, handler, to_wrap, wrapped, instance, source_path, False, args, kwargs)
             span.set_status(span_status)
@@ -146,6 +215,7 @@ async def amonocle_wrapper_span_processor(tracer: Tracer, handler: SpanHandler,
                 span.end()
         else:
             ex:Exception = None
+            call_start_ns = time.perf_counter_ns()
             try:
                 with SpanHandler.workflow_type(to_wrap, span):
                     return_value = await wrapped(*args, **kwargs)
@@ -153,6 +223,7 @@ async def amonocle_wrapper_span_processor(tracer: Tracer, handler: SpanHandler,
                 ex = e
                 raise
             finally:
+                call_ns = time.perf_counter_ns() - call_start_ns
                 def post_process_span_internal(ret_val):
                     post_process_span(handler, to_wrap, wrapped, instance, args, kwargs, ret_val, span, parent_span, ex)
                     if not auto_close_span:
@@ -162,6 +233,9 @@ async def amonocle_wrapper_span_processor(tracer: Tracer, handler: SpanHandler,
                 else:
                     post_process_span_internal(return_value)
         span_status = span.status
+    governor = get_overhead_governor()
+    if governor is not None:
+        record_overhead(governor, is_request, start_ns, call_ns)
     return return_value, span_status
 
 async def amonocle_iter_wrapper_span_processor(tracer: Tracer, handler: SpanHandler, to_wrap, wrapped, instance, source_path, add_workflow_span,
@@ -175,7 +249,7 @@ async def amonocle_iter_wrapper_span_processor(tracer: Tracer, handler: SpanHand
     with start_as_monocle_span(tracer, name, auto_close_span) as span:
         pre_process_span(name, tracer, handler, add_workflow_span, to_wrap, wrapped, instance, args, kwargs, span, source_path)
 
-        if SpanHandler.is_root_span(span) or add_workflow_span:
+        if is_workflow_span(span, add_workflow_span):
             # Recursive call for the actual span
             async for item in amonocle_iter_wrapper_span_processor(tracer, handler, to_wrap, wrapped, instance, source_path, False, args, kwargs):
                 yield item
@@ -204,6 +278,11 @@ async def amonocle_iter_wrapper_span_processor(tracer: Tracer, handler: SpanHand
     return
 
 async def amonocle_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap, wrapped, instance, source_path, args, kwargs):
+    traced_to_wrap = apply_tracing_level(to_wrap)
+    if traced_to_wrap is None:
+        with unsampled_scope():
+            return await wrapped(*args, **kwargs)
+    to_wrap = traced_to_wrap
     return_value = None
     token = None
     pre_trace_token = None
@@ -211,7 +290,7 @@ async def amonocle_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap, wrappe
         try:
             pre_trace_token = handler.pre_tracing(to_wrap, wrapped, instance, args, kwargs)
         except Exception as e:
-            logger.info(f"Warning: Error occurred in pre_tracing: {e}")
+            diagnostics.info("pre_tracing", "Error occurred in pre_tracing: %s", e)
         if to_wrap.get('skip_span', False) or handler.skip_span(to_wrap, wrapped, instance, args, kwargs):
             return_value = await wrapped(*args, **kwargs)
         else:
@@ -227,16 +306,23 @@ async def amonocle_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap, wrappe
         try:
             handler.post_tracing(to_wrap, wrapped, instance, args, kwargs, return_value, pre_trace_token)
         except Exception as e:
-            logger.info(f"Warning: Error occurred in post_tracing: {e}")
+            diagnostics.info("post_tracing", "Error occurred in post_tracing: %s", e)
 
 async def amonocle_iter_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap, wrapped, instance, source_path, args, kwargs) -> AsyncGenerator[any, None]:
+    traced_to_wrap = apply_tracing_level(to_wrap)
+    if traced_to_wrap is None:
+        with unsampled_scope():
+            async for item in wrapped(*args, **kwargs):
+                yield item
+        return
+    to_wrap = traced_to_wrap
     token = None
     pre_trace_token = None
     try:
         try:
             pre_trace_token = handler.pre_tracing(to_wrap, wrapped, instance, args, kwargs)
         except Exception as e:
-            logger.info(f"Warning: Error occurred in pre_tracing: {e}")
+            diagnostics.info("pre_tracing", "Error occurred in pre_tracing: %s", e)
         if to_wrap.get('skip_span', False) or handler.skip_span(to_wrap, wrapped, instance, args, kwargs):
             async for item in wrapped(*args, **kwargs):
                 yield item
@@ -253,7 +339,7 @@ async def amonocle_iter_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap, w
         try:
             handler.post_tracing(to_wrap, wrapped, instance, args, kwargs, None, pre_trace_token)
         except Exception as e:
-            logger.info(f"Warning: Error occurred in post_tracing: {e}")
+            diagnostics.info("post_tracing", "Error occurred in post_tracing: %s", e)
 
 @with_tracer_wrapper
 def task_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap, wrapped, instance, source_path, args, kwargs):
@@ -326,7 +412,7 @@ def evaluate_scope_values(args, kwargs, to_wrap, scope_values):
         try:
             scope_values = scope_values(args, kwargs)
         except Exception as e:
-            logger.warning("Warning: Error occurred in evaluate_scope_values: %s", str(e))
+            diagnostics.warning("evaluate_scope_values", "Error occurred in evaluate_scope_values: %s", e)
             scope_values = None
     if isinstance(scope_values, dict):
         return scope_values
@@ -338,14 +424,24 @@ def start_as_monocle_span(tracer: Tracer, name: str, auto_close_span: bool) -> I
         This essentiall links monocle and non-monocle spans separately which is default behavior.
         It can be optionally overridden by setting the environment variable MONOCLE_ISOLATE_SPANS to false.
     """
+    # first span of a callable submitted to an executor, linked to the submitting span
+    fanout_link = get_value(FANOUT_LINK_KEY)
+    links = [fanout_link.get_link()] if fanout_link is not None else None
     if not ISOLATE_MONOCLE_SPANS:
         # If not isolating, use the default start_as_current_span
-        yield tracer.start_as_current_span(name, end_on_exit=auto_close_span)
+        with tracer.start_as_current_span(name, end_on_exit=auto_close_span, links=links) as span:
+            fanout_token = attach(set_value(FANOUT_LINK_KEY, None)) if fanout_link is not None else None
+            yield span
+            if fanout_token is not None:
+                detach(fanout_token)
         return
     original_span = get_current_span()
     monocle_span_token = attach(set_span_in_context(get_current_monocle_span()))
-    with tracer.start_as_current_span(name, end_on_exit=auto_close_span) as span:
-        new_monocle_token = attach(set_monocle_span_in_context(span))
+    with tracer.start_as_current_span(name, end_on_exit=auto_close_span, links=links) as span:
+        new_monocle_context = set_monocle_span_in_context(span)
+        if fanout_link is not None:
+            new_monocle_context = set_value(FANOUT_LINK_KEY, None, new_monocle_context)
+        new_monocle_token = attach(new_monocle_context)
         original_span_token = attach(set_span_in_context(original_span))
         yield span
         detach(original_span_token)
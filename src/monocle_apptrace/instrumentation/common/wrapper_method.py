@@ -21,6 +21,8 @@ from monocle_apptrace.instrumentation.metamodel.flask.methods import (FLASK_METH
 from monocle_apptrace.instrumentation.metamodel.flask._helper import FlaskSpanHandler, FlaskResponseSpanHandler
 from monocle_apptrace.instrumentation.metamodel.requests.methods import (REQUESTS_METHODS, )
 from monocle_apptrace.instrumentation.metamodel.requests._helper import RequestSpanHandler
+from monocle_apptrace.instrumentation.metamodel.httpx.methods import (HTTPX_METHODS, )
+from monocle_apptrace.instrumentation.metamodel.httpx._helper import HttpxSpanHandler
 from monocle_apptrace.instrumentation.metamodel.teamsai.methods import (TEAMAI_METHODS, )
 from monocle_apptrace.instrumentation.metamodel.anthropic.methods import (ANTHROPIC_METHODS, )
 from monocle_apptrace.instrumentation.metamodel.aiohttp.methods import (AIOHTTP_METHODS, )
@@ -29,7 +31,7 @@ from monocle_apptrace.instrumentation.metamodel.azfunc._helper import (azureSpan
 from monocle_apptrace.instrumentation.metamodel.azfunc.methods import AZFUNC_HTTP_METHODS
 from monocle_apptrace.instrumentation.metamodel.gemini.methods import GEMINI_METHODS
 from monocle_apptrace.instrumentation.metamodel.fastapi.methods import FASTAPI_METHODS
-from monocle_apptrace.instrumentation.metamodel.fastapi._helper import FastAPISpanHandler, FastAPIResponseSpanHandler
+from monocle_apptrace.instrumentation.metamodel.fastapi._helper import FastAPISpanHandler
 from monocle_apptrace.instrumentation.metamodel.lambdafunc._helper import lambdaSpanHandler
 from monocle_apptrace.instrumentation.metamodel.lambdafunc.methods import LAMBDA_HTTP_METHODS
 from monocle_apptrace.instrumentation.metamodel.mcp.methods import MCP_METHODS
@@ -93,6 +95,7 @@ DEFAULT_METHODS_LIST = (
     BOTOCORE_METHODS + 
     FLASK_METHODS + 
     REQUESTS_METHODS + 
+    HTTPX_METHODS +
     LANGGRAPH_METHODS + 
     AGENTS_METHODS +
     OPENAI_METHODS + 
@@ -117,12 +120,12 @@ MONOCLE_SPAN_HANDLERS: Dict[str, SpanHandler] = {
     "flask_handler": FlaskSpanHandler(),
     "flask_response_handler": FlaskResponseSpanHandler(),
     "request_handler": RequestSpanHandler(),
+    "httpx_handler": HttpxSpanHandler(),
     "non_framework_handler": NonFrameworkSpanHandler(),
     "openai_handler": OpenAISpanHandler(),
     "azure_func_handler": azureSpanHandler(),
     "mcp_agent_handler": MCPAgentHandler(),
     "fastapi_handler": FastAPISpanHandler(),
-    "fastapi_response_handler": FastAPIResponseSpanHandler(),
     "langgraph_agent_handler": LanggraphAgentHandler(),
     "langgraph_tool_handler": LanggraphToolHandler(),
     "agents_agent_handler": AgentsSpanHandler(),
@@ -5,6 +5,7 @@ This module provides utility functions to extract various attributes from agent
 
 from ast import arguments
 from typing import Any, Dict, Optional
+from monocle_apptrace.instrumentation.common.utils import cached_instance_attribute
 from monocle_apptrace.instrumentation.metamodel.finish_types import map_adk_finish_reason_to_finish_type
 
 def get_model_name(args):
@@ -14,6 +15,7 @@ def get_inference_type(arguments):
     """ Find inference type from argument """
     return 'inference.gemini' ## TBD verify non-gemini inference types
 
+@cached_instance_attribute("api_client._api_client._http_options.base_url")
 def extract_inference_endpoint(instance):
     """ Get inference service end point"""
     if hasattr(instance,'api_client') and hasattr(instance.api_client, '_api_client'):
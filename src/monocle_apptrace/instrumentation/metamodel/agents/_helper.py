@@ -4,8 +4,10 @@ from monocle_apptrace.instrumentation.common.utils import (
     get_json_dumps,
 )
 import logging
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 DELEGATION_NAME_PREFIX = "transfer_to_"
 ROOT_AGENT_NAME = "AgentsSDK"
@@ -37,7 +39,7 @@ def extract_agent_response(response):
         ):
             return str(response.next_step.output)
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_agent_response: %s", str(e))
+        diagnostics.warning("extract_agent_response", "Error occurred in extract_agent_response: %s", e)
     return ""
 
 
@@ -63,7 +65,7 @@ def extract_agent_input(arguments):
             elif isinstance(input_data, list):
                 return get_json_dumps(input_data)
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_agent_input: %s", str(e))
+        diagnostics.warning("extract_agent_input", "Error occurred in extract_agent_input: %s", e)
     return None
 
 
@@ -141,7 +143,7 @@ def extract_tool_input(arguments):
         # Fallback to all args
         return [str(arg) for arg in arguments["args"]]
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_tool_input: %s", str(e))
+        diagnostics.warning("extract_tool_input", "Error occurred in extract_tool_input: %s", e)
     return []
 
 
@@ -197,7 +199,7 @@ def extract_handoff_target(arguments):
         # Check if this is a handoff by looking at the result
         return arguments.get("result").name
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_handoff_target: %s", str(e))
+        diagnostics.warning("extract_handoff_target", "Error occurred in extract_handoff_target: %s", e)
     return ""
 
 
@@ -214,7 +216,5 @@ def update_span_from_agent_response(response):
             if hasattr(usage, "total_tokens"):
                 meta_dict.update({"total_tokens": usage.total_tokens})
     except Exception as e:
-        logger.warning(
-            "Warning: Error occurred in update_span_from_agent_response: %s", str(e)
-        )
+        diagnostics.warning("update_span_from_agent_response", "Error occurred in update_span_from_agent_response: %s", e)
     return meta_dict
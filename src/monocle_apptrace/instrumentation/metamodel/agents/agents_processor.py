@@ -1,6 +1,6 @@
 import logging
 from types import SimpleNamespace
-from opentelemetry.context import attach, set_value, detach
+from opentelemetry.context import attach, set_value, detach, Context
 from opentelemetry.trace import Tracer
 from monocle_apptrace.instrumentation.common.constants import AGENT_PREFIX_KEY
 from monocle_apptrace.instrumentation.common.span_handler import (
@@ -103,50 +103,26 @@ def handoff_constructor_wrapper(
 
 
 class AgentsSpanHandler(BaseSpanHandler):
-    """Span handler for OpenAI Agents SDK."""
+    """Span handler for OpenAI Agents SDK.
+    The agent name and delegation prefix of a run are kept in the context of the wrapped call,
+    so concurrent runs on the same handler don't see each other's agent."""
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.agent_context_token = None
-
-    def set_agent_context(self, to_wrap, wrapped, instance, args, kwargs):
-        """Set the agent context for tracking across calls."""
+    def get_agent_context(self, args, kwargs) -> Context:
+        """Build the context carrying the running agent's name and the delegation prefix."""
+        context = set_value(AGENT_PREFIX_KEY, DELEGATION_NAME_PREFIX)
         try:
             # For Runner.run, the agent is the first argument
-            if len(args) > 0:
-                agent = args[0]
-                agent_name = get_runner_agent_name(agent)
-                if agent_name:
-                    self.agent_context_token = attach(
-                        set_value(AGENTS_AGENT_NAME_KEY, agent_name)
-                    )
+            agent = args[0] if len(args) > 0 else kwargs.get("agent")
+            agent_name = get_runner_agent_name(agent) if agent is not None else None
+            if agent_name:
+                context = set_value(AGENTS_AGENT_NAME_KEY, agent_name, context)
         except Exception as e:
             logger.warning("Warning: Error setting agent context: %s", str(e))
+        return context
 
-    def clear_agent_context(self):
-        """Clear the agent context."""
-        if self.agent_context_token:
-            detach(self.agent_context_token)
-            self.agent_context_token = None
-
-    def pre_task_processing(
-        self, to_wrap, wrapped, instance, args, kwargs, *args1, **kwargs1
-    ):
-        """Pre-processing for agent tasks."""
-        self.set_agent_context(to_wrap, wrapped, instance, args, kwargs)
-        context = set_value(AGENT_PREFIX_KEY, DELEGATION_NAME_PREFIX)
-        attach(context)
-        return super().pre_task_processing(
-            to_wrap, wrapped, instance, args, kwargs, *args1, **kwargs1
-        )
-
-    def post_task_processing(
-        self, to_wrap, wrapped, instance, args, kwargs, result, ex, span, parent_span
-    ):
-        """Post-processing for agent tasks."""
-        self.clear_agent_context()
-        context = set_value(AGENT_PREFIX_KEY, None)
-        attach(context)
-        return super().post_task_processing(
-            to_wrap, wrapped, instance, args, kwargs, result, ex, span, parent_span
-        )
+    def pre_tracing(self, to_wrap, wrapped, instance, args, kwargs):
+        return attach(self.get_agent_context(args, kwargs))
+
+    def post_tracing(self, to_wrap, wrapped, instance, args, kwargs, result, token):
+        if token is not None:
+            detach(token)
@@ -7,6 +7,7 @@ import json
 import logging
 from opentelemetry.context import get_value
 from monocle_apptrace.instrumentation.common.utils import (
+    cached_instance_attribute,
     Option,
     get_json_dumps,
     get_keys_as_tuple,
@@ -17,14 +18,18 @@ from monocle_apptrace.instrumentation.common.utils import (
 )
 from monocle_apptrace.instrumentation.metamodel.finish_types import map_anthropic_finish_reason_to_finish_type
 from monocle_apptrace.instrumentation.common.constants import AGENT_PREFIX_KEY, INFERENCE_AGENT_DELEGATION, INFERENCE_COMMUNICATION, INFERENCE_TOOL_CALL
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
+@cached_instance_attribute("_client.base_url")
 def extract_provider_name(instance):
     provider_url: Option[str] = try_option(getattr, instance._client.base_url, 'host')
     return provider_url.unwrap_or(None)
 
+@cached_instance_attribute("_client.base_url", "client.meta.endpoint_url")
 def extract_inference_endpoint(instance):
     inference_endpoint: Option[str] = try_option(getattr, instance._client, 'base_url').map(str)
     if inference_endpoint.is_none() and "meta" in instance.client.__dict__:
@@ -44,7 +49,7 @@ def extract_messages(kwargs):
                     messages.append({msg['role']: msg['content']})
         return [get_json_dumps(message) for message in messages]
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_messages: %s", str(e))
+        diagnostics.warning("extract_messages", "Error occurred in extract_messages: %s", e)
         return []
 
 def get_exception_status_code(arguments):
@@ -105,7 +110,7 @@ def extract_assistant_message(arguments):
                 return arguments["result"].error
 
     except (IndexError, AttributeError) as e:
-        logger.warning("Warning: Error occurred in extract_assistant_message: %s", str(e))
+        diagnostics.warning("extract_assistant_message", "Error occurred in extract_assistant_message: %s", e)
         return None
 
 def update_span_from_llm_response(response):
@@ -130,7 +135,7 @@ def extract_finish_reason(arguments):
         if response is not None and hasattr(response, "stop_reason"):
             return response.stop_reason
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_finish_reason: %s", str(e))
+        diagnostics.warning("extract_finish_reason", "Error occurred in extract_finish_reason: %s", e)
         return None
     return None
 
@@ -179,5 +184,5 @@ def agent_inference_type(arguments):
         
         return INFERENCE_COMMUNICATION
     except Exception as e:
-        logger.warning("Warning: Error occurred in agent_inference_type: %s", str(e))
+        diagnostics.warning("agent_inference_type", "Error occurred in agent_inference_type: %s", e)
         return INFERENCE_COMMUNICATION
\ No newline at end of file
@@ -3,13 +3,17 @@ import logging
 from typing import Any, Dict, Optional
 from urllib.parse import urlparse
 from monocle_apptrace.instrumentation.common.utils import (
+    cached_instance_attribute,
+    format_vector,
     get_json_dumps,
     get_exception_message,
     get_status_code,
 )
 from monocle_apptrace.instrumentation.metamodel.finish_types import map_azure_ai_inference_finish_reason_to_finish_type
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 
 def extract_messages(args_or_kwargs: Any) -> str:
@@ -27,18 +31,17 @@ def extract_messages(args_or_kwargs: Any) -> str:
 
         return [get_json_dumps(message) for message in messages]
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_messages: %s", str(e))
+        diagnostics.warning("extract_messages", "Error occurred in extract_messages: %s", e)
         return []
 
 
+@cached_instance_attribute("_config.endpoint")
 def extract_inference_endpoint(instance: Any) -> str:
     """Extract inference endpoint from azure-ai-inference client instance."""
     try:
         return instance._config.endpoint
     except Exception as e:
-        logger.warning(
-            "Warning: Error occurred in extract_inference_endpoint: %s", str(e)
-        )
+        diagnostics.warning("extract_inference_endpoint", "Error occurred in extract_inference_endpoint: %s", e)
         return ""
 
 
@@ -72,9 +75,7 @@ def extract_embeddings_input(args_or_kwargs: Any) -> str:
         else:
             return str(input_data)
     except Exception as e:
-        logger.warning(
-            "Warning: Error occurred in extract_embeddings_input: %s", str(e)
-        )
+        diagnostics.warning("extract_embeddings_input", "Error occurred in extract_embeddings_input: %s", e)
         return ""
 
 
@@ -110,9 +111,7 @@ def extract_assistant_message(arguments: Dict[str, Any]) -> str:
             messages.append({role: result.choices[0].message.content})
         return get_json_dumps(messages[0]) if messages else ""
     except Exception as e:
-        logger.warning(
-            "Warning: Error occurred in extract_assistant_message: %s", str(e)
-        )
+        diagnostics.warning("extract_assistant_message", "Error occurred in extract_assistant_message: %s", e)
         return ""
 
 
@@ -128,17 +127,14 @@ def extract_embeddings_output(arguments: Dict[str, Any]) -> str:
             embeddings_info = []
             for i, item in enumerate(result.data):
                 if hasattr(item, "embedding") and hasattr(item, "index"):
-                    embedding_length = len(item.embedding) if item.embedding else 0
                     embeddings_info.append(
-                        f"index={item.index}, embedding=[{embedding_length} dimensions]"
+                        f"index={item.index}, embedding={format_vector(item.embedding)}"
                     )
             return " | ".join(embeddings_info)
 
         return str(result)
     except Exception as e:
-        logger.warning(
-            "Warning: Error occurred in extract_embeddings_output: %s", str(e)
-        )
+        diagnostics.warning("extract_embeddings_output", "Error occurred in extract_embeddings_output: %s", e)
         return ""
 
 
@@ -173,9 +169,7 @@ def update_span_from_llm_response(result: Any, instance: Any = None) -> Dict[str
 
         return attributes
     except Exception as e:
-        logger.warning(
-            "Warning: Error occurred in update_span_from_llm_response: %s", str(e)
-        )
+        diagnostics.warning("update_span_from_llm_response", "Error occurred in update_span_from_llm_response: %s", e)
         return {}
 
 
@@ -192,13 +186,20 @@ def get_model_name(arguments: Dict[str, Any]) -> str:
 
         return ""
     except Exception as e:
-        logger.warning("Warning: Error occurred in get_model_name: %s", str(e))
+        diagnostics.warning("get_model_name", "Error occurred in get_model_name: %s", e)
         return ""
 
 
 def get_inference_type(arguments) -> str:
     instance = arguments.get("instance")
-    if instance and hasattr(instance, "_config") and hasattr(instance._config, "endpoint"):
+    if instance is None:
+        return "azure_ai_inference"
+    return get_inference_type_from_instance(instance)
+
+
+@cached_instance_attribute("_config.endpoint")
+def get_inference_type_from_instance(instance: Any) -> str:
+    if hasattr(instance, "_config") and hasattr(instance._config, "endpoint"):
         endpoint = instance._config.endpoint
         try:
             parsed = urlparse(endpoint)
@@ -213,6 +214,7 @@ def get_inference_type(arguments) -> str:
     return "azure_ai_inference"
 
 
+@cached_instance_attribute("_config.endpoint")
 def get_provider_name(instance: Any) -> str:
     """Extract provider name from azure-ai-inference client instance."""
     try:
@@ -224,7 +226,7 @@ def get_provider_name(instance: Any) -> str:
             provider_name = endpoint.split("/")[2] if "/" in endpoint else endpoint
             return provider_name
     except Exception as e:
-        logger.warning("Warning: Error occurred in get_provider_name: %s", str(e))
+        diagnostics.warning("get_provider_name", "Error occurred in get_provider_name: %s", e)
         return "azure_ai_inference"
 
 
@@ -285,7 +287,7 @@ def extract_finish_reason(arguments: Dict[str, Any]) -> Optional[str]:
             return "error"
             
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_finish_reason: %s", str(e))
+        diagnostics.warning("extract_finish_reason", "Error occurred in extract_finish_reason: %s", e)
         return None
     
     return None
@@ -9,8 +9,10 @@ from monocle_apptrace.instrumentation.common.utils import (
     get_status,
     get_exception_status_code
 )
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 
 def process_stream(to_wrap, response, span_processor):
@@ -69,10 +71,7 @@ def process_stream(to_wrap, response, span_processor):
                     span_processor(ret_val)
                 raise
             except Exception as e:
-                logger.warning(
-                    "Warning: Error occurred while processing item in new_next: %s",
-                    str(e),
-                )
+                diagnostics.warning("item_in_new_next", "Error occurred while processing item in new_next: %s", e)
                 raise
 
         patch_instance_method(response, "__next__", new_next)
@@ -123,10 +122,7 @@ def process_stream(to_wrap, response, span_processor):
                     span_processor(ret_val)
                 raise
             except Exception as e:
-                logger.warning(
-                    "Warning: Error occurred while processing item in new_anext: %s",
-                    str(e),
-                )
+                diagnostics.warning("item_in_new_anext", "Error occurred while processing item in new_anext: %s", e)
                 raise
 
         patch_instance_method(response, "__anext__", new_anext)
@@ -0,0 +1,40 @@
+from monocle_apptrace.instrumentation.metamodel.azureaiinference import _helper
+
+RETRIEVAL = {
+    "type": "embedding",
+    "attributes": [
+        [
+            {
+                "_comment": "Embedding model",
+                "attribute": "name",
+                "accessor": lambda arguments: _helper.get_model_name(arguments)
+            },
+            {
+                "attribute": "type",
+                "accessor": lambda arguments: 'model.embedding.' + _helper.get_model_name(arguments)
+            }
+        ]
+    ],
+    "events": [
+        {
+            "name": "data.input",
+            "attributes": [
+                {
+                    "_comment": "text to embed",
+                    "attribute": "input",
+                    "accessor": lambda arguments: _helper.extract_embeddings_input(arguments['kwargs'])
+                }
+            ]
+        },
+        {
+            "name": "data.output",
+            "attributes": [
+                {
+                    "_comment": "embedding summary, the full vector is not captured",
+                    "attribute": "response",
+                    "accessor": lambda arguments: _helper.extract_embeddings_output(arguments)
+                }
+            ]
+        }
+    ]
+}
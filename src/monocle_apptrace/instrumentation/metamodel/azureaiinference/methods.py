@@ -1,5 +1,6 @@
 from monocle_apptrace.instrumentation.common.wrapper import atask_wrapper, task_wrapper
 from monocle_apptrace.instrumentation.metamodel.azureaiinference.entities.inference import INFERENCE
+from monocle_apptrace.instrumentation.metamodel.azureaiinference.entities.retrieval import RETRIEVAL
 
 AZURE_AI_INFERENCE_METHODS = [
     # Chat Completions - Synchronous
@@ -19,5 +20,23 @@ AZURE_AI_INFERENCE_METHODS = [
         "wrapper_method": atask_wrapper,
         "span_handler": "non_framework_handler",
         "output_processor": INFERENCE
+    },
+    # Embeddings - Synchronous
+    {
+        "package": "azure.ai.inference",
+        "object": "EmbeddingsClient",
+        "method": "embed",
+        "wrapper_method": task_wrapper,
+        "span_handler": "non_framework_handler",
+        "output_processor": RETRIEVAL
+    },
+    # Embeddings - Asynchronous
+    {
+        "package": "azure.ai.inference.aio",
+        "object": "EmbeddingsClient",
+        "method": "embed",
+        "wrapper_method": atask_wrapper,
+        "span_handler": "non_framework_handler",
+        "output_processor": RETRIEVAL
     }
 ]
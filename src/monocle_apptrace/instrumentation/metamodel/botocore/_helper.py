@@ -10,7 +10,9 @@ from functools import wraps
 from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
 from monocle_apptrace.instrumentation.common.utils import ( get_exception_message, get_json_dumps, get_status_code,)
 from monocle_apptrace.instrumentation.metamodel.finish_types import map_bedrock_finish_reason_to_finish_type
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 
 def extract_messages(args):
@@ -28,7 +30,7 @@ def extract_messages(args):
                 messages.append({role: user_message})
         return [get_json_dumps(message) for message in messages]
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_messages: %s", str(e))
+        diagnostics.warning("extract_messages", "Error occurred in extract_messages: %s", e)
         return []
 
 def get_exception_status_code(arguments):
@@ -41,35 +43,31 @@ def get_exception_status_code(arguments):
         return 'success'
 
 def extract_assistant_message(arguments):
-    try:
-        status = get_status_code(arguments)
-        messages = []
-        role = "assistant"
-        if status == 'success':
-            if "Body" in arguments['result'] and hasattr(arguments['result']['Body'], "_raw_stream"):
-                raw_stream = getattr(arguments['result']['Body'], "_raw_stream")
-                if hasattr(raw_stream, "data"):
-                    response_bytes = getattr(raw_stream, "data")
-                    response_str = response_bytes.decode('utf-8')
-                    response_dict = json.loads(response_str)
-                    arguments['result']['Body'] = BytesIO(response_bytes)
-                    messages.append({role: response_dict["answer"]})
-            if "output" in arguments['result']:
-                output = arguments['result'].get("output", {})
-                message = output.get("message", {})
-                content = message.get("content", [])
-                if isinstance(content, list) and len(content) > 0 and "text" in content[0]:
-                    reply = content[0]["text"]
-                    messages.append({role: reply})
-        else:
-            if arguments["exception"] is not None:
-                return get_exception_message(arguments)
-            elif hasattr(arguments["result"], "error"):
-                return arguments["result"].error
-        return get_json_dumps(messages[0]) if messages else ""
-    except Exception as e:
-        logger.warning("Warning: Error occurred in extract_assistant_message: %s", str(e))
-        return []
+    status = get_status_code(arguments)
+    messages = []
+    role = "assistant"
+    if status == 'success':
+        if "Body" in arguments['result'] and hasattr(arguments['result']['Body'], "_raw_stream"):
+            raw_stream = getattr(arguments['result']['Body'], "_raw_stream")
+            if hasattr(raw_stream, "data"):
+                response_bytes = getattr(raw_stream, "data")
+                response_str = response_bytes.decode('utf-8')
+                response_dict = json.loads(response_str)
+                arguments['result']['Body'] = BytesIO(response_bytes)
+                messages.append({role: response_dict["answer"]})
+        if "output" in arguments['result']:
+            output = arguments['result'].get("output", {})
+            message = output.get("message", {})
+            content = message.get("content", [])
+            if isinstance(content, list) and len(content) > 0 and "text" in content[0]:
+                reply = content[0]["text"]
+                messages.append({role: reply})
+    else:
+        if arguments["exception"] is not None:
+            return get_exception_message(arguments)
+        elif hasattr(arguments["result"], "error"):
+            return arguments["result"].error
+    return get_json_dumps(messages[0]) if messages else ""
 
 
 def extract_query_from_content(content):
@@ -88,7 +86,7 @@ def extract_query_from_content(content):
             query = content[query_start:answer_start].strip()
         return query
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_query_from_content: %s", str(e))
+        diagnostics.warning("extract_query_from_content", "Error occurred in extract_query_from_content: %s", e)
         return ""
 
 
@@ -185,7 +183,7 @@ def extract_finish_reason(arguments):
             return "error"
             
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_finish_reason: %s", str(e))
+        diagnostics.warning("extract_finish_reason", "Error occurred in extract_finish_reason: %s", e)
         return None
     
     return None
@@ -0,0 +1,135 @@
+import contextvars
+import threading
+from multiprocessing.pool import Pool, mapstar
+import weakref
+from functools import partial
+
+from opentelemetry.context import attach, detach, get_current, set_value
+from opentelemetry.trace import Link, SpanContext, Tracer
+
+from monocle_apptrace.instrumentation.common.constants import FANOUT_LINK_KEY
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.wrapper import get_monocle_parent_span
+from monocle_apptrace.instrumentation.common.utils import get_process_context, is_monocle_tracing_enabled, run_with_process_context
+
+FANOUT_INDEX_ATTRIBUTE = "monocle.fanout.index"
+
+class FanOut:
+    """ Callables submitted to executors by one span """
+    __slots__ = ("span_context", "submitted", "lock")
+
+    def __init__(self, span_context: SpanContext):
+        self.span_context = span_context
+        self.submitted = 0
+        self.lock = threading.Lock()
+
+    def next_index(self) -> int:
+        with self.lock:
+            self.submitted += 1
+            return self.submitted - 1
+
+class FanOutLink:
+    """ Set in the context of a submitted callable, the link of its first span to the submitting span.
+        Every submitted callable is linked, with its submission index, whether its siblings were submitted yet or not """
+    __slots__ = ("span_context", "index")
+
+    def __init__(self, span_context: SpanContext, index: int):
+        self.span_context = span_context
+        self.index = index
+
+    def get_link(self) -> Link:
+        return Link(self.span_context, {FANOUT_INDEX_ATTRIBUTE: self.index})
+
+# fan-out of the spans that submitted work to an executor
+fanouts = weakref.WeakKeyDictionary()
+
+def get_fanout(span) -> FanOut:
+    fanout = fanouts.get(span)
+    if fanout is None:
+        fanout = fanouts.setdefault(span, FanOut(span.get_span_context()))
+    return fanout
+
+def run_in_context(context, fn, *args, **kwargs):
+    token = attach(context)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        detach(token)
+
+def bind_context(context, fn):
+    """ Returns a callable running fn with the context attached """
+    if isinstance(fn, partial) and isinstance(getattr(fn.func, "__self__", None), contextvars.Context):
+        # eg. asyncio.to_thread runs the callable in a copy of the caller's contextvars, attach the context inside that copy
+        return partial(fn.func, run_in_context, context, *fn.args, **fn.keywords)
+    return partial(run_in_context, context, fn)
+
+def get_submit_context():
+    """ The current context to run the submitted callable in, with the fan-out link to the submitting Monocle span """
+    context = get_current()
+    if not context:
+        return None
+    span = get_monocle_parent_span()
+    if span.get_span_context().is_valid:
+        try:
+            fanout = get_fanout(span)
+            context = set_value(FANOUT_LINK_KEY, FanOutLink(fanout.span_context, fanout.next_index()), context)
+        except TypeError:
+            # spans that can't be weak referenced, eg. NonRecordingSpan of a remote parent
+            pass
+    return context
+
+def submit_context_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap):
+    """ Run the callable submitted to an executor in the context of the caller, eg. ThreadPoolExecutor.submit(fn, *args) """
+    def wrapper(wrapped, instance, args, kwargs):
+        if not args or not is_monocle_tracing_enabled():
+            return wrapped(*args, **kwargs)
+        context = get_submit_context()
+        if context is None:
+            return wrapped(*args, **kwargs)
+        return wrapped(bind_context(context, args[0]), *args[1:], **kwargs)
+    return wrapper
+
+def process_context_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap):
+    """ Serialize the trace context and scopes with the task sent to a worker process and restore them there,
+        eg. ProcessPoolExecutor.submit(fn, *args) or Pool.map(func, iterable) """
+    def wrapper(wrapped, instance, args, kwargs):
+        if not is_monocle_tracing_enabled():
+            return wrapped(*args, **kwargs)
+        carrier = get_process_context()
+        if not carrier:
+            return wrapped(*args, **kwargs)
+        if args:
+            args = (partial(run_with_process_context, carrier, args[0]),) + tuple(args[1:])
+        elif "func" in kwargs:
+            kwargs["func"] = partial(run_with_process_context, carrier, kwargs["func"])
+        return wrapped(*args, **kwargs)
+    return wrapper
+
+def pool_map_context_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap):
+    """ Pool.map, starmap and their async variants send the items in chunks, restore the context
+        and flush the spans of the worker once per chunk instead of once per item """
+    def wrapper(wrapped, instance, args, kwargs):
+        if not is_monocle_tracing_enabled() or len(args) < 3:
+            return wrapped(*args, **kwargs)
+        carrier = get_process_context()
+        if not carrier:
+            return wrapped(*args, **kwargs)
+        func, iterable, mapper = args[:3]
+        return wrapped(func, iterable, partial(run_with_process_context, carrier, mapper), *args[3:], **kwargs)
+    return wrapper
+
+def pool_imap_context_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap):
+    """ Pool.imap and imap_unordered, with a chunksize over 1 the chunks are sent as single tasks
+        so the context is restored and the spans are flushed once per chunk, as Pool does it internally """
+    process_wrapper = process_context_wrapper(tracer, handler, to_wrap)
+    def wrapper(wrapped, instance, args, kwargs):
+        chunksize = args[2] if len(args) > 2 else kwargs.get("chunksize", 1)
+        if not isinstance(chunksize, int) or chunksize <= 1 or len(args) < 2 or not is_monocle_tracing_enabled():
+            return process_wrapper(wrapped, instance, args, kwargs)
+        carrier = get_process_context()
+        if not carrier:
+            return wrapped(*args, **kwargs)
+        func, iterable = args[:2]
+        chunks = wrapped(partial(run_with_process_context, carrier, mapstar), Pool._get_tasks(func, iterable, chunksize), 1)
+        return (item for chunk in chunks for item in chunk)
+    return wrapper
@@ -0,0 +1,49 @@
+from monocle_apptrace.instrumentation.metamodel.executors._helper import (
+    pool_imap_context_wrapper,
+    pool_map_context_wrapper,
+    process_context_wrapper,
+    submit_context_wrapper,
+)
+
+# loop.run_in_executor and asyncio.to_thread submit to a ThreadPoolExecutor unless given another executor
+EXECUTOR_METHODS = [
+    {
+        "package": "concurrent.futures.thread",
+        "object": "ThreadPoolExecutor",
+        "method": "submit",
+        "wrapper_method": submit_context_wrapper,
+    },
+    # ProcessPoolExecutor.map submits chunks, Pool.map, starmap and their async variants go through _map_async,
+    # Pool.apply through apply_async. multiprocessing.pool.ThreadPool is a Pool as well.
+    # The spans of a worker are flushed after each task, a chunk of items for the map methods.
+    {
+        "package": "concurrent.futures.process",
+        "object": "ProcessPoolExecutor",
+        "method": "submit",
+        "wrapper_method": process_context_wrapper,
+    },
+    {
+        "package": "multiprocessing.pool",
+        "object": "Pool",
+        "method": "apply_async",
+        "wrapper_method": process_context_wrapper,
+    },
+    {
+        "package": "multiprocessing.pool",
+        "object": "Pool",
+        "method": "_map_async",
+        "wrapper_method": pool_map_context_wrapper,
+    },
+    {
+        "package": "multiprocessing.pool",
+        "object": "Pool",
+        "method": "imap",
+        "wrapper_method": pool_imap_context_wrapper,
+    },
+    {
+        "package": "multiprocessing.pool",
+        "object": "Pool",
+        "method": "imap_unordered",
+        "wrapper_method": pool_imap_context_wrapper,
+    }
+]
@@ -1,19 +1,25 @@
 import logging
-from threading import local
-from monocle_apptrace.instrumentation.common.utils import extract_http_headers, clear_http_scopes
+import time
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+from opentelemetry.context import attach, detach, get_value, set_value
+from opentelemetry.trace import Tracer
+from monocle_apptrace.instrumentation.common.utils import extract_http_headers, clear_http_scopes, get_current_monocle_span
+from monocle_apptrace.instrumentation.common.utils import is_monocle_tracing_enabled, is_recording_tracer
 from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
-from monocle_apptrace.instrumentation.common.constants import HTTP_SUCCESS_CODES
+from monocle_apptrace.instrumentation.common.constants import HTTP_SUCCESS_CODES, ADD_NEW_WORKFLOW
 from monocle_apptrace.instrumentation.common.utils import MonocleSpanException
-from opentelemetry.context import get_current
-from opentelemetry.trace import Span
-from opentelemetry.trace.propagation import _SPAN_KEY
-import json
+from monocle_apptrace.instrumentation.common.overhead_governor import get_overhead_governor
+from monocle_apptrace.instrumentation.common.wrapper import start_as_monocle_span, pre_process_span, post_process_span, get_span_name, apply_tracing_level, unsampled_scope
+from monocle_apptrace.instrumentation.common.wrapper import is_workflow_span
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 import urllib.parse
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 MAX_DATA_LENGTH = 1000
-token_data = local()
-token_data.current_token = None
+# Per request state of the ASGI middleware, each request runs in its own task so concurrent requests never share it
+asgi_request_state: ContextVar[Optional["ASGIRequestState"]] = ContextVar("monocle_asgi_request_state", default=None)
 
 def get_route(scope) -> str:
     return scope.get('path', '')
@@ -29,54 +35,165 @@ def get_params(args) -> dict:
         question = params.get('question', [''])[0]
         return question
     except Exception as e:
-        logger.warning(f"Error extracting params: {e}")
+        diagnostics.warning("extract_params", "Error extracting params: %s", e)
         return {}
 
-def extract_response(response) -> str:
-    try:
-        if hasattr(response, 'body'):
-            data = response.body
-            answer = json.loads(data.decode("utf-8"))
-            return answer
-    except Exception as e:
-        logger.warning(f"Error extracting response: {e}")
-        return ""
-
-def extract_status(instance) -> str:
-    status = f"{instance.status_code}" if hasattr(instance, 'status_code') else ""
+def extract_status(state: "ASGIRequestState") -> str:
+    status = f"{state.status_code}" if state.status_code is not None else ""
     if status not in HTTP_SUCCESS_CODES:
-        error_message = extract_response(instance)
-        raise MonocleSpanException(f"error: {status} - {error_message}")
+        raise MonocleSpanException(f"error: {status}")
     return status
 
+def get_response_metadata(state: "ASGIRequestState") -> dict:
+    metadata = {"response_bytes": state.body_bytes, "response_chunks": state.body_chunks}
+    if state.ttfb_ms is not None:
+        metadata["ttfb_ms"] = state.ttfb_ms
+    return metadata
+
 def fastapi_pre_tracing(scope):
     headers = {k.decode('utf-8').lower(): v.decode('utf-8')
                for k, v in scope.get('headers', [])}
-    token_data.current_token = extract_http_headers(headers)
+    # the middleware spans are monocle spans, they join the caller's trace
+    return extract_http_headers(headers, monocle_parent=True)
 
-def fastapi_post_tracing():
-    clear_http_scopes(token_data.current_token)
-    token_data.current_token = None
+def fastapi_post_tracing(token):
+    clear_http_scopes(token)
 
 class FastAPISpanHandler(SpanHandler):
     def pre_tracing(self, to_wrap, wrapped, instance, args, kwargs):
         scope = args[0] if args else {}
-        fastapi_pre_tracing(scope)
-        return super().pre_tracing(to_wrap, wrapped, instance, args, kwargs)
+        return fastapi_pre_tracing(scope)
+
+    def post_tracing(self, to_wrap, wrapped, instance, args, kwargs, return_value, token=None):
+        fastapi_post_tracing(token)
+
+class ASGIRequestState:
+    """ Wraps the ASGI send callable of a request to capture the response status, time to first byte
+        and the size of the streamed body. The finalizers end the request spans when the last body chunk is sent. """
+    def __init__(self, send: Callable):
+        self.downstream_send = send
+        self.start_ns = time.perf_counter_ns()
+        self.status_code: Optional[int] = None
+        self.ttfb_ms: Optional[float] = None
+        self.body_bytes = 0
+        self.body_chunks = 0
+        self.complete = False
+        self.span_status = None
+        self.finalizers: List[Callable] = []
 
-    def post_tracing(self, to_wrap, wrapped, instance, args, kwargs, return_value):
-        fastapi_post_tracing()
-        return super().post_tracing(to_wrap, wrapped, instance, args, kwargs, return_value)
+    async def send(self, message) -> None:
+        final_chunk = False
+        message_type = message.get("type")
+        if message_type == "http.response.start":
+            self.status_code = message.get("status")
+            self.ttfb_ms = (time.perf_counter_ns() - self.start_ns) / 1e6
+        elif message_type == "http.response.body":
+            self.body_bytes += len(message.get("body", b""))
+            self.body_chunks += 1
+            final_chunk = not message.get("more_body", False)
+        await self.downstream_send(message)
+        if final_chunk:
+            self.finish()
 
-class FastAPIResponseSpanHandler(SpanHandler):
-    def post_tracing(self, to_wrap, wrapped, instance, args, kwargs, return_value):
+    def finish(self, ex: Exception = None) -> None:
+        """ Run the finalizers once, innermost span first """
+        if self.complete:
+            return
+        self.complete = True
+        while self.finalizers:
+            try:
+                self.finalizers.pop()(ex)
+            except Exception as e:
+                diagnostics.info("finish_request_span", "Error occurred in finishing ASGI request span: %s", e)
+
+def record_request_time(state: ASGIRequestState) -> None:
+    governor = get_overhead_governor()
+    if governor is not None:
+        governor.record_request(time.perf_counter_ns() - state.start_ns)
+
+class MonocleASGIMiddleware:
+    """ ASGI middleware that traces http requests of a Starlette or FastAPI application.
+        Streaming and server-sent event responses are traced until the last body chunk is sent. """
+    def __init__(self, app, tracer: Tracer, handler: SpanHandler, to_wrap, source_path: str = ""):
+        self.app = app
+        self.tracer = tracer
+        self.handler = handler
+        self.to_wrap = to_wrap
+        self.source_path = source_path
+
+    async def __call__(self, scope, receive, send):
+        if not is_monocle_tracing_enabled() or not is_recording_tracer(self.tracer):
+            return await self.app(scope, receive, send)
+        # mounted sub applications have their own middleware stack, trace the request only once
+        if scope.get("type") != "http" or asgi_request_state.get() is not None:
+            return await self.app(scope, receive, send)
+        to_wrap = apply_tracing_level(self.to_wrap)
+        if to_wrap is None:
+            with unsampled_scope():
+                return await self.app(scope, receive, send)
+        state = ASGIRequestState(send)
+        state_token = asgi_request_state.set(state)
+        args = (scope, receive, state.send)
+        pre_trace_token = None
         try:
-            ctx = get_current()
-            if ctx is not None:
-                parent_span: Span = ctx.get(_SPAN_KEY)
-                if parent_span is not None:
-                    self.hydrate_events(to_wrap, wrapped, instance, args, kwargs,
-                                        return_value, parent_span=parent_span)
-        except Exception as e:
-            logger.info(f"Failed to propagate fastapi response: {e}")
-        super().post_tracing(to_wrap, wrapped, instance, args, kwargs, return_value)
\ No newline at end of file
+            try:
+                pre_trace_token = self.handler.pre_tracing(to_wrap, self.app, self, args, {})
+            except Exception as e:
+                diagnostics.info("pre_tracing", "Error occurred in pre_tracing: %s", e)
+            if self.handler.skip_span(to_wrap, self.app, self, args, {}):
+                return await self.app(*args)
+            add_workflow_span = get_value(ADD_NEW_WORKFLOW) == True
+            token = attach(set_value(ADD_NEW_WORKFLOW, False))
+            try:
+                await self.trace_request(state, add_workflow_span, args, to_wrap)
+            finally:
+                detach(token)
+        finally:
+            try:
+                self.handler.post_tracing(to_wrap, self.app, self, args, {}, None, token=pre_trace_token)
+            except Exception as e:
+                diagnostics.info("post_tracing", "Error occurred in post_tracing: %s", e)
+            asgi_request_state.reset(state_token)
+
+    async def trace_request(self, state: ASGIRequestState, add_workflow_span: bool, args, to_wrap) -> None:
+        name = get_span_name(to_wrap, self)
+        parent_span = get_current_monocle_span()
+        with start_as_monocle_span(self.tracer, name, False) as span:
+            pre_process_span(name, self.tracer, self.handler, add_workflow_span, to_wrap, self.app, self, args, {},
+                             span, self.source_path)
+            is_request = SpanHandler.is_root_span(span) or add_workflow_span
+            if is_workflow_span(span, add_workflow_span):
+                def finish_workflow_span(ex: Exception):
+                    if state.span_status is not None:
+                        span.set_status(state.span_status)
+                    span.end()
+                    record_request_time(state)
+                state.finalizers.append(finish_workflow_span)
+                await self.trace_request(state, False, args, to_wrap)
+                return
+
+            def finish_request_span(ex: Exception):
+                post_process_span(self.handler, to_wrap, self.app, self, args, {}, state, span, parent_span, ex)
+                state.span_status = span.status
+                span.end()
+                if is_request:
+                    record_request_time(state)
+            state.finalizers.append(finish_request_span)
+            ex: Exception = None
+            try:
+                with SpanHandler.workflow_type(to_wrap, span):
+                    await self.app(*args)
+            except Exception as e:
+                ex = e
+                raise
+            finally:
+                # ends the spans if the application returned without sending the last body chunk
+                state.finish(ex)
+
+def asgi_middleware_wrapper(tracer: Tracer, handler: SpanHandler, to_wrap):
+    """ Add the monocle ASGI middleware as the outermost layer of the Starlette middleware stack.
+        The stack is built once per application, so the middleware is added even when tracing is disabled at that
+        time and checks the kill switch and the tracer provider on each request. """
+    def wrapper(wrapped, instance, args, kwargs, source_path=None):
+        return MonocleASGIMiddleware(wrapped(*args, **kwargs), tracer, handler, to_wrap, source_path or "")
+    return wrapper
@@ -13,10 +13,7 @@ FASTAPI_HTTP_PROCESSOR = {
                 "accessor": lambda arguments: _helper.get_route(arguments['args'][0])
             },
         ]
-    ]
-}
-
-FASTAPI_RESPONSE_PROCESSOR = {
+    ],
     "events": [
         {
             "name": "data.input",
@@ -31,14 +28,20 @@ FASTAPI_RESPONSE_PROCESSOR = {
             "name": "data.output",
             "attributes": [
                 {
+                    "_comment": "status from the http.response.start message",
                     "attribute": "status",
-                    "accessor": lambda arguments: _helper.extract_status(arguments['instance'])
-                },
+                    "accessor": lambda arguments: _helper.extract_status(arguments['result'])
+                }
+            ]
+        },
+        {
+            "name": "metadata",
+            "attributes": [
                 {
-                    "attribute": "response",
-                    "accessor": lambda arguments: _helper.extract_response(arguments['instance'])
+                    "_comment": "time to first byte in ms, streamed body bytes and chunks",
+                    "accessor": lambda arguments: _helper.get_response_metadata(arguments['result'])
                 }
             ]
         }
     ]
-}
\ No newline at end of file
+}
@@ -1,23 +1,23 @@
-from monocle_apptrace.instrumentation.common.wrapper import atask_wrapper
-from monocle_apptrace.instrumentation.metamodel.fastapi.entities.http import FASTAPI_HTTP_PROCESSOR, FASTAPI_RESPONSE_PROCESSOR
+from monocle_apptrace.instrumentation.metamodel.fastapi._helper import asgi_middleware_wrapper
+from monocle_apptrace.instrumentation.metamodel.fastapi.entities.http import FASTAPI_HTTP_PROCESSOR
 
 FASTAPI_METHODS = [
-    # {
-    #     "package": "fastapi",
-    #     "object": "FastAPI",
-    #     "method": "__call__",
-    #     "wrapper_method": atask_wrapper,
-    #     "span_name": "fastapi.request",
-    #     "span_handler": "fastapi_handler",
-    #     "output_processor": FASTAPI_HTTP_PROCESSOR,
-    # },
-    # {
-    #     "package": "starlette.responses",
-    #     "object": "Response",
-    #     "method": "__call__",
-    #     "span_name": "fastapi.response",
-    #     "wrapper_method": atask_wrapper,
-    #     "span_handler": "fastapi_response_handler",
-    #     "output_processor": FASTAPI_RESPONSE_PROCESSOR
-    # }
-]
\ No newline at end of file
+    {
+        "package": "fastapi.applications",
+        "object": "FastAPI",
+        "method": "build_middleware_stack",
+        "wrapper_method": asgi_middleware_wrapper,
+        "span_name": "fastapi.request",
+        "span_handler": "fastapi_handler",
+        "output_processor": FASTAPI_HTTP_PROCESSOR,
+    },
+    {
+        "package": "starlette.applications",
+        "object": "Starlette",
+        "method": "build_middleware_stack",
+        "wrapper_method": asgi_middleware_wrapper,
+        "span_name": "fastapi.request",
+        "span_handler": "fastapi_handler",
+        "output_processor": FASTAPI_HTTP_PROCESSOR,
+    }
+]
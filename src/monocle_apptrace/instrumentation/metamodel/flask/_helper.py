@@ -1,15 +1,19 @@
 import logging
 from threading import local
-from monocle_apptrace.instrumentation.common.utils import extract_http_headers, clear_http_scopes
+from monocle_apptrace.instrumentation.common.utils import extract_http_headers, clear_http_scopes, http_scopes
 from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
 from monocle_apptrace.instrumentation.common.constants import HTTP_SUCCESS_CODES
 from monocle_apptrace.instrumentation.common.utils import MonocleSpanException
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 from urllib.parse import unquote
 from opentelemetry.context import get_current
+from opentelemetry.propagate import get_global_textmap
+from opentelemetry.propagators.textmap import Getter
 from opentelemetry.trace import Span, get_current_span
 from opentelemetry.trace.propagation import _SPAN_KEY
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 MAX_DATA_LENGTH = 1000
 
 def get_route(args) -> str:
@@ -39,13 +43,32 @@ def extract_status(instance) -> str:
         raise MonocleSpanException(f"error: {status} - {error_message}")
     return status
 
+class WSGIEnvironGetter(Getter[dict]):
+    """ Reads request headers directly from the WSGI environ, eg. "traceparent" from environ["HTTP_TRACEPARENT"].
+        The environ keys for the propagator and http scope headers are computed once and reused for every request """
+    def __init__(self):
+        self.environ_keys: dict[str, str] = {}
+        for header in list(get_global_textmap().fields) + list(http_scopes.keys()):
+            self.environ_key(header)
+
+    def environ_key(self, header: str) -> str:
+        environ_key = self.environ_keys.get(header)
+        if environ_key is None:
+            environ_key = "HTTP_" + header.upper().replace("-", "_")
+            self.environ_keys[header] = environ_key
+        return environ_key
+
+    def get(self, carrier: dict, key: str):
+        value = carrier.get(self.environ_key(key))
+        return [value] if value is not None else None
+
+    def keys(self, carrier: dict) -> list:
+        return [key[5:].lower().replace("_", "-") for key in carrier if key.startswith("HTTP_")]
+
+wsgi_environ_getter = WSGIEnvironGetter()
+
 def flask_pre_tracing(args):
-    headers = dict()
-    for key, value in args[0].items():
-        if key.startswith("HTTP_"):
-            new_key = key[5:].lower().replace("_", "-")
-            headers[new_key] = value
-    return extract_http_headers(headers)
+    return extract_http_headers(args[0], getter=wsgi_environ_getter)
 
 def flask_post_tracing(token):
     clear_http_scopes(token)
@@ -67,5 +90,5 @@ class FlaskResponseSpanHandler(SpanHandler):
                 if parent_span is not None:
                     self.hydrate_events(to_wrap, wrapped, instance, args, kwargs, return_value, parent_span=parent_span)
         except Exception as e:
-            logger.info(f"Failed to propogate flask response: {e}")
+            diagnostics.info("flask_response", "Failed to propogate flask response: %s", e)
         super().post_tracing(to_wrap, wrapped, instance, args, kwargs, return_value)
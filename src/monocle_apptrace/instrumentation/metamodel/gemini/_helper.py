@@ -1,5 +1,6 @@
 import logging
 from monocle_apptrace.instrumentation.common.utils import (
+    cached_instance_attribute,
     get_exception_message,
     get_json_dumps,
     get_status_code,
@@ -8,8 +9,10 @@ from monocle_apptrace.instrumentation.metamodel.finish_types import (
     map_gemini_finish_reason_to_finish_type,
     GEMINI_FINISH_REASON_MAPPING
 )
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 def resolve_from_alias(my_map, alias):
     """Find a alias that is not none from list of aliases"""
@@ -41,7 +44,7 @@ def extract_messages(kwargs):
 
         return [get_json_dumps(message) for message in messages]
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_messages: %s", str(e))
+        diagnostics.warning("extract_messages", "Error occurred in extract_messages: %s", e)
         return []
 
 def extract_assistant_message(arguments):
@@ -61,7 +64,7 @@ def extract_assistant_message(arguments):
                 return arguments["result"].error
         return get_json_dumps(messages[0]) if messages else ""
     except (IndexError, AttributeError) as e:
-        logger.warning("Warning: Error occurred in extract_assistant_message: %s", str(e))
+        diagnostics.warning("extract_assistant_message", "Error occurred in extract_assistant_message: %s", e)
         return None
 
 def update_input_span_events(kwargs):
@@ -76,13 +79,14 @@ def update_output_span_events(results):
             output = str(results.embeddings[0].values[:100]) + "..."
             return output
 
+@cached_instance_attribute("_api_client._http_options.base_url")
 def extract_inference_endpoint(instance):
     try:
         if hasattr(instance,'_api_client') and hasattr(instance._api_client, '_http_options'):
             if hasattr(instance._api_client._http_options,'base_url'):
                 return instance._api_client._http_options.base_url
     except Exception as e:
-        logger.warning("Warning: Error occurred in inference endpoint: %s", str(e))
+        diagnostics.warning("inference_endpoint", "Error occurred in inference endpoint: %s", e)
         return []
 
 def update_span_from_llm_response(response, instance):
@@ -111,7 +115,7 @@ def extract_finish_reason(arguments):
             return response.candidates[0].finish_reason
             
     except (IndexError, AttributeError) as e:
-        logger.warning("Warning: Error occurred in extract_finish_reason: %s", str(e))
+        diagnostics.warning("extract_finish_reason", "Error occurred in extract_finish_reason: %s", e)
         return None
     return None
 
@@ -1,7 +1,9 @@
 import logging
 
 from monocle_apptrace.instrumentation.common.utils import (
+    cached_instance_attribute,
     Option,
+    format_vector,
     get_json_dumps,
     get_keys_as_tuple,
     get_nested_value,
@@ -10,8 +12,10 @@ from monocle_apptrace.instrumentation.common.utils import (
     get_status_code,
 )
 from monocle_apptrace.instrumentation.metamodel.finish_types import map_haystack_finish_reason_to_finish_type
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 
 def extract_messages(kwargs):
@@ -32,7 +36,7 @@ def extract_messages(kwargs):
 
         return [str(message) for message in messages]
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_messages: %s", str(e))
+        diagnostics.warning("extract_messages", "Error occurred in extract_messages: %s", e)
         return []
 
 
@@ -54,7 +58,7 @@ def extract_question_from_prompt(content):
 
         return question
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_question_from_prompt: %s", str(e))
+        diagnostics.warning("extract_question_from_prompt", "Error occurred in extract_question_from_prompt: %s", e)
         return ""
 
 def extract_assistant_message(arguments):
@@ -117,6 +121,7 @@ def resolve_from_alias(my_map, alias):
             return my_map[i]
     return None
 
+@cached_instance_attribute("_model_name", "client.base_url", "client.meta.endpoint_url")
 def extract_inference_endpoint(instance):
     if hasattr(instance, '_model_name') and isinstance(instance._model_name, str) and 'gemini' in instance._model_name.lower():
         inference_endpoint = try_option(lambda: f"https://generativelanguage.googleapis.com/v1beta/models/{instance._model_name}:generateContent")
@@ -150,6 +155,13 @@ def update_span_from_llm_response(response, instance):
     return meta_dict
 
 
+def extract_query_embedding(kwargs):
+    """ Summary of the query vector passed to embedding retrievers, the full vector is not captured """
+    query_embedding = kwargs.get("query_embedding")
+    if query_embedding is None:
+        return None
+    return format_vector(query_embedding)
+
 def update_output_span_events(results):
     output_arg_text = " ".join([doc.content for doc in results['documents']])
     if len(output_arg_text) > 100:
@@ -211,7 +223,7 @@ def extract_finish_reason(arguments):
         # Fallback: if no finish_reason found, default to "stop" (success)
         return "stop"
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_finish_reason: %s", str(e))
+        diagnostics.warning("extract_finish_reason", "Error occurred in extract_finish_reason: %s", e)
         return None
 
 def map_finish_reason_to_finish_type(finish_reason):
@@ -44,6 +44,11 @@ RETRIEVAL = {
                  "_comment": "this is instruction and user query to LLM",
                  "attribute": "input",
                  "accessor": lambda arguments: get_attribute("input")
+             },
+             {
+                 "_comment": "query vector summary",
+                 "attribute": "query_embedding",
+                 "accessor": lambda arguments: _helper.extract_query_embedding(arguments['kwargs'])
              }
          ]
          },
@@ -0,0 +1,138 @@
+import inspect
+import logging
+import time
+from urllib.parse import urlparse, ParseResult
+from opentelemetry.propagate import inject
+from opentelemetry.trace import set_span_in_context
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.utils import add_monocle_trace_state, get_current_monocle_span
+from monocle_apptrace.instrumentation.common.constants import MONOCLE_SDK_VERSION
+from monocle_apptrace.instrumentation.common.url_matcher import get_url_matcher, PROPAGATE_ONLY
+
+logger = logging.getLogger(__name__)
+
+# httpcore calls request.extensions["trace"] with "<protocol>.<phase>.<started|complete|failed>" events
+TRACE_EXTENSION = "trace"
+TIMINGS_EXTENSION = "monocle.timings"
+PHASE_ATTRIBUTES = {
+    "connect_tcp": "connect_ms",
+    "connect_unix_socket": "connect_ms",
+    "start_tls": "tls_ms",
+    "receive_response_body": "body_read_ms",
+}
+REQUEST_SENT_PHASES = ("send_request_headers", "send_request_body")
+FIRST_BYTE_PHASE = "receive_response_headers"
+MAX_DATA_LENGTH = 1000
+
+def get_request(args, kwargs):
+    return args[0] if len(args) > 0 else kwargs.get('request')
+
+def get_url(args, kwargs) -> str:
+    request = get_request(args, kwargs)
+    return str(request.url) if request is not None else ""
+
+def get_route(args, kwargs) -> str:
+    parsed_url:ParseResult = urlparse(get_url(args, kwargs))
+    return f"{parsed_url.netloc}{parsed_url.path}"
+
+def get_method(args, kwargs) -> str:
+    request = get_request(args, kwargs)
+    return request.method if request is not None else 'GET'
+
+def get_params(args, kwargs) -> str:
+    return urlparse(get_url(args, kwargs)).query
+
+def extract_response(result) -> str:
+    # only the start of the body, a LLM SDK response is already captured by the inference span
+    try:
+        return result.content[:MAX_DATA_LENGTH].decode(result.encoding or "utf-8", errors="replace")
+    except Exception:
+        # streamed response body that the caller hasn't read yet
+        return ""
+
+def extract_status(result) -> str:
+    return f"{result.status_code}"
+
+def get_timings(args, kwargs) -> dict:
+    request = get_request(args, kwargs)
+    recorder = request.extensions.get(TIMINGS_EXTENSION) if request is not None else None
+    return recorder.get_timings() if recorder is not None else {}
+
+class HttpxTimingRecorder:
+    """ Collects connection phase timings from httpcore trace events, chaining to any trace callback set by the caller """
+    def __init__(self, chained=None):
+        self.chained = chained
+        self.started = {}
+        self.timings = {}
+        self.request_sent = None
+        self.first_byte = None
+
+    def record(self, event_name: str, info) -> None:
+        try:
+            name, _, stage = event_name.rpartition(".")
+            phase = name.rpartition(".")[2]
+            now = time.perf_counter_ns()
+            if stage == "started":
+                self.started[phase] = now
+            elif stage == "complete":
+                if phase in PHASE_ATTRIBUTES and phase in self.started:
+                    self.timings[PHASE_ATTRIBUTES[phase]] = (now - self.started[phase]) / 1e6
+                if phase in REQUEST_SENT_PHASES:
+                    self.request_sent = now
+                elif phase == FIRST_BYTE_PHASE and self.request_sent is not None:
+                    self.first_byte = now
+        except Exception as e:
+            logger.debug("Error recording httpx timing for %s: %s", event_name, e)
+
+    def get_timings(self) -> dict:
+        timings = dict(self.timings)
+        if self.first_byte is not None:
+            timings["ttfb_ms"] = (self.first_byte - self.request_sent) / 1e6
+        return timings
+
+    def sync_trace(self, event_name: str, info) -> None:
+        self.record(event_name, info)
+        if self.chained is not None:
+            self.chained(event_name, info)
+
+    async def async_trace(self, event_name: str, info) -> None:
+        self.record(event_name, info)
+        if self.chained is not None:
+            await self.chained(event_name, info)
+
+def inject_trace_headers(request, span=None) -> None:
+    # request headers are shared by the workflow and http spans, add the monocle trace state only once
+    if MONOCLE_SDK_VERSION not in request.headers.get("tracestate", ""):
+        add_monocle_trace_state(request.headers)
+    # monocle spans are isolated from the current otel span, propagate the monocle span when there is one
+    span = span or get_current_monocle_span()
+    inject(request.headers, context=set_span_in_context(span) if span.get_span_context().is_valid else None)
+
+def add_timing_recorder(request, is_async: bool) -> None:
+    previous = request.extensions.get(TIMINGS_EXTENSION)
+    # the workflow span and the http span both run pre task processing, keep only the innermost recorder
+    chained = previous.chained if previous is not None else request.extensions.get(TRACE_EXTENSION)
+    recorder = HttpxTimingRecorder(chained)
+    request.extensions[TIMINGS_EXTENSION] = recorder
+    request.extensions[TRACE_EXTENSION] = recorder.async_trace if is_async else recorder.sync_trace
+
+class HttpxSpanHandler(SpanHandler):
+
+    def pre_tracing(self, to_wrap, wrapped, instance, args, kwargs):
+        # propagate the trace context without creating a span
+        request = get_request(args, kwargs)
+        if request is not None and get_url_matcher().match(str(request.url)) == PROPAGATE_ONLY:
+            inject_trace_headers(request)
+
+    def skip_span(self, to_wrap, wrapped, instance, args, kwargs) -> bool:
+        request = get_request(args, kwargs)
+        if request is None:
+            return True
+        url_flag = get_url_matcher().match(str(request.url))
+        return url_flag is None or url_flag == PROPAGATE_ONLY
+
+    def pre_task_processing(self, to_wrap, wrapped, instance, args, kwargs, span):
+        request = get_request(args, kwargs)
+        inject_trace_headers(request, span)
+        add_timing_recorder(request, inspect.iscoroutinefunction(wrapped))
+        super().pre_task_processing(to_wrap, wrapped, instance, args, kwargs, span)
@@ -0,0 +1,54 @@
+from monocle_apptrace.instrumentation.metamodel.httpx import _helper
+HTTPX_PROCESSOR = {
+    "type": "http.send",
+    "attributes": [
+        [
+            {
+                "_comment": "request method, request URI",
+                "attribute": "method",
+                "accessor": lambda arguments: _helper.get_method(arguments['args'], arguments['kwargs'])
+            },
+            {
+                "_comment": "request method, request URI",
+                "attribute": "URL",
+                "accessor": lambda arguments: _helper.get_route(arguments['args'], arguments['kwargs'])
+            }
+
+        ]
+    ],
+    "events": [
+        {"name": "data.input",
+         "attributes": [
+             {
+                 "_comment": "route params",
+                 "attribute": "http.params",
+                 "accessor": lambda arguments: _helper.get_params(arguments['args'], arguments['kwargs'])
+             }
+         ]
+         },
+        {
+            "name": "data.output",
+            "attributes": [
+                {
+                    "_comment": "status from HTTP response",
+                    "attribute": "status",
+                    "accessor": lambda arguments: _helper.extract_status(arguments['result'])
+                },
+                {
+                    "_comment": "response body, empty for streamed responses",
+                    "attribute": "response",
+                    "accessor": lambda arguments: _helper.extract_response(arguments['result'])
+                }
+            ]
+        },
+        {
+            "name": "metadata",
+            "attributes": [
+                {
+                    "_comment": "connect, tls, time to first byte and body read durations in ms",
+                    "accessor": lambda arguments: _helper.get_timings(arguments['args'], arguments['kwargs'])
+                }
+            ]
+        }
+    ]
+}
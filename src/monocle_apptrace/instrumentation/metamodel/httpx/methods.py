@@ -0,0 +1,21 @@
+from monocle_apptrace.instrumentation.common.wrapper import task_wrapper, atask_wrapper
+from monocle_apptrace.instrumentation.metamodel.httpx.entities.http import HTTPX_PROCESSOR
+
+HTTPX_METHODS = [
+    {
+        "package": "httpx",
+        "object": "Client",
+        "method": "send",
+        "wrapper_method": task_wrapper,
+        "span_handler": "httpx_handler",
+        "output_processor": HTTPX_PROCESSOR
+    },
+    {
+        "package": "httpx",
+        "object": "AsyncClient",
+        "method": "send",
+        "wrapper_method": atask_wrapper,
+        "span_handler": "httpx_handler",
+        "output_processor": HTTPX_PROCESSOR
+    }
+]
@@ -7,6 +7,7 @@ import logging
 from opentelemetry.context import get_value
 from monocle_apptrace.instrumentation.common.constants import AGENT_PREFIX_KEY, INFERENCE_AGENT_DELEGATION, INFERENCE_COMMUNICATION, INFERENCE_TOOL_CALL
 from monocle_apptrace.instrumentation.common.utils import (
+    cached_instance_attribute,
     Option,
     get_json_dumps,
     get_keys_as_tuple,
@@ -16,9 +17,11 @@ from monocle_apptrace.instrumentation.common.utils import (
     get_status_code,
 )
 from monocle_apptrace.instrumentation.metamodel.finish_types import map_langchain_finish_reason_to_finish_type
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 
 def extract_messages(args):
@@ -44,7 +47,7 @@ def extract_messages(args):
                         messages.append({msg.type: get_json_dumps(msg.tool_calls)})
         return [get_json_dumps(d) for d in messages]
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_messages: %s", str(e))
+        diagnostics.warning("extract_messages", "Error occurred in extract_messages: %s", e)
         return []
 def agent_inference_type(arguments):
     """Extract agent inference type from arguments."""
@@ -60,7 +63,7 @@ def agent_inference_type(arguments):
         return INFERENCE_COMMUNICATION
             
     except Exception as e:
-        logger.warning("Warning: Error occurred in agent_inference_type: %s", str(e))
+        diagnostics.warning("agent_inference_type", "Error occurred in agent_inference_type: %s", e)
         return None
 
 def extract_assistant_message(arguments):
@@ -86,6 +89,7 @@ def extract_assistant_message(arguments):
             return arguments["result"].error
     return get_json_dumps(messages[0]) if messages else ""
 
+@cached_instance_attribute("client.universe_domain", "client._client.base_url", "_client.base_url")
 def extract_provider_name(instance):
     provider_url: Option[str] = Option(None)
     if hasattr(instance, 'client'):
@@ -98,6 +102,8 @@ def extract_provider_name(instance):
     return provider_url.unwrap_or(None)
 
 
+@cached_instance_attribute("client.transport.host", "client.meta.endpoint_url", "client._client.base_url", "_client.base_url",
+                           "client.universe_domain")
 def extract_inference_endpoint(instance):
     inference_endpoint: Option[str] = None
     # instance.client.meta.endpoint_url
@@ -256,7 +262,7 @@ def extract_finish_reason(arguments):
             return "error"
             
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_finish_reason: %s", str(e))
+        diagnostics.warning("extract_finish_reason", "Error occurred in extract_finish_reason: %s", e)
         return None
     
     return None
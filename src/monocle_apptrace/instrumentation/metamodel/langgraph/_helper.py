@@ -1,7 +1,9 @@
 from opentelemetry.context import get_value
 from monocle_apptrace.instrumentation.common.utils import resolve_from_alias
 import logging
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 DELEGATION_NAME_PREFIX = 'transfer_to_'
 ROOT_AGENT_NAME = 'LangGraph'
@@ -13,7 +15,7 @@ def extract_agent_response(response):
             output = response["messages"][-1]
             return str(output.content)
     except Exception as e:
-        logger.warning("Warning: Error occurred in handle_response: %s", str(e))
+        diagnostics.warning("handle_response", "Error occurred in handle_response: %s", e)
     return ""
 
 def agent_instructions(arguments):
@@ -11,8 +11,10 @@ from monocle_apptrace.instrumentation.common.utils import (
     get_exception_message,
     get_status_code,
 )
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 
 def extract_messages(kwargs):
@@ -26,7 +28,7 @@ def extract_messages(kwargs):
 
         return [get_json_dumps(message) for message in messages]
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_messages: %s", str(e))
+        diagnostics.warning("extract_messages", "Error occurred in extract_messages: %s", e)
         return []
 
 
@@ -52,9 +54,7 @@ def extract_assistant_message(arguments):
                 return arguments["result"].error
 
     except (IndexError, AttributeError) as e:
-        logger.warning(
-            "Warning: Error occurred in extract_assistant_message: %s", str(e)
-        )
+        diagnostics.warning("extract_assistant_message", "Error occurred in extract_assistant_message: %s", e)
         return None
 
 def extract_provider_name(url):
@@ -9,7 +9,9 @@ from urllib.parse import urlparse
 from opentelemetry.sdk.trace import Span
 from opentelemetry.context import get_value
 from monocle_apptrace.instrumentation.common.utils import (
+    cached_instance_attribute,
     Option,
+    format_vector,
     get_json_dumps,
     get_keys_as_tuple,
     get_nested_value,
@@ -18,9 +20,11 @@ from monocle_apptrace.instrumentation.common.utils import (
     get_status_code,
 )
 from monocle_apptrace.instrumentation.metamodel.finish_types import map_llamaindex_finish_reason_to_finish_type
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 LLAMAINDEX_AGENT_NAME_KEY = "_active_agent_name"
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 def get_status(result):
     if result is not None and hasattr(result, 'status'):
@@ -203,10 +207,11 @@ def extract_query_from_content(content):
             query = content[query_start:answer_start].strip()
         return query
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_query_from_content: %s", str(e))
+        diagnostics.warning("extract_query_from_content", "Error occurred in extract_query_from_content: %s", e)
         return ""
 
 
+@cached_instance_attribute("api_base", "_client.base_url", "model")
 def extract_provider_name(instance):
     if hasattr(instance,'api_base'):
         provider_url: Option[str]= try_option(getattr, instance, 'api_base').and_then(lambda url: urlparse(url).hostname)
@@ -217,6 +222,7 @@ def extract_provider_name(instance):
     return provider_url.unwrap_or(None)
 
 
+@cached_instance_attribute("_client.sdk_configuration.server_url", "_client.base_url", "model", "api_base")
 def extract_inference_endpoint(instance):
     if hasattr(instance,'_client'):
         if hasattr(instance._client,'sdk_configuration'):
@@ -270,6 +276,13 @@ def update_input_span_events(args):
         return args[0].query_str if len(args) > 0 else ""
 
 
+def extract_query_embedding(args):
+    """ Summary of a precomputed QueryBundle embedding, the full vector is not captured """
+    if isinstance(args, tuple) and len(args) > 0 and getattr(args[0], "embedding", None) is not None:
+        return format_vector(args[0].embedding)
+    return None
+
+
 def update_output_span_events(results):
     if isinstance(results, list) and len(results) >0:
         output_arg_text = results[0].text
@@ -370,7 +383,7 @@ def extract_finish_reason(arguments):
             return "error"
             
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_finish_reason: %s", str(e))
+        diagnostics.warning("extract_finish_reason", "Error occurred in extract_finish_reason: %s", e)
         return None
     
     return None
@@ -40,6 +40,11 @@ RETRIEVAL = {
                  "_comment": "this is instruction and user query to LLM",
                  "attribute": "input",
                  "accessor": lambda arguments: _helper.update_input_span_events(arguments['args'])
+             },
+             {
+                 "_comment": "query vector summary",
+                 "attribute": "query_embedding",
+                 "accessor": lambda arguments: _helper.extract_query_embedding(arguments['args'])
              }
          ]
          },
@@ -1,14 +1,16 @@
 from monocle_apptrace.instrumentation.common.utils import with_tracer_wrapper
 from opentelemetry.context import attach, set_value, get_value, detach
 from monocle_apptrace.instrumentation.common.utils import resolve_from_alias
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 import logging
 import json
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 
 def log(arguments):
-    print(f"Arguments: {arguments}")
+    diagnostics.debug("arguments", "Arguments: %s", arguments)
 
 
 def get_output_text(arguments):
@@ -71,7 +73,7 @@ def get_params_arguments(arguments):
         try:
             return json.dumps(args[0].root.params.arguments)
         except (TypeError, ValueError) as e:
-            logger.error(f"Error serializing arguments: {e}")
+            diagnostics.error("serialize_arguments", "Error serializing arguments: %s", e)
             return str(args[0].root.params.arguments)
 
 
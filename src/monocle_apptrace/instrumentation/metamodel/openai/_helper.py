@@ -7,7 +7,9 @@ import json
 import logging
 from opentelemetry.context import get_value
 from monocle_apptrace.instrumentation.common.utils import (
+    cached_instance_attribute,
     Option,
+    format_vector,
     get_json_dumps,
     try_option,
     get_exception_message,
@@ -20,8 +22,10 @@ from monocle_apptrace.instrumentation.metamodel.finish_types import (
     OPENAI_FINISH_REASON_MAPPING
 )
 from monocle_apptrace.instrumentation.common.constants import AGENT_PREFIX_KEY, CHILD_ERROR_CODE, INFERENCE_AGENT_DELEGATION, INFERENCE_COMMUNICATION, INFERENCE_TOOL_CALL
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 def extract_messages(kwargs):
     """Extract system and user messages"""
@@ -117,11 +121,11 @@ def extract_messages(kwargs):
                             }))
                         messages.append({msg['role']: tool_call_messages})
                     except Exception as e:
-                        logger.warning("Warning: Error occurred while processing tool calls: %s", str(e))
+                        diagnostics.warning("tool_calls", "Error occurred while processing tool calls: %s", e)
 
         return [get_json_dumps(message) for message in messages]
     except Exception as e:
-        logger.warning("Warning: Error occurred in extract_messages: %s", str(e))
+        diagnostics.warning("extract_messages", "Error occurred in extract_messages: %s", e)
         return []
 
 
@@ -177,17 +181,17 @@ def extract_assistant_message(arguments):
                 return arguments["result"].error
 
     except (IndexError, AttributeError) as e:
-        logger.warning(
-            "Warning: Error occurred in extract_assistant_message: %s", str(e)
-        )
+        diagnostics.warning("extract_assistant_message", "Error occurred in extract_assistant_message: %s", e)
         return None
 
 
+@cached_instance_attribute("_client.base_url")
 def extract_provider_name(instance):
     provider_url: Option[str] = try_option(getattr, instance._client.base_url, 'host')
     return provider_url.unwrap_or(None)
 
 
+@cached_instance_attribute("_client.base_url", "client.meta.endpoint_url")
 def extract_inference_endpoint(instance):
     inference_endpoint: Option[str] = try_option(getattr, instance._client, 'base_url').map(str)
     if inference_endpoint.is_none() and "meta" in instance.client.__dict__:
@@ -213,11 +217,8 @@ def update_input_span_events(kwargs):
 def update_output_span_events(results):
     if hasattr(results,'data') and isinstance(results.data, list):
         embeddings = results.data
-        embedding_strings = [f"index={e.index}, embedding={e.embedding}" for e in embeddings]
-        output = '\n'.join(embedding_strings)
-        if len(output) > 100:
-            output = output[:100] + "..."
-        return output
+        embedding_strings = [f"index={e.index}, embedding={format_vector(e.embedding)}" for e in embeddings]
+        return '\n'.join(embedding_strings)
 
 
 def update_span_from_llm_response(response):
@@ -242,11 +243,12 @@ def extract_vector_input(vector_input: dict):
 def extract_vector_output(vector_output):
     try:
         if hasattr(vector_output, 'data') and len(vector_output.data) > 0:
-            return vector_output.data[0].embedding
+            return format_vector(vector_output.data[0].embedding)
     except Exception as e:
         pass
     return ""
 
+@cached_instance_attribute("_client._api_version")
 def get_inference_type(instance):
     inference_type: Option[str] = try_option(getattr, instance._client, '_api_version')
     if inference_type.unwrap_or(None):
@@ -297,7 +299,7 @@ def extract_finish_reason(arguments):
             if hasattr(response.choices[0], "finish_reason"):
                 return response.choices[0].finish_reason
     except (IndexError, AttributeError) as e:
-        logger.warning("Warning: Error occurred in extract_finish_reason: %s", str(e))
+        diagnostics.warning("extract_finish_reason", "Error occurred in extract_finish_reason: %s", e)
         return None
     return None
 
@@ -10,8 +10,10 @@ from monocle_apptrace.instrumentation.common.utils import (
     patch_instance_method,
     resolve_from_alias,
 )
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 
 def _process_stream_item(item, state):
@@ -64,10 +66,7 @@ def _process_stream_item(item, state):
                 state["finish_reason"] = finish_reason
 
     except Exception as e:
-        logger.warning(
-            "Warning: Error occurred while processing stream item: %s",
-            str(e),
-        )
+        diagnostics.warning("stream_item", "Error occurred while processing stream item: %s", e)
     finally:
         state["accumulated_temp_list"].append(item)
 
@@ -99,10 +98,7 @@ def _create_span_result(state, stream_start_time):
             if (item.choices and item.choices[0].finish_reason):
                 state["finish_reason"] = item.choices[0].finish_reason
         except Exception as e:
-            logger.warning(
-                "Warning: Error occurred while processing tool calls: %s",
-                str(e),
-            )
+            diagnostics.warning("tool_calls", "Error occurred while processing tool calls: %s", e)
 
     """Create the span result object."""
     return SimpleNamespace(
@@ -1,8 +1,8 @@
 import os
-from  monocle_apptrace.instrumentation.metamodel.requests import allowed_urls
 from opentelemetry.propagate import inject
 from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
 from monocle_apptrace.instrumentation.common.utils import add_monocle_trace_state
+from monocle_apptrace.instrumentation.common.url_matcher import get_url_matcher, PROPAGATE_ONLY
 from urllib.parse import urlparse, ParseResult
 
 
@@ -44,16 +44,20 @@ def request_pre_task_processor(kwargs):
     kwargs['headers'] = headers
 
 def request_skip_span(kwargs) -> bool:
-    # add traceparent to the request headers in kwargs
-    if 'url' in kwargs:
-        url:str = kwargs['url']
-        for allowed_url in allowed_urls:
-            if url.startswith(allowed_url.strip()):
-                return False
-    return True
+    # only urls configured in MONOCLE_TRACE_PROPAGATATION_URLS are traced
+    url_flag = get_url_matcher().match(kwargs.get('url'))
+    return url_flag is None or url_flag == PROPAGATE_ONLY
+
+def request_propagate_only(kwargs) -> None:
+    # propagate the trace context without creating a span
+    if get_url_matcher().match(kwargs.get('url')) == PROPAGATE_ONLY:
+        request_pre_task_processor(kwargs)
 
 class RequestSpanHandler(SpanHandler):
 
+    def pre_tracing(self, to_wrap, wrapped, instance, args, kwargs):
+        request_propagate_only(kwargs)
+
     def pre_task_processing(self, to_wrap, wrapped, instance, args,kwargs, span):
         request_pre_task_processor(kwargs)
         super().pre_task_processing(to_wrap, wrapped, instance, args,kwargs,span)
@@ -1,6 +1,7 @@
 import json
 import logging
 from monocle_apptrace.instrumentation.common.utils import (
+    cached_instance_attribute,
     Option,
     MonocleSpanException,
     get_keys_as_tuple,
@@ -15,7 +16,9 @@ from monocle_apptrace.instrumentation.metamodel.finish_types import (
     TEAMSAI_FINISH_REASON_MAPPING
 )
 from monocle_apptrace.instrumentation.common.constants import CHILD_ERROR_CODE
+from monocle_apptrace.instrumentation.common.diagnostics import get_diagnostics_logger
 logger = logging.getLogger(__name__)
+diagnostics = get_diagnostics_logger(__name__)
 
 def extract_messages(arguments):
     """
@@ -23,43 +26,36 @@ def extract_messages(arguments):
     Args:
         arguments (dict): Arguments containing state and context information
     Returns:
-        str: The input message or error message
+        list: The input messages
     """
+    # Get the memory object from kwargs
+    kwargs = arguments.get("kwargs", {})
+    messages = []
+
+    # If memory exists, try to get the input from temp
+    if "memory" in kwargs:
+        memory = kwargs["memory"]
+        # Check if it's a TurnState object
+        if hasattr(memory, "get"):
+            # Use proper TurnState.get() method
+            temp = memory.get("temp")
+            if temp and hasattr(temp, "get"):
+                input_value = temp.get("input")
+                if input_value:
+                    messages.append({'user': str(input_value)})
+    system_prompt = ""
     try:
-        # Get the memory object from kwargs
-        kwargs = arguments.get("kwargs", {})
-        messages = []
-
-        # If memory exists, try to get the input from temp
-        if "memory" in kwargs:
-            memory = kwargs["memory"]
-            # Check if it's a TurnState object
-            if hasattr(memory, "get"):
-                # Use proper TurnState.get() method
-                temp = memory.get("temp")
-                if temp and hasattr(temp, "get"):
-                    input_value = temp.get("input")
-                    if input_value:
-                        messages.append({'user': str(input_value)})
-        system_prompt = ""
-        try:
-            system_prompt = kwargs.get("template").prompt.sections[0].sections[0].template
-            messages.append({'system': system_prompt})
-        except Exception as e:
-            print(f"Debug - Error accessing system prompt: {str(e)}")
-            
-        # Try alternative path through context if memory path fails
-        context = kwargs.get("context")
-        if hasattr(context, "activity") and hasattr(context.activity, "text"):
-            messages.append({'user': str(context.activity.text)})
-
-        return [get_json_dumps(message) for message in messages]
+        system_prompt = kwargs.get("template").prompt.sections[0].sections[0].template
+        messages.append({'system': system_prompt})
     except Exception as e:
-        print(f"Debug - Arguments structure: {str(arguments)}")
-        print(f"Debug - kwargs: {str(kwargs)}")
-        if "memory" in kwargs:
-            print(f"Debug - memory type: {type(kwargs['memory'])}")
-        return f"Error capturing input: {str(e)}"
+        diagnostics.debug("system_prompt", "Error accessing system prompt: %s", e)
+
+    # Try alternative path through context if memory path fails
+    context = kwargs.get("context")
+    if hasattr(context, "activity") and hasattr(context.activity, "text"):
+        messages.append({'user': str(context.activity.text)})
+
+    return [get_json_dumps(message) for message in messages]
 
 def capture_prompt_info(arguments):
     """Captures prompt information from ActionPlanner state"""
@@ -161,11 +157,13 @@ def map_finish_reason_to_finish_type(finish_reason):
 
     return map_teamsai_finish_reason_to_finish_type(finish_reason)
 
+@cached_instance_attribute("_client.base_url")
 def extract_provider_name(instance):
     provider_url: Option[str] = try_option(getattr, instance._client.base_url, 'host')
     return provider_url.unwrap_or(None)
 
 
+@cached_instance_attribute("_client.base_url", "client.meta.endpoint_url")
 def extract_inference_endpoint(instance):
     inference_endpoint: Option[str] = try_option(getattr, instance._client, 'base_url').map(str)
     if inference_endpoint.is_none() and "meta" in instance.client.__dict__:
@@ -0,0 +1,65 @@
+"""
+Spans, exported bytes and throughput per FastAPI request with the default separate workflow span
+and with MONOCLE_COMPACT_WORKFLOW_SPAN, where the request span carries the workflow entities.
+
+    python tests/benchmark/compact_workflow_span_benchmark.py
+"""
+import asyncio
+import time
+
+from fastapi import FastAPI
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common import wrapper
+from monocle_apptrace.instrumentation.common.constants import MONOCLE_INSTRUMENTOR
+from monocle_apptrace.instrumentation.common.instrumentor import setup_monocle_telemetry
+
+REQUESTS = 2000
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/hello")
+    async def hello():
+        return {"message": "hello"}
+    return app
+
+async def call_app(app, index: int) -> None:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/hello", "raw_path": b"/hello", "root_path": "", "query_string": f"q={index}".encode(),
+        "headers": [], "client": ("127.0.0.1", 1234), "server": ("benchmark", 80),
+    }
+    request_sent = False
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.disconnect"}
+    async def send(message):
+        pass
+    await app(scope, receive, send)
+
+async def run_requests(app) -> float:
+    start = time.perf_counter()
+    for index in range(REQUESTS):
+        await call_app(app, index)
+    return time.perf_counter() - start
+
+def main():
+    exporter = InMemorySpanExporter()
+    setup_monocle_telemetry(workflow_name="compact_benchmark", span_processors=[SimpleSpanProcessor(exporter)])
+    for name, compact in (("workflow span", False), ("compact root span", True)):
+        wrapper.COMPACT_WORKFLOW_SPANS = compact
+        exporter.clear()
+        seconds = asyncio.run(run_requests(create_app()))
+        # FastAPI adds its own request spans, count the Monocle ones
+        spans = [span for span in exporter.get_finished_spans() if span.instrumentation_scope.name == MONOCLE_INSTRUMENTOR]
+        exported_bytes = sum(len(span.to_json(indent=None)) for span in spans)
+        print(f"{name:>18}: {len(spans) / REQUESTS:.1f} spans/request, {exported_bytes / REQUESTS:.0f} bytes/request, "
+              f"{REQUESTS / seconds:.0f} requests/s")
+
+if __name__ == "__main__":
+    main()
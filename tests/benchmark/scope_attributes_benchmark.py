@@ -0,0 +1,61 @@
+"""
+Cost of applying active scopes to spans with 20 Teams scopes in the context.
+Compares re-scanning the baggage for every span against the cached scope attribute snapshot.
+
+    python tests/benchmark/scope_attributes_benchmark.py
+"""
+import timeit
+from types import SimpleNamespace
+
+from opentelemetry.sdk.trace import TracerProvider
+
+from monocle_apptrace.instrumentation.common.utils import get_scope_attributes, get_scopes, remove_scopes, set_scopes
+from monocle_apptrace.instrumentation.metamodel.teamsai.methods import get_id
+
+SPANS = 20000
+
+def teams_context():
+    activity = SimpleNamespace(
+        channel_id="msteams",
+        type="message",
+        conversation=SimpleNamespace(id="19:conversation", conversation_type="channel", name="General"),
+        from_property=SimpleNamespace(id="29:user", name="Alex", role="user"),
+        recipient=SimpleNamespace(id="28:bot"),
+        channel_data={
+            "tenant": {"id": "tenant-id"},
+            "team": {"id": "team-id", "name": "Support"},
+            "channel": {"id": "channel-id", "name": "General"},
+        },
+    )
+    return SimpleNamespace(activity=activity)
+
+def active_scopes() -> dict:
+    scopes = get_id([], {"context": teams_context()})
+    for i in range(20 - len(scopes)):
+        scopes[f"app.scope_{i}"] = f"value_{i}"
+    return scopes
+
+def rescan_baggage(span):
+    for _ in range(2):
+        for scope_key, scope_value in get_scopes().items():
+            span.set_attribute(f"scope.{scope_key}", scope_value)
+
+def cached_snapshot(span):
+    for _ in range(2):
+        span.set_attributes(get_scope_attributes())
+
+def main():
+    tracer = TracerProvider().get_tracer("benchmark")
+    token = set_scopes(active_scopes())
+    try:
+        assert len(get_scope_attributes()) == 20
+        for name, apply_scopes in (("rescan baggage", rescan_baggage), ("cached snapshot", cached_snapshot)):
+            span = tracer.start_span("bench")
+            seconds = timeit.timeit(lambda: apply_scopes(span), number=SPANS)
+            span.end()
+            print(f"{name:>16}: {seconds / SPANS * 1e6:.2f} us per span")
+    finally:
+        remove_scopes(token)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Overhead of an instrumented call when Monocle tracing is disabled or the tracer provider is a no-op,
+on top of a plain wrapt pass-through wrapper. Exits with 1 when it is over MAX_OVERHEAD_NS, the unit tests
+check the same bound in tests/unit/tracing_kill_switch_test.py.
+
+    python tests/benchmark/tracing_kill_switch_benchmark.py
+"""
+import sys
+import timeit
+
+import wrapt
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import NoOpTracerProvider
+
+from monocle_apptrace.instrumentation.common import disable_monocle_tracing, enable_monocle_tracing
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.wrapper import task_wrapper
+
+CALLS = 20000
+# a few checks over the pass-through wrapper, well under the cost of the tracing path
+MAX_OVERHEAD_NS = 1000
+
+TO_WRAP = {"package": "app", "object": "Service", "method": "lookup", "span_name": "app.lookup", "output_processor": {"type": "generic"}}
+
+def lookup(key):
+    return key
+
+def per_call_ns(func, calls: int) -> float:
+    return min(timeit.repeat(lambda: func(1), number=calls, repeat=5)) / calls * 1e9
+
+def instrument(tracer):
+    return wrapt.FunctionWrapper(lookup, task_wrapper(tracer, SpanHandler(), TO_WRAP))
+
+def measure(calls: int = CALLS) -> dict:
+    """ ns per call over a pass-through wrapper, with tracing disabled and with a no-op tracer provider """
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(InMemorySpanExporter()))
+    baseline_ns = per_call_ns(wrapt.FunctionWrapper(lookup, lambda wrapped, instance, args, kwargs: wrapped(*args, **kwargs)), calls)
+    disable_monocle_tracing()
+    try:
+        killed_ns = per_call_ns(instrument(tracer_provider.get_tracer("benchmark")), calls)
+    finally:
+        enable_monocle_tracing()
+    noop_ns = per_call_ns(instrument(NoOpTracerProvider().get_tracer("benchmark")), calls)
+    return {"kill switch": killed_ns - baseline_ns, "no-op provider": noop_ns - baseline_ns}
+
+def main():
+    overheads = measure()
+    for name, value in overheads.items():
+        print(f"{name:>16}: {value:.0f} ns per call over a pass-through wrapper")
+    return 1 if any(value > MAX_OVERHEAD_NS for value in overheads.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
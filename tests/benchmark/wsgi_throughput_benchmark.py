@@ -0,0 +1,64 @@
+"""
+Flask/WSGI request throughput with and without Monocle, and the cost of the Monocle pre_tracing step.
+The pre_tracing step is compared between copying every HTTP_* environ key into a headers dict
+and reading only the propagator and scope headers from the environ.
+
+    python tests/benchmark/wsgi_throughput_benchmark.py
+"""
+import timeit
+
+from flask import Flask
+from opentelemetry.context import detach
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common.instrumentor import setup_monocle_telemetry
+from monocle_apptrace.instrumentation.common.utils import extract_http_headers
+from monocle_apptrace.instrumentation.metamodel.flask._helper import flask_pre_tracing
+
+REQUESTS = 2000
+PRE_TRACING_CALLS = 20000
+REQUEST_HEADERS = {
+    "traceparent": "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+    "User-Agent": "benchmark",
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+    "Accept-Language": "en-US",
+    "Cookie": "session=" + "x" * 64,
+    "X-Forwarded-For": "10.0.0.1",
+    "X-Request-Id": "benchmark-request",
+}
+
+def create_app() -> Flask:
+    app = Flask(__name__)
+
+    @app.route("/")
+    def index():
+        return "ok"
+    return app
+
+def requests_per_second(app: Flask) -> float:
+    client = app.test_client()
+    seconds = timeit.timeit(lambda: client.get("/", headers=REQUEST_HEADERS), number=REQUESTS)
+    return REQUESTS / seconds
+
+def copy_headers_pre_tracing(args):
+    headers = dict()
+    for key, value in args[0].items():
+        if key.startswith("HTTP_"):
+            headers[key[5:].lower().replace("_", "-")] = value
+    return extract_http_headers(headers)
+
+def main():
+    print(f"{'without monocle':>22}: {requests_per_second(create_app()):.0f} requests/s")
+    setup_monocle_telemetry(workflow_name="wsgi_benchmark", span_processors=[SimpleSpanProcessor(InMemorySpanExporter())])
+    print(f"{'with monocle':>22}: {requests_per_second(create_app()):.0f} requests/s")
+
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": "/", "SERVER_NAME": "localhost", "wsgi.url_scheme": "http"}
+    environ.update({"HTTP_" + key.upper().replace("-", "_"): value for key, value in REQUEST_HEADERS.items()})
+    for name, pre_tracing in (("copy headers dict", copy_headers_pre_tracing), ("environ getter", flask_pre_tracing)):
+        seconds = timeit.timeit(lambda: detach(pre_tracing([environ])), number=PRE_TRACING_CALLS)
+        print(f"{name:>22}: {seconds / PRE_TRACING_CALLS * 1e6:.2f} us per request")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import time
+import unittest
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common import get_disabled_accessors
+from monocle_apptrace.instrumentation.common.accessor_breaker import get_accessor_breakers
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.wrapper import task_wrapper
+
+class FlakyAccessor:
+    def __init__(self):
+        self.calls = 0
+        self.failing = True
+
+    def __call__(self, arguments):
+        self.calls += 1
+        if self.failing:
+            raise KeyError("token_usage")
+        return "gpt-4o"
+
+def chat(prompt: str) -> str:
+    return f"answer to {prompt}"
+
+class TestAccessorBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.tracer_provider = TracerProvider()
+        self.tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.tracer = self.tracer_provider.get_tracer("accessor_breaker_test")
+        self.breakers = get_accessor_breakers()
+        self.breakers.reset()
+        self.saved_settings = (self.breakers.threshold, self.breakers.cooloff_seconds, self.breakers.max_cooloff_seconds)
+        self.breakers.threshold, self.breakers.cooloff_seconds, self.breakers.max_cooloff_seconds = 3, 0.05, 0.08
+        self.model_accessor = FlakyAccessor()
+        self.usage_accessor = FlakyAccessor()
+        self.to_wrap = {
+            "package": "app.llm",
+            "object": "Client",
+            "method": "chat",
+            "span_name": "app.chat",
+            "output_processor": {
+                "type": "inference",
+                "attributes": [
+                    [
+                        {"attribute": "type", "accessor": lambda arguments: "inference.openai"},
+                        {"attribute": "model", "accessor": self.model_accessor},
+                    ]
+                ],
+                "events": [
+                    {"name": "metadata", "attributes": [{"accessor": self.usage_accessor}]},
+                    {"name": "data.output", "attributes": [{"attribute": "response", "accessor": lambda arguments: arguments["result"]}]}
+                ]
+            }
+        }
+
+    def tearDown(self):
+        self.breakers.threshold, self.breakers.cooloff_seconds, self.breakers.max_cooloff_seconds = self.saved_settings
+        self.breakers.reset()
+        self.tracer_provider.shutdown()
+
+    def traced_chat(self, prompt="hi"):
+        return task_wrapper(self.tracer, SpanHandler(), self.to_wrap)(wrapped=chat, instance=None, args=(prompt,), kwargs={})
+
+    def last_chat_span(self):
+        return [span for span in self.exporter.get_finished_spans() if span.name == "app.chat"][-1]
+
+    def test_failing_accessor_is_skipped_after_threshold(self):
+        for _ in range(10):
+            assert self.traced_chat() == "answer to hi"
+        assert self.model_accessor.calls == 3
+        assert self.usage_accessor.calls == 3
+
+        span = self.last_chat_span()
+        # the other accessors keep running
+        assert span.attributes["entity.1.type"] == "inference.openai"
+        assert span.events[-1].attributes["response"] == "answer to hi"
+
+        disabled = {accessor["site"]: accessor for accessor in get_disabled_accessors()}
+        assert set(disabled) == {"entity.1.model", "events.metadata.*"}
+        assert disabled["entity.1.model"]["entity"] == "app.chat"
+        assert "token_usage" in disabled["entity.1.model"]["last_error"]
+        observations = list(self.breakers.observe_disabled_accessors(None))
+        assert len(observations) == 2
+        assert observations[0].attributes["entity"] == "app.chat"
+
+    def test_breaker_shared_by_copied_method_configs(self):
+        for _ in range(2):
+            self.traced_chat()
+        # eg. a method config rebuilt from the same metamodel
+        output_processor = self.to_wrap["output_processor"]
+        self.to_wrap = {**self.to_wrap, "output_processor": {
+            **output_processor, "attributes": [[dict(processor) for processor in processors] for processors in output_processor["attributes"]]}}
+        for _ in range(3):
+            self.traced_chat()
+        assert self.model_accessor.calls == 3
+        assert self.breakers.get("app.chat", "entity.1.model").trips == 1
+
+    def test_backoff_and_recovery(self):
+        for _ in range(3):
+            self.traced_chat()
+        breaker = self.breakers.get("app.chat", "entity.1.model")
+        assert breaker.trips == 1
+
+        time.sleep(0.06)
+        # one failure after the cool-off trips the breaker again, with a doubled cool-off capped to the max
+        self.traced_chat()
+        self.traced_chat()
+        assert self.model_accessor.calls == 4
+        assert breaker.trips == 2
+        assert 0.06 < breaker.retry_at - time.monotonic() <= 0.08
+
+        time.sleep(0.09)
+        self.model_accessor.failing = False
+        self.traced_chat()
+        assert self.last_chat_span().attributes["entity.1.model"] == "gpt-4o"
+        assert breaker.trips == 0
+        assert "entity.1.model" not in [accessor["site"] for accessor in get_disabled_accessors()]
+
+if __name__ == '__main__':
+    unittest.main()
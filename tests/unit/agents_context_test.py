@@ -0,0 +1,94 @@
+import asyncio
+import random
+import unittest
+from types import SimpleNamespace
+
+from opentelemetry.context import get_value
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common.constants import AGENT_PREFIX_KEY
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.wrapper import atask_wrapper
+from monocle_apptrace.instrumentation.metamodel.agents._helper import AGENTS_AGENT_NAME_KEY
+from monocle_apptrace.instrumentation.metamodel.agents.agents_processor import AgentsSpanHandler
+from monocle_apptrace.instrumentation.metamodel.agents.entities.inference import AGENT, TOOLS
+
+PARALLEL_RUNS = 300
+
+RUNNER_TO_WRAP = {"package": "agents.run", "object": "Runner", "method": "run", "span_name": "agents.run", "output_processor": AGENT}
+TOOL_TO_WRAP = {"package": "agents.tool", "object": "FunctionTool", "method": "on_invoke_tool", "span_name": "agents.tool",
+                "output_processor": TOOLS}
+
+class TestAgentsContext(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.tracer_provider = TracerProvider()
+        self.tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        tracer = self.tracer_provider.get_tracer("agents_context_test")
+        handler = AgentsSpanHandler()
+        traced_tool = atask_wrapper(tracer, SpanHandler(), TOOL_TO_WRAP)
+
+        async def tool(context, tool_input):
+            await asyncio.sleep(random.random() / 1000)
+            return SimpleNamespace(output=f"{get_value(AGENTS_AGENT_NAME_KEY)}:{tool_input}")
+
+        async def run(agent, run_input):
+            await asyncio.sleep(random.random() / 1000)
+            tool_instance = SimpleNamespace(name="lookup", description="lookup tool")
+            result = await traced_tool(wrapped=tool, instance=tool_instance, args=(None, run_input), kwargs={})
+            return SimpleNamespace(final_output=result.output)
+        self.run = atask_wrapper(tracer, handler, RUNNER_TO_WRAP)
+
+        async def run_agent(index: int):
+            agent = SimpleNamespace(name=f"agent_{index}", instructions="help", handoff_description="")
+            result = await self.run(wrapped=run, instance=None, args=(agent, f"input_{index}"), kwargs={})
+            # every attach was detached, nothing leaks into the caller's context
+            assert get_value(AGENTS_AGENT_NAME_KEY) is None
+            assert get_value(AGENT_PREFIX_KEY) is None
+            return result
+        self.run_agent = run_agent
+
+    def tearDown(self):
+        self.tracer_provider.shutdown()
+
+    def test_parallel_runs_keep_their_agent(self):
+        async def run_all():
+            return await asyncio.gather(*(self.run_agent(index) for index in range(PARALLEL_RUNS)))
+        # a token attached by one run and detached by another fails with "Failed to detach context"
+        with self.assertNoLogs("opentelemetry.context", level="ERROR"):
+            results = asyncio.run(run_all())
+
+        for index, result in enumerate(results):
+            assert result.final_output == f"agent_{index}:input_{index}"
+        spans = self.exporter.get_finished_spans()
+        agent_spans = {span.context.trace_id: span for span in spans if span.attributes.get("span.type") == "agentic.invocation"}
+        tool_spans = [span for span in spans if span.attributes.get("span.type") == "agentic.tool.invocation"]
+        assert len(agent_spans) == PARALLEL_RUNS
+        assert len(tool_spans) == PARALLEL_RUNS
+        for tool_span in tool_spans:
+            agent_span = agent_spans[tool_span.context.trace_id]
+            assert tool_span.attributes["entity.2.name"] == agent_span.attributes["entity.1.name"]
+
+    def test_nested_run_restores_outer_agent(self):
+        observed = []
+        async def inner(agent, run_input):
+            observed.append(get_value(AGENTS_AGENT_NAME_KEY))
+            return SimpleNamespace(final_output="")
+
+        async def outer(agent, run_input):
+            observed.append(get_value(AGENTS_AGENT_NAME_KEY))
+            await self.run(wrapped=inner, instance=None, args=(SimpleNamespace(name="inner"), run_input), kwargs={})
+            observed.append(get_value(AGENTS_AGENT_NAME_KEY))
+            return SimpleNamespace(final_output="")
+
+        async def run_outer():
+            await self.run(wrapped=outer, instance=None, args=(SimpleNamespace(name="outer"), "hi"), kwargs={})
+            observed.append(get_value(AGENTS_AGENT_NAME_KEY))
+        asyncio.run(run_outer())
+        assert observed == ["outer", "inner", "outer", None]
+
+if __name__ == '__main__':
+    unittest.main()
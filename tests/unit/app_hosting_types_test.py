@@ -11,6 +11,7 @@ from monocle_apptrace.instrumentation.common.constants import (
     service_type_map,
 )
 from monocle_apptrace.instrumentation.common.instrumentor import setup_monocle_telemetry
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
 from monocle_apptrace.instrumentation.common.wrapper import task_wrapper
 from monocle_apptrace.instrumentation.common.wrapper_method import WrapperMethod
 
@@ -58,6 +59,8 @@ class TestHandler(unittest.TestCase):
             else:
                 entity_name = "test123"
                 os.environ[entity_name_env] = entity_name
+            # app hosting type is detected once by setup_monocle_telemetry, refresh it for the new env
+            SpanHandler.detect_app_hosting_identifier()
 
             self.test_span_exporter.set_trace_check({
                 "entity.2.name": entity_name,
@@ -0,0 +1,184 @@
+import asyncio
+import gc
+import os
+import threading
+import time
+import unittest
+import weakref
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import NonRecordingSpan, SpanContext, TraceFlags, set_span_in_context
+
+from monocle_apptrace.exporters.batch_span_processor import MonocleBatchSpanProcessor, live_processors
+from monocle_apptrace.exporters.span_queue import QUEUE_FULL, observe_dropped_spans
+
+class SlowExporter(InMemorySpanExporter):
+    """ Blocks the first export until released, then takes delay seconds per export """
+    def __init__(self, delay: float = 0.0, block: bool = False):
+        super().__init__()
+        self.delay = delay
+        self.entered = threading.Event()
+        self.released = threading.Event()
+        if not block:
+            self.released.set()
+
+    def export(self, spans):
+        self.entered.set()
+        self.released.wait()
+        time.sleep(self.delay)
+        return super().export(spans)
+
+class QueueingExporter(InMemorySpanExporter):
+    """ Queues the exported spans and uploads them in an async force_flush, like the S3 and Blob exporters """
+    def __init__(self):
+        super().__init__()
+        self.queued = []
+        self.stopped_with = None
+
+    def export(self, spans):
+        self.queued.extend(spans)
+
+    async def force_flush(self, timeout_millis: int = 30000) -> bool:
+        await asyncio.sleep(0)
+        super().export(self.queued)
+        self.queued = []
+        return True
+
+    def shutdown(self):
+        self.stopped_with = len(self.queued)
+        super().shutdown()
+
+class TestMonocleBatchSpanProcessor(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer_provider = TracerProvider()
+
+    def tearDown(self):
+        self.tracer_provider.shutdown()
+
+    def add_processor(self, exporter, **kwargs) -> MonocleBatchSpanProcessor:
+        processor = MonocleBatchSpanProcessor(exporter, **kwargs)
+        self.tracer_provider.add_span_processor(processor)
+        self.tracer = self.tracer_provider.get_tracer("batch_span_processor_test")
+        return processor
+
+    def wait_for(self, condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return condition()
+
+    def test_flush_on_root_span_end(self):
+        exporter = InMemorySpanExporter()
+        self.add_processor(exporter, min_delay_ms=5000, max_delay_ms=5000)
+        with self.tracer.start_as_current_span("workflow"):
+            with self.tracer.start_as_current_span("inference"):
+                pass
+            time.sleep(0.05)
+            # the child span waits for the schedule
+            assert exporter.get_finished_spans() == ()
+        assert self.wait_for(lambda: len(exporter.get_finished_spans()) == 2)
+
+    def test_batch_size_reached(self):
+        exporter = InMemorySpanExporter()
+        processor = self.add_processor(exporter, min_batch_size=4, min_delay_ms=5000, max_delay_ms=5000)
+        with self.tracer.start_as_current_span("workflow"):
+            for index in range(4):
+                with self.tracer.start_as_current_span(f"step_{index}"):
+                    pass
+            assert self.wait_for(lambda: len(exporter.get_finished_spans()) == 4)
+        assert self.wait_for(lambda: processor.exported_spans == 5)
+
+    def test_dropped_spans(self):
+        exporter = SlowExporter(block=True)
+        processor = self.add_processor(exporter, max_queue_size=4, min_batch_size=4, min_delay_ms=5000, max_delay_ms=5000)
+        with self.tracer.start_as_current_span("workflow"):
+            for index in range(4):
+                with self.tracer.start_as_current_span(f"step_{index}"):
+                    pass
+            assert exporter.entered.wait(2)
+            # the worker is exporting the first 4 spans, the queue holds 4 more
+            for index in range(6):
+                with self.tracer.start_as_current_span(f"late_{index}"):
+                    pass
+            assert processor.dropped_spans == 2
+            exporter.released.set()
+            assert self.wait_for(lambda: processor.exported_spans == 8)
+        observations = [observation for observation in observe_dropped_spans(None)
+                        if observation.attributes["queue"] == "SlowExporter"]
+        assert [(observation.value, observation.attributes["reason"]) for observation in observations] == [(2, QUEUE_FULL)]
+        assert processor.force_flush()
+        assert len(exporter.get_finished_spans()) == 9
+
+    def test_adapts_to_export_latency(self):
+        exporter = SlowExporter(delay=0.03)
+        processor = self.add_processor(exporter, min_delay_ms=1, max_delay_ms=1000)
+        for _ in range(3):
+            with self.tracer.start_as_current_span("workflow"):
+                pass
+        assert self.wait_for(lambda: processor.exported_spans == 3)
+        stats = processor.get_stats()
+        # the exporter is kept busy at most a tenth of the time
+        assert stats["export_latency_ms"] >= 30
+        assert stats["delay_ms"] >= 300
+
+    def test_force_flush_and_shutdown(self):
+        exporter = InMemorySpanExporter()
+        processor = self.add_processor(exporter, min_delay_ms=5000, max_delay_ms=5000)
+        with self.tracer.start_as_current_span("workflow"):
+            with self.tracer.start_as_current_span("inference"):
+                pass
+            assert processor.force_flush()
+            assert len(exporter.get_finished_spans()) == 1
+        processor.shutdown()
+        assert len(exporter.get_finished_spans()) == 2
+        assert not processor.worker.is_alive()
+
+    def test_async_exporter_flush(self):
+        exporter = QueueingExporter()
+        processor = self.add_processor(exporter, min_delay_ms=5000, max_delay_ms=5000)
+        with self.tracer.start_as_current_span("workflow"):
+            with self.tracer.start_as_current_span("inference"):
+                pass
+            assert processor.force_flush()
+            assert len(exporter.get_finished_spans()) == 1
+
+            async def flush_in_event_loop():
+                with self.tracer.start_as_current_span("retrieval"):
+                    pass
+                return processor.force_flush()
+            assert asyncio.run(flush_in_event_loop())
+            assert len(exporter.get_finished_spans()) == 2
+        # the exporter is flushed before it's shut down
+        processor.shutdown()
+        assert len(exporter.get_finished_spans()) == 3
+        assert exporter.stopped_with == 0
+
+    @unittest.skipUnless(hasattr(os, "fork"), "os.fork is not available")
+    def test_reinit_after_fork(self):
+        processor = self.add_processor(InMemorySpanExporter(), min_delay_ms=5000, max_delay_ms=5000)
+        # a child span stays queued until the delay has passed
+        parent = NonRecordingSpan(SpanContext(trace_id=1, span_id=1, is_remote=False, trace_flags=TraceFlags(TraceFlags.SAMPLED)))
+        with self.tracer.start_as_current_span("inference", context=set_span_in_context(parent)):
+            pass
+        assert len(processor.queue) == 1
+        # eg. the processor of a route evicted by the RoutingSpanExporter, nothing keeps it for the next fork
+        dropped = MonocleBatchSpanProcessor(InMemorySpanExporter())
+        dropped.shutdown()
+        dropped_ref = weakref.ref(dropped)
+        del dropped
+        gc.collect()
+        assert dropped_ref() is None
+        assert processor in live_processors
+
+        pid = os.fork()
+        if pid == 0:
+            reinitialized = len(processor.queue) == 0 and processor.worker.is_alive()
+            os._exit(0 if reinitialized else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert len(processor.queue) == 1
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import patch
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common import wrapper
+from monocle_apptrace.instrumentation.common.constants import MONOCLE_WORKFLOW_ROOT
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.wrapper import task_wrapper
+
+AGENT_TO_WRAP = {
+    "package": "app.agent",
+    "object": "Agent",
+    "method": "run",
+    "span_name": "app.agent.run",
+    "output_processor": {
+        "type": "agentic.invocation",
+        "attributes": [
+            [{"attribute": "name", "accessor": lambda arguments: "planner"}]
+        ],
+        "events": [
+            {"name": "data.output", "attributes": [{"attribute": "response", "accessor": lambda arguments: arguments["result"]}]}
+        ]
+    }
+}
+
+TOOL_TO_WRAP = {
+    "package": "app.tools",
+    "object": "Search",
+    "method": "invoke",
+    "span_name": "app.tool.search",
+    "output_processor": {
+        "type": "agentic.tool.invocation",
+        "attributes": [
+            [{"attribute": "name", "accessor": lambda arguments: "search"}]
+        ]
+    }
+}
+
+class TestCompactWorkflowSpan(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.tracer_provider = TracerProvider()
+        self.tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        tracer = self.tracer_provider.get_tracer("compact_workflow_span_test")
+        handler = SpanHandler()
+        search = lambda query: task_wrapper(tracer, handler, TOOL_TO_WRAP)(
+            wrapped=lambda q: f"results for {q}", instance=None, args=(query,), kwargs={})
+        self.run_agent = lambda question: task_wrapper(tracer, handler, AGENT_TO_WRAP)(
+            wrapped=lambda q: search(q), instance=None, args=(question,), kwargs={})
+
+    def tearDown(self):
+        self.tracer_provider.shutdown()
+
+    def test_default_adds_workflow_span(self):
+        assert self.run_agent("monocle") == "results for monocle"
+        spans = {span.name: span for span in self.exporter.get_finished_spans()}
+        assert set(spans) == {"workflow", "app.agent.run", "app.tool.search"}
+        assert spans["app.agent.run"].parent.span_id == spans["workflow"].context.span_id
+        assert spans["app.agent.run"].attributes["entity.1.name"] == "planner"
+        assert MONOCLE_WORKFLOW_ROOT not in spans["workflow"].attributes
+
+    def test_compact_root_span(self):
+        with patch.object(wrapper, "COMPACT_WORKFLOW_SPANS", True):
+            assert self.run_agent("monocle") == "results for monocle"
+        spans = {span.name: span for span in self.exporter.get_finished_spans()}
+        assert set(spans) == {"app.agent.run", "app.tool.search"}
+
+        root = spans["app.agent.run"]
+        assert root.parent is None
+        assert root.attributes[MONOCLE_WORKFLOW_ROOT] is True
+        assert root.attributes["span.type"] == "agentic.invocation"
+        assert root.attributes["entity.1.name"] == SpanHandler.get_workflow_name(root)
+        assert root.attributes["entity.1.type"] == "workflow.generic"
+        assert root.attributes["entity.2.type"].startswith("app_hosting.")
+        # the entities of the call follow the workflow and app hosting entities
+        assert root.attributes["entity.3.name"] == "planner"
+        assert root.attributes["entity.count"] == 3
+        assert root.events[0].attributes["response"] == "results for monocle"
+
+        tool = spans["app.tool.search"]
+        assert tool.parent.span_id == root.context.span_id
+        assert MONOCLE_WORKFLOW_ROOT not in tool.attributes
+        assert tool.attributes["entity.1.name"] == "search"
+
+if __name__ == '__main__':
+    unittest.main()
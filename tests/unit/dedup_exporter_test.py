@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExporter
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.exporters.dedup_exporter import (
+    DedupSpanExporter,
+    SegmentTableWriter,
+    load_segment_table,
+    rehydrate_spans,
+    segment_hash,
+)
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = json.dumps({"system": "You are a helpful travel assistant. " * 100})
+
+class TestDedupSpanExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.out_dir = tempfile.mkdtemp()
+        self.memory_exporter = InMemorySpanExporter()
+        self.dedup_exporter = DedupSpanExporter(self.memory_exporter, min_segment_size=256,
+                                                segment_writer=SegmentTableWriter(out_path=self.out_dir))
+        self.tracer_provider = TracerProvider(resource=Resource(attributes={SERVICE_NAME: "dedup_test"}))
+        self.tracer_provider.add_span_processor(SimpleSpanProcessor(self.dedup_exporter))
+        self.tracer = self.tracer_provider.get_tracer("dedup_test")
+
+    def tearDown(self):
+        self.tracer_provider.shutdown()
+
+    def _inference(self, user_message: str):
+        with self.tracer.start_as_current_span("inference") as span:
+            span.add_event("data.input", {"input": [SYSTEM_PROMPT, json.dumps({"user": user_message})]})
+
+    def test_repeated_segment_replaced_with_reference(self):
+        with self.tracer.start_as_current_span("workflow"):
+            self._inference("book a flight")
+            self._inference("book a hotel")
+
+        spans = [span for span in self.memory_exporter.get_finished_spans() if span.name == "inference"]
+        first_input = spans[0].events[0].attributes["input"]
+        second_input = spans[1].events[0].attributes["input"]
+        assert first_input[0] == SYSTEM_PROMPT
+        assert second_input[0] == segment_hash(SYSTEM_PROMPT)
+        # short segments are never replaced
+        assert second_input[1] == json.dumps({"user": "book a hotel"})
+
+    def test_first_occurrence_is_per_trace(self):
+        for _ in range(2):
+            with self.tracer.start_as_current_span("workflow"):
+                self._inference("hello")
+
+        spans = [span for span in self.memory_exporter.get_finished_spans() if span.name == "inference"]
+        assert all(span.events[0].attributes["input"][0] == SYSTEM_PROMPT for span in spans)
+
+    def test_side_table_rehydrates_references(self):
+        with self.tracer.start_as_current_span("workflow"):
+            self._inference("book a flight")
+            self._inference("book a hotel")
+
+        table_file = self.dedup_exporter.segment_writer.file_path
+        assert table_file is not None and os.path.exists(table_file)
+        segment_table = load_segment_table([table_file])
+        assert segment_table == {segment_hash(SYSTEM_PROMPT): SYSTEM_PROMPT}
+
+        exported = [json.loads(span.to_json()) for span in self.memory_exporter.get_finished_spans()
+                    if span.name == "inference"]
+        # drop the span with the full content to make sure the side table alone is enough
+        rehydrated = rehydrate_spans(exported[1:], segment_table)
+        assert rehydrated[0]["events"][0]["attributes"]["input"][0] == SYSTEM_PROMPT
+
+    def test_rehydrate_without_side_table(self):
+        with self.tracer.start_as_current_span("workflow"):
+            self._inference("book a flight")
+            self._inference("book a hotel")
+
+        exported = [json.loads(span.to_json()) for span in self.memory_exporter.get_finished_spans()]
+        rehydrated = rehydrate_spans(exported)
+        inputs = [span["events"][0]["attributes"]["input"][0] for span in rehydrated if span["name"] == "inference"]
+        assert inputs == [SYSTEM_PROMPT, SYSTEM_PROMPT]
+
+    def test_window_references_earlier_trace(self):
+        # window mode without a local side table, the later traces reference the first occurrence of the window
+        memory_exporter = InMemorySpanExporter()
+        tracer_provider = TracerProvider(resource=Resource(attributes={SERVICE_NAME: "dedup_test"}))
+        tracer_provider.add_span_processor(SimpleSpanProcessor(
+            DedupSpanExporter(memory_exporter, min_segment_size=256, window_seconds=3600)))
+        tracer = tracer_provider.get_tracer("dedup_test")
+        for user_message in ("book a flight", "book a hotel"):
+            with tracer.start_as_current_span("workflow"):
+                with tracer.start_as_current_span("inference") as span:
+                    span.add_event("data.input", {"input": [SYSTEM_PROMPT, json.dumps({"user": user_message})]})
+        tracer_provider.shutdown()
+
+        exported = [json.loads(span.to_json()) for span in memory_exporter.get_finished_spans()]
+        assert [span["name"] for span in exported] == ["inference", "workflow"] * 2
+        inference_spans = [span for span in exported if span["name"] == "inference"]
+        assert inference_spans[1]["events"][0]["attributes"]["input"][0] == segment_hash(SYSTEM_PROMPT)
+        rehydrated = rehydrate_spans(inference_spans)
+        assert rehydrated[1]["events"][0]["attributes"]["input"][0] == SYSTEM_PROMPT
+
+    def test_unique_segment_exported_once(self):
+        def exported_bytes(exporter: SpanExporter) -> int:
+            memory_exporter = InMemorySpanExporter()
+            tracer_provider = TracerProvider(resource=Resource(attributes={SERVICE_NAME: "dedup_test"}))
+            tracer_provider.add_span_processor(SimpleSpanProcessor(exporter(memory_exporter)))
+            tracer = tracer_provider.get_tracer("dedup_test")
+            with tracer.start_as_current_span("workflow"):
+                for index in range(3):
+                    with tracer.start_as_current_span("inference") as span:
+                        span.add_event("data.output", {"response": f"answer {index} " * 1000})
+            tracer_provider.shutdown()
+            return sum(len(span.to_json()) for span in memory_exporter.get_finished_spans())
+
+        # large segments that never repeat are exported as they are
+        without_dedup = exported_bytes(lambda exporter: exporter)
+        assert exported_bytes(lambda exporter: DedupSpanExporter(exporter, min_segment_size=256)) <= without_dedup * 1.05
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import logging
+import time
+import unittest
+
+from monocle_apptrace.instrumentation.common.diagnostics import (
+    DIAGNOSTIC_KEY_ATTRIBUTE,
+    DiagnosticsLogger,
+    MonocleDiagnostics,
+    get_diagnostics,
+)
+
+LOGGER_NAME = "monocle_apptrace.tests.diagnostics"
+
+class Unprintable:
+    formatted = 0
+
+    def __str__(self):
+        Unprintable.formatted += 1
+        return "unprintable"
+
+class TestMonocleDiagnostics(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger(LOGGER_NAME)
+        self.diagnostics = MonocleDiagnostics(rate=1000.0, burst=3, summary_seconds=60)
+
+    def test_rate_limited_per_key(self):
+        with self.assertLogs(LOGGER_NAME, "WARNING") as logs:
+            emitted = [self.diagnostics.log(self.logger, logging.WARNING, "extract_messages", "Error: %s", i) for i in range(10)]
+            self.diagnostics.log(self.logger, logging.WARNING, "extract_finish_reason", "Error: %s", "other key")
+        assert emitted == [True] * 3 + [False] * 7
+        assert [record.getMessage() for record in logs.records] == ["Error: 0", "Error: 1", "Error: 2", "Error: other key"]
+        assert getattr(logs.records[0], DIAGNOSTIC_KEY_ATTRIBUTE) == "extract_messages"
+
+        counters = self.diagnostics.get_counters()
+        assert counters[f"{LOGGER_NAME}:extract_messages"] == {"count": 10, "suppressed": 7}
+
+        # the bucket refills at rate messages per second
+        time.sleep(0.005)
+        with self.assertLogs(LOGGER_NAME, "WARNING"):
+            assert self.diagnostics.log(self.logger, logging.WARNING, "extract_messages", "Error: %s", "again")
+
+    def test_summary_of_suppressed_messages(self):
+        diagnostics = MonocleDiagnostics(rate=0, burst=3, summary_seconds=0.05)
+        with self.assertLogs(LOGGER_NAME, "WARNING") as logs:
+            for i in range(5):
+                diagnostics.log(self.logger, logging.WARNING, "hydrate_span", "Error: %s", i)
+            # summarized at the end of the period even if no message follows
+            time.sleep(0.2)
+        messages = [record.getMessage() for record in logs.records]
+        assert messages == ["Error: 0", "Error: 1", "Error: 2",
+                            f"Monocle diagnostics suppressed 2 'hydrate_span' messages from {LOGGER_NAME}"]
+        assert getattr(logs.records[-1], DIAGNOSTIC_KEY_ATTRIBUTE) == "summary"
+        assert diagnostics.get_counters()[f"{LOGGER_NAME}:hydrate_span"] == {"count": 5, "suppressed": 0}
+        assert diagnostics.summary_timer is None
+
+    def test_summarize_before_the_period_ends(self):
+        diagnostics = MonocleDiagnostics(rate=0, burst=1, summary_seconds=60)
+        with self.assertLogs(LOGGER_NAME, "WARNING") as logs:
+            for i in range(3):
+                diagnostics.log(self.logger, logging.WARNING, "hydrate_span", "Error: %s", i)
+            timer = diagnostics.summary_timer
+            assert diagnostics.summarize() == {(LOGGER_NAME, "hydrate_span"): 2}
+        assert logs.records[-1].getMessage() == f"Monocle diagnostics suppressed 2 'hydrate_span' messages from {LOGGER_NAME}"
+        timer.join(1)
+        assert not timer.is_alive()
+
+    def test_disabled_level_is_not_formatted(self):
+        self.logger.setLevel(logging.WARNING)
+        try:
+            Unprintable.formatted = 0
+            diagnostics = DiagnosticsLogger(LOGGER_NAME)
+            for _ in range(5):
+                assert not diagnostics.debug("accessor", "Error processing accessor: %s", Unprintable())
+            assert Unprintable.formatted == 0
+            assert f"{LOGGER_NAME}:accessor" not in get_diagnostics().get_counters()
+        finally:
+            self.logger.setLevel(logging.NOTSET)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common.constants import EXECUTOR_CONTEXT_PROPAGATION
+from monocle_apptrace.instrumentation.common import wrapper
+from monocle_apptrace.instrumentation.common.instrumentor import setup_monocle_telemetry
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.wrapper import atask_wrapper, task_wrapper
+from monocle_apptrace.instrumentation.metamodel.executors._helper import FANOUT_INDEX_ATTRIBUTE
+
+def to_wrap(name: str) -> dict:
+    return {"package": "app", "object": "Agent", "method": name, "span_name": f"app.{name}"}
+
+class TestExecutorContextPropagation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.exporter = InMemorySpanExporter()
+        with patch.dict(os.environ, {EXECUTOR_CONTEXT_PROPAGATION: "true"}):
+            cls.instrumentor = setup_monocle_telemetry(workflow_name="executor_context_test",
+                                                       span_processors=[SimpleSpanProcessor(cls.exporter)],
+                                                       union_with_default_methods=False)
+        cls.tracer = trace.get_tracer("executor_context_test")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.instrumentor.uninstrument()
+
+    def setUp(self):
+        self.exporter.clear()
+
+    def traced(self, name, fn, *args):
+        return task_wrapper(self.tracer, SpanHandler(), to_wrap(name))(wrapped=fn, instance=None, args=args, kwargs={})
+
+    async def atraced(self, name, fn, *args):
+        return await atask_wrapper(self.tracer, SpanHandler(), to_wrap(name))(wrapped=fn, instance=None, args=args, kwargs={})
+
+    def spans(self, name):
+        return [span for span in self.exporter.get_finished_spans() if span.name == name]
+
+    def tool(self, query):
+        # nested span in the worker thread
+        return self.traced("llm", lambda q: f"answer to {q}", query)
+
+    def fan_out(self, queries):
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(self.traced, "tool", self.tool, query) for query in queries]
+            return [future.result() for future in futures]
+
+    def assert_fan_out(self):
+        plan_span = self.spans("app.plan")[0]
+        tool_spans = self.spans("app.tool")
+        assert len(tool_spans) == 3
+        for tool_span in tool_spans:
+            assert tool_span.context.trace_id == plan_span.context.trace_id
+            assert tool_span.parent.span_id == plan_span.context.span_id
+            assert len(tool_span.links) == 1
+            assert tool_span.links[0].context.span_id == plan_span.context.span_id
+        assert sorted(tool_span.links[0].attributes[FANOUT_INDEX_ATTRIBUTE] for tool_span in tool_spans) == [0, 1, 2]
+
+        tool_span_ids = {tool_span.context.span_id for tool_span in tool_spans}
+        for llm_span in self.spans("app.llm"):
+            assert llm_span.parent.span_id in tool_span_ids
+            assert len(llm_span.links) == 0
+        # one workflow span for the whole fan-out
+        assert len(self.spans("workflow")) == 1
+
+    def test_thread_pool_fan_out(self):
+        assert self.traced("plan", self.fan_out, ["a", "b", "c"]) == ["answer to a", "answer to b", "answer to c"]
+        self.assert_fan_out()
+
+    def test_fan_out_without_isolated_spans(self):
+        with patch.object(wrapper, "ISOLATE_MONOCLE_SPANS", False):
+            assert self.traced("plan", self.fan_out, ["a", "b", "c"]) == ["answer to a", "answer to b", "answer to c"]
+        self.assert_fan_out()
+
+    def test_single_child_is_linked(self):
+        def plan(query):
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                return executor.submit(self.traced, "tool", self.tool, query).result()
+
+        assert self.traced("plan", plan, "a") == "answer to a"
+        plan_span = self.spans("app.plan")[0]
+        tool_span = self.spans("app.tool")[0]
+        assert tool_span.parent.span_id == plan_span.context.span_id
+        assert tool_span.links[0].context.span_id == plan_span.context.span_id
+        assert tool_span.links[0].attributes[FANOUT_INDEX_ATTRIBUTE] == 0
+
+    def test_run_in_executor_and_to_thread(self):
+        async def plan(query):
+            loop = asyncio.get_running_loop()
+            first = await loop.run_in_executor(None, self.traced, "tool", self.tool, query)
+            second = await asyncio.to_thread(self.traced, "tool", self.tool, query)
+            return [first, second]
+
+        assert asyncio.run(self.atraced("plan", plan, "a")) == ["answer to a", "answer to a"]
+        plan_span = self.spans("app.plan")[0]
+        first, second = sorted(self.spans("app.tool"), key=lambda span: span.start_time)
+        for index, tool_span in enumerate((first, second)):
+            assert tool_span.parent.span_id == plan_span.context.span_id
+            # linked even though the first tool ran before the second was submitted
+            assert tool_span.links[0].context.span_id == plan_span.context.span_id
+            assert tool_span.links[0].attributes[FANOUT_INDEX_ATTRIBUTE] == index
+        assert len(self.spans("workflow")) == 1
+
+    def test_submit_without_trace(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(lambda x: x * 2, 21).result() == 42
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import unittest
+
+from fastapi import BackgroundTasks, FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common import disable_monocle_tracing, enable_monocle_tracing
+from monocle_apptrace.instrumentation.common.instrumentor import setup_monocle_telemetry
+from monocle_apptrace.instrumentation.metamodel.fastapi._helper import asgi_request_state
+
+logger = logging.getLogger(__name__)
+
+CONCURRENT_REQUESTS = 500
+CHUNKS = 5
+CHUNK = b"data: chunk\n\n"
+BACKGROUND_SECONDS = 0.5
+
+def traceparent(index: int) -> str:
+    return f"00-{index + 1:032x}-{index + 1:016x}-01"
+
+async def call_app(app, path: str, index: int) -> list:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": f"question=q{index}".encode(),
+        "headers": [(b"traceparent", traceparent(index).encode())], "client": ("127.0.0.1", 1234), "server": ("test", 80),
+    }
+    messages = []
+    request_sent = False
+    response_complete = asyncio.Event()
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_complete.set()
+    await app(scope, receive, send)
+    return messages
+
+class TestFastAPIASGIMiddleware(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.exporter = InMemorySpanExporter()
+        cls.instrumentor = setup_monocle_telemetry(workflow_name="fastapi_asgi_test",
+                                                   span_processors=[SimpleSpanProcessor(cls.exporter)])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.instrumentor.uninstrument()
+
+    def setUp(self):
+        self.exporter.clear()
+        self.app = FastAPI()
+
+        @self.app.get("/hello")
+        async def hello():
+            return {"message": "hello"}
+
+        @self.app.get("/stream")
+        async def stream():
+            async def events():
+                for _ in range(CHUNKS):
+                    await asyncio.sleep(0.001)
+                    yield CHUNK
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        @self.app.get("/missing")
+        async def missing():
+            raise HTTPException(status_code=404)
+
+        @self.app.get("/background")
+        async def background(background_tasks: BackgroundTasks):
+            background_tasks.add_task(asyncio.sleep, BACKGROUND_SECONDS)
+            return {"message": "accepted"}
+
+    def request_spans(self) -> dict:
+        return {span.context.trace_id: span for span in self.exporter.get_finished_spans()
+                if span.attributes.get("span.type") == "http.process"}
+
+    def test_request_span(self):
+        asyncio.run(call_app(self.app, "/hello", 0))
+        span = self.request_spans()[1]
+        assert span.attributes["entity.1.method"] == "GET"
+        assert span.attributes["entity.1.route"] == "/hello"
+        output = [event for event in span.events if event.name == "data.output"][0]
+        assert output.attributes["status"] == "200"
+        assert asgi_request_state.get() is None
+
+    def test_stack_built_while_tracing_disabled(self):
+        disable_monocle_tracing()
+        try:
+            asyncio.run(call_app(self.app, "/hello", 0))
+        finally:
+            enable_monocle_tracing()
+        assert self.request_spans() == {}
+        # the middleware stack was built by the first request, the next one is traced
+        asyncio.run(call_app(self.app, "/hello", 1))
+        assert len(self.request_spans()) == 1
+
+    def test_error_status(self):
+        asyncio.run(call_app(self.app, "/missing", 0))
+        span = self.request_spans()[1]
+        assert not span.status.is_ok
+
+    def test_span_ends_with_last_body_chunk(self):
+        asyncio.run(call_app(self.app, "/background", 0))
+        span = self.request_spans()[1]
+        assert (span.end_time - span.start_time) / 1e9 < BACKGROUND_SECONDS
+
+    def test_concurrent_streaming_requests(self):
+        async def run_all():
+            return await asyncio.gather(*(call_app(self.app, "/stream", index) for index in range(CONCURRENT_REQUESTS)))
+        results = asyncio.run(run_all())
+        spans = self.request_spans()
+        assert len(spans) == CONCURRENT_REQUESTS
+        for index, messages in enumerate(results):
+            assert b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body") == CHUNK * CHUNKS
+            span = spans[index + 1]
+            assert span.parent is not None
+            metadata = [event for event in span.events if event.name == "metadata"][0]
+            assert metadata.attributes["response_bytes"] == len(CHUNK) * CHUNKS
+            assert metadata.attributes["ttfb_ms"] >= 0
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import logging
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common.instrumentor import setup_monocle_telemetry
+from monocle_apptrace.instrumentation.common.method_wrappers import monocle_trace
+from monocle_apptrace.instrumentation.common.url_matcher import reload_url_matcher
+from monocle_apptrace.instrumentation.metamodel.httpx._helper import MAX_DATA_LENGTH, extract_response
+
+logger = logging.getLogger(__name__)
+
+class EchoHeadersHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps(dict(self.headers)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestHttpxInstrumentation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHeadersHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.exporter = InMemorySpanExporter()
+        cls.instrumentor = setup_monocle_telemetry(workflow_name="httpx_test",
+                                                   span_processors=[SimpleSpanProcessor(cls.exporter)])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.instrumentor.uninstrument()
+        reload_url_matcher()
+
+    def setUp(self):
+        self.exporter.clear()
+
+    def get_http_span(self):
+        spans = [span for span in self.exporter.get_finished_spans() if span.attributes.get("span.type") == "http.send"]
+        assert len(spans) == 1
+        return spans[0]
+
+    def verify_span(self, response):
+        span = self.get_http_span()
+        received_headers = {key.lower(): value for key, value in response.json().items()}
+        trace_id, span_id = received_headers["traceparent"].split("-")[1:3]
+        assert trace_id == format(span.context.trace_id, "032x")
+        assert span_id == format(span.context.span_id, "016x")
+        assert "monocle_apptrace.version" in received_headers["tracestate"]
+        assert span.attributes["entity.1.method"] == "GET"
+        metadata = [event for event in span.events if event.name == "metadata"][0]
+        assert metadata.attributes["ttfb_ms"] >= 0
+        assert metadata.attributes["connect_ms"] >= 0
+        assert metadata.attributes["body_read_ms"] >= 0
+
+    def test_sync_client(self):
+        reload_url_matcher(self.base_url)
+        with httpx.Client() as client:
+            response = client.get(f"{self.base_url}/echo?q=1")
+        self.verify_span(response)
+
+    def test_async_client(self):
+        reload_url_matcher(self.base_url)
+
+        async def call():
+            async with httpx.AsyncClient() as client:
+                return await client.get(f"{self.base_url}/echo")
+        response = asyncio.run(call())
+        self.verify_span(response)
+
+    def test_propagate_only(self):
+        reload_url_matcher(f"{self.base_url};propagate")
+        with monocle_trace(span_name="caller"):
+            with httpx.Client() as client:
+                response = client.get(f"{self.base_url}/echo")
+        caller = self.exporter.get_finished_spans()[-1]
+        received_headers = {key.lower(): value for key, value in response.json().items()}
+        assert received_headers["traceparent"].split("-")[2] == format(caller.context.span_id, "016x")
+        assert not [span for span in self.exporter.get_finished_spans() if span.attributes.get("span.type") == "http.send"]
+
+    def test_url_not_configured(self):
+        reload_url_matcher("http://localhost:1")
+        with httpx.Client() as client:
+            response = client.get(f"{self.base_url}/echo")
+        assert "traceparent" not in {key.lower() for key in response.json()}
+        assert len(self.exporter.get_finished_spans()) == 0
+
+    def test_response_truncated(self):
+        response = httpx.Response(200, content=b"x" * 5000)
+        assert extract_response(response) == "x" * MAX_DATA_LENGTH
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import gc
+import logging
+import threading
+import unittest
+from types import SimpleNamespace
+
+from monocle_apptrace.instrumentation.common.utils import (
+    cached_instance_attribute,
+    get_llm_type,
+    instance_attribute_cache,
+)
+from monocle_apptrace.instrumentation.metamodel.openai import _helper as openai_helper
+
+logger = logging.getLogger(__name__)
+
+class UnhashableClient:
+    __hash__ = None
+
+    def __init__(self, base_url):
+        self._client = SimpleNamespace(base_url=base_url)
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+class CollectingLock:
+    """ Runs a garbage collection each time the lock is taken, like an allocation under the lock could """
+    def __init__(self, lock):
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.__enter__()
+        gc.collect()
+
+    def __exit__(self, *args):
+        return self.lock.__exit__(*args)
+
+class TestInstanceAttributeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+
+        @cached_instance_attribute("_client.base_url")
+        def get_base_url(instance):
+            self.calls += 1
+            return instance._client.base_url
+        self.get_base_url = get_base_url
+
+    def tearDown(self):
+        instance_attribute_cache.clear()
+
+    def test_computed_once_per_instance(self):
+        client = UnhashableClient("https://api.example.com")
+        assert self.get_base_url(client) == "https://api.example.com"
+        assert self.get_base_url(client) == "https://api.example.com"
+        assert self.calls == 1
+        other = UnhashableClient("https://other.example.com")
+        assert self.get_base_url(other) == "https://other.example.com"
+        assert self.calls == 2
+
+    def test_invalidated_when_watched_attribute_reassigned(self):
+        client = UnhashableClient("https://api.example.com")
+        self.get_base_url(client)
+        client._client.base_url = "https://proxy.example.com"
+        assert self.get_base_url(client) == "https://proxy.example.com"
+        client._client = SimpleNamespace(base_url="https://new.example.com")
+        assert self.get_base_url(client) == "https://new.example.com"
+        assert self.calls == 3
+
+    def test_reused_address_is_not_stale(self):
+        @cached_instance_attribute("_client")
+        def get_client_url(instance):
+            return instance._client.base_url
+        client = UnhashableClient("https://a.example.com")
+        client._client = HttpClient("https://a.example.com")
+        assert get_client_url(client) == "https://a.example.com"
+        old_address = id(client._client)
+        client._client = HttpClient("https://b.example.com")
+        # the first client object is collected, look for a new one at its address
+        candidates = [HttpClient("https://c.example.com") for _ in range(1000)]
+        reused = next((candidate for candidate in candidates if id(candidate) == old_address), None)
+        if reused is None:
+            self.skipTest("address not reused")
+        client._client = reused
+        assert get_client_url(client) == "https://c.example.com"
+
+    def test_deep_attribute_change(self):
+        client = SimpleNamespace(_client=SimpleNamespace(base_url=SimpleNamespace(host="my.openai.azure.com"), _api_version=None))
+        assert openai_helper.get_inference_type(client) == "openai"
+        client._client._api_version = "2024-02-01"
+        assert openai_helper.get_inference_type(client) == "azure_openai"
+
+    def test_entry_dropped_with_instance(self):
+        client = UnhashableClient("https://api.example.com")
+        self.get_base_url(client)
+        entries = len(instance_attribute_cache._entries)
+        del client
+        gc.collect()
+        assert len(instance_attribute_cache._entries) == entries - 1
+
+    def test_collection_under_the_lock(self):
+        client = UnhashableClient("https://api.example.com")
+        # only collected by the cyclic garbage collector
+        client.cycle = client
+        self.get_base_url(client)
+        del client
+        other = UnhashableClient("https://other.example.com")
+        instance_attribute_cache._lock = CollectingLock(instance_attribute_cache._lock)
+        try:
+            thread = threading.Thread(target=self.get_base_url, args=(other,), daemon=True)
+            thread.start()
+            thread.join(5)
+            assert not thread.is_alive()
+        finally:
+            # a deadlocked thread holds the lock forever
+            instance_attribute_cache._lock = threading.RLock()
+        assert len(instance_attribute_cache._entries) == 1
+
+    def test_openai_helpers_use_cache(self):
+        client = SimpleNamespace(_client=SimpleNamespace(base_url=SimpleNamespace(host="api.openai.com"), _api_version=None))
+        assert openai_helper.extract_provider_name(client) == "api.openai.com"
+        assert openai_helper.get_inference_type(client) == "openai"
+        client._client = SimpleNamespace(base_url=SimpleNamespace(host="my.openai.azure.com"), _api_version="2024-02-01")
+        assert openai_helper.extract_provider_name(client) == "my.openai.azure.com"
+        assert openai_helper.get_inference_type(client) == "azure_openai"
+
+    def test_llm_type_cached_by_class(self):
+        class AsyncAzureOpenAI:
+            pass
+        assert get_llm_type(AsyncAzureOpenAI()) == "azure_openai"
+        assert get_llm_type(AsyncAzureOpenAI()) == "azure_openai"
+
+if __name__ == '__main__':
+    unittest.main()
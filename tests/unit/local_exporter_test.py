@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Status, StatusCode
+
+from monocle_apptrace.exporters.local.aggregator import LocalSpanAggregator
+from monocle_apptrace.exporters.local.local_exporter import LocalSpanExporter, decode_spans, encode_spans, get_spool_file
+from monocle_apptrace.instrumentation.common.constants import MONOCLE_INSTRUMENTOR
+
+class DroppedConnection:
+    """ Connection to the aggregator dropping after sent_messages messages """
+    def __init__(self, sent_messages: int):
+        self.sent_messages = sent_messages
+
+    def sendall(self, message: bytes) -> None:
+        if self.sent_messages == 0:
+            raise BrokenPipeError("aggregator gone")
+        self.sent_messages -= 1
+
+    def close(self) -> None:
+        pass
+
+class TestLocalSpanExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.work_dir, "aggregator.sock")
+        self.spool_dir = os.path.join(self.work_dir, "spool")
+        self.source = InMemorySpanExporter()
+        self.tracer_provider = TracerProvider(resource=Resource(attributes={SERVICE_NAME: "local_test"}))
+        self.tracer_provider.add_span_processor(SimpleSpanProcessor(self.source))
+        self.tracer = self.tracer_provider.get_tracer(MONOCLE_INSTRUMENTOR, "1.0")
+        self.aggregated = InMemorySpanExporter()
+        self.aggregator = LocalSpanAggregator(socket_path=self.socket_path, spool_dir=self.spool_dir,
+                                              span_processors=[SimpleSpanProcessor(self.aggregated)])
+
+    def tearDown(self):
+        self.aggregator.shutdown()
+        self.tracer_provider.shutdown()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def workflow(self, name):
+        with self.tracer.start_as_current_span("workflow", attributes={"workflow.name": name}):
+            with self.tracer.start_as_current_span("inference") as span:
+                span.add_event("data.input", {"input": ["hello", "world"]})
+                span.set_status(Status(StatusCode.ERROR, "rate limited"))
+        spans = self.source.get_finished_spans()
+        self.source.clear()
+        return spans
+
+    def exporter(self):
+        return LocalSpanExporter(socket_path=self.socket_path, spool_dir=self.spool_dir)
+
+    def wait_for_spans(self, count):
+        for _ in range(200):
+            if len(self.aggregated.get_finished_spans()) >= count:
+                break
+            self.aggregator.stopped.wait(0.01)
+        return self.aggregated.get_finished_spans()
+
+    def test_encode_decode(self):
+        spans = self.workflow("round_trip")
+        decoded = decode_spans(encode_spans(spans))
+        for span, copy in zip(spans, decoded):
+            assert copy.to_json() == span.to_json()
+            assert copy.instrumentation_scope == span.instrumentation_scope
+            assert copy.resource.attributes[SERVICE_NAME] == "local_test"
+
+    def test_aggregates_workers(self):
+        self.aggregator.start()
+        workers = [self.exporter(), self.exporter()]
+        expected = []
+        for index, worker in enumerate(workers):
+            spans = self.workflow(f"worker_{index}")
+            expected.extend(span.context.span_id for span in spans)
+            worker.export(spans)
+        aggregated = self.wait_for_spans(len(expected))
+        assert sorted(span.context.span_id for span in aggregated) == sorted(expected)
+        for worker in workers:
+            worker.shutdown()
+
+    def test_spool_while_aggregator_down(self):
+        worker = self.exporter()
+        spans = self.workflow("spooled")
+        worker.export(spans)
+        assert worker.spooled_spans == 2
+        assert os.path.exists(get_spool_file(self.spool_dir, os.getpid()))
+
+        self.aggregator.start()
+        worker.retry_at = 0
+        later_spans = self.workflow("after_restart")
+        worker.export(later_spans)
+        aggregated = self.wait_for_spans(4)
+        # the spool is sent first
+        assert [span.context.span_id for span in aggregated] == [span.context.span_id for span in list(spans) + list(later_spans)]
+        assert not os.path.exists(get_spool_file(self.spool_dir, os.getpid()))
+        worker.shutdown()
+
+    def test_replay_resumes_after_dropped_connection(self):
+        worker = self.exporter()
+        batches = [self.workflow(f"spooled_{index}") for index in range(3)]
+        for spans in batches:
+            worker.export(spans)
+        assert worker.spooled_spans == 6
+
+        worker.connection = DroppedConnection(sent_messages=1)
+        worker._replay_spool()
+        assert worker.connection is None
+
+        # only the batches that weren't sent are replayed on the next connection
+        self.aggregator.start()
+        worker.retry_at = 0
+        assert worker._connect()
+        aggregated = self.wait_for_spans(4)
+        assert [span.context.span_id for span in aggregated] == [span.context.span_id for spans in batches[1:] for span in spans]
+        assert not os.path.exists(get_spool_file(self.spool_dir, os.getpid()))
+        worker.shutdown()
+
+    def test_ingest_orphaned_spool(self):
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0)
+        os.waitpid(pid, 0)
+        os.makedirs(self.spool_dir)
+        with open(get_spool_file(self.spool_dir, pid), "wb") as f:
+            f.write(encode_spans(self.workflow("orphaned")))
+            # partial message of a process killed while spooling
+            f.write(b'{"resources"')
+        assert self.aggregator.ingest_orphaned_spools() == 2
+        assert len(self.aggregated.get_finished_spans()) == 2
+        assert os.listdir(self.spool_dir) == []
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import datetime
+import json
+import unittest
+from unittest.mock import patch
+
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.trace import SpanContext
+
+from monocle_apptrace.exporters import object_key
+from monocle_apptrace.exporters.object_key import ObjectKeyBuilder
+
+TIME_FORMAT = "%Y-%m-%d__%H.%M.%S"
+
+def make_span(index: int, workflow_name: str) -> ReadableSpan:
+    return ReadableSpan(name=f"span_{index}", context=SpanContext(trace_id=1, span_id=index + 1, is_remote=False),
+                        resource=Resource({"workflow.name": workflow_name}))
+
+class TestObjectKeyBuilder(unittest.TestCase):
+
+    def test_flat_keys_are_unique(self):
+        builder = ObjectKeyBuilder(TIME_FORMAT)
+        keys = [builder.get_key("monocle_trace_")[0] for _ in range(3)]
+        assert len(set(keys)) == 3
+        assert all(key.startswith("monocle_trace_") and "/" not in key for key in keys)
+        assert keys[2].endswith(f"_{builder.instance_id}-000003.ndjson")
+        builder.reset()
+        assert builder.get_key("monocle_trace_")[0].endswith(f"_{builder.instance_id}-000001.ndjson")
+
+    def test_partitioned_key(self):
+        builder = ObjectKeyBuilder(TIME_FORMAT, key_prefix="tenant_id=acme/", partitions="workflow, date,hour")
+        key, manifest = builder.get_key("traces/monocle_trace_", "chatbot")
+        date, hour = manifest[1], manifest[2]
+        # the folder of the file prefix stays above the partitions
+        assert key.startswith(f"tenant_id=acme/traces/workflow=chatbot/date={date}/hour={hour}/monocle_trace_")
+        assert manifest[0] == f"traces/workflow=chatbot/date={date}/hour={hour}/"
+
+    def test_split_by_workflow(self):
+        spans = [make_span(0, "chatbot"), make_span(1, "rag"), make_span(2, "chatbot")]
+        assert ObjectKeyBuilder(TIME_FORMAT).split_by_workflow(spans) == {None: spans}
+        batches = ObjectKeyBuilder(TIME_FORMAT, partitions="workflow").split_by_workflow(spans)
+        assert {workflow: [span.name for span in batch] for workflow, batch in batches.items()} == \
+            {"chatbot": ["span_0", "span_2"], "rag": ["span_1"]}
+
+    def test_manifests(self):
+        builder = ObjectKeyBuilder(TIME_FORMAT, partitions="date,hour", manifests=True)
+        key, manifest = builder.get_key("monocle_trace_")
+        builder.record_upload(manifest, key, "{}\n{}\n")
+        # the current hour isn't closed yet
+        assert builder.take_manifests(closed_only=True) == []
+        [(manifest_key, body)] = builder.take_manifests()
+        assert manifest_key == f"{manifest[0]}_manifest_{manifest[1]}T{manifest[2]}_{builder.instance_id}.json"
+        assert json.loads(body)["spans"] == 2
+        # written manifests are only taken again once updated
+        assert builder.take_manifests() == []
+
+        past_hour = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=1)
+        closed_manifest = ("", past_hour.strftime("%Y-%m-%d"), past_hour.strftime("%H"))
+        builder.record_upload(closed_manifest, "old.ndjson", "{}\n")
+        [(manifest_key, body)] = builder.take_manifests(closed_only=True)
+        assert json.loads(body)["files"][0]["key"] == "old.ndjson"
+        # a late upload, eg. a retried one, is merged into the manifest already written
+        builder.record_upload(closed_manifest, "late.ndjson", "{}\n")
+        [(late_manifest_key, body)] = builder.take_manifests(closed_only=True)
+        assert late_manifest_key == manifest_key
+        assert [entry["key"] for entry in json.loads(body)["files"]] == ["old.ndjson", "late.ndjson"]
+        assert json.loads(body)["spans"] == 2
+
+        with patch.object(object_key, "MAX_CLOSED_MANIFESTS", 0):
+            assert builder.take_manifests() == []
+        assert closed_manifest not in builder.manifests
+        # the current hour is kept
+        assert manifest in builder.manifests
+
+    def test_reset_after_fork(self):
+        builder = ObjectKeyBuilder(TIME_FORMAT, manifests=True)
+        instance_id = builder.instance_id
+        # held by another thread of the parent when the process forked
+        builder.lock.acquire()
+        builder.reset()
+        assert builder.instance_id != instance_id
+        assert not builder.lock.locked()
+
+    def test_invalid_partitions(self):
+        with self.assertRaises(ValueError):
+            ObjectKeyBuilder(TIME_FORMAT, partitions="workflow,tenant")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import time
+import unittest
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common.overhead_governor import (
+    LEVEL_FULL,
+    LEVEL_NO_ATTRIBUTES,
+    LEVEL_NO_EVENTS,
+    LEVEL_SAMPLED,
+    OverheadGovernor,
+    TimedSpanExporter,
+    observe_level,
+    observe_overhead_ratio,
+    set_overhead_governor,
+)
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.wrapper import task_wrapper
+
+TO_WRAP = {
+    "package": "app",
+    "object": "Retriever",
+    "method": "search",
+    "span_name": "app.search",
+    "output_processor": {
+        "type": "retrieval",
+        "attributes": [[{"attribute": "name", "accessor": lambda arguments: "retriever"}]],
+        "events": [
+            {"name": "data.output", "attributes": [{"attribute": "response", "accessor": lambda arguments: arguments["result"]}]}
+        ]
+    }
+}
+
+def search(query: str) -> str:
+    return f"results for {query}"
+
+class TestOverheadGovernor(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.tracer_provider = TracerProvider()
+        self.tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        tracer = self.tracer_provider.get_tracer("overhead_governor_test")
+        self.traced_search = lambda query, wrapped=search: task_wrapper(tracer, SpanHandler(), TO_WRAP)(
+            wrapped=wrapped, instance=None, args=(query,), kwargs={})
+
+    def tearDown(self):
+        set_overhead_governor(None)
+        self.tracer_provider.shutdown()
+
+    def search_span(self):
+        return [span for span in self.exporter.get_finished_spans() if span.name == "app.search"][-1]
+
+    def step(self, governor: OverheadGovernor, overhead_ns: int, request_ns: int) -> int:
+        governor.record_overhead(overhead_ns)
+        governor.request_ns += request_ns
+        return governor.evaluate()
+
+    def test_steps_down_and_recovers(self):
+        governor = OverheadGovernor(budget=0.02, window_seconds=3, evaluation_seconds=1)
+        assert self.step(governor, 10, 100) == LEVEL_NO_EVENTS
+        assert self.step(governor, 10, 100) == LEVEL_NO_ATTRIBUTES
+        assert self.step(governor, 10, 100) == LEVEL_SAMPLED
+        # recovers one level per full window under half of the budget
+        for expected in (LEVEL_SAMPLED, LEVEL_SAMPLED, LEVEL_NO_ATTRIBUTES):
+            assert self.step(governor, 1, 1000) == expected
+        for expected in (LEVEL_NO_ATTRIBUTES, LEVEL_NO_ATTRIBUTES, LEVEL_NO_EVENTS, LEVEL_NO_EVENTS, LEVEL_NO_EVENTS, LEVEL_FULL):
+            assert self.step(governor, 1, 1000) == expected
+        # within budget but not under the recovery threshold, the level is kept
+        governor.set_level(LEVEL_NO_EVENTS)
+        for _ in range(5):
+            assert self.step(governor, 15, 1000) == LEVEL_NO_EVENTS
+
+    def test_levels_applied_to_spans(self):
+        governor = OverheadGovernor(budget=0.02, sample_rate=0.0)
+        set_overhead_governor(governor)
+
+        self.traced_search("full")
+        span = self.search_span()
+        assert span.attributes["entity.1.name"] == "retriever"
+        assert len(span.events) == 1
+
+        governor.set_level(LEVEL_NO_EVENTS)
+        self.traced_search("no events")
+        span = self.search_span()
+        assert span.attributes["entity.1.name"] == "retriever"
+        assert len(span.events) == 0
+
+        governor.set_level(LEVEL_NO_ATTRIBUTES)
+        self.traced_search("no attributes")
+        span = self.search_span()
+        assert span.attributes["span.type"] == "retrieval"
+        assert "entity.1.name" not in span.attributes
+
+        governor.set_level(LEVEL_SAMPLED)
+        self.exporter.clear()
+        assert self.traced_search("sampled") == "results for sampled"
+        assert self.exporter.get_finished_spans() == ()
+        assert len(TO_WRAP["output_processor"]["events"]) == 1
+
+    def test_measures_overhead_and_requests(self):
+        governor = OverheadGovernor(budget=0.02)
+        set_overhead_governor(governor)
+        self.traced_search("query")
+        assert governor.request_ns > 0
+        assert 0 < governor.overhead_ns < governor.request_ns
+
+        timed_exporter = TimedSpanExporter(InMemorySpanExporter(), governor)
+        overhead_ns = governor.overhead_ns
+        timed_exporter.export(self.exporter.get_finished_spans())
+        assert governor.overhead_ns > overhead_ns
+
+    def test_sampled_at_the_root(self):
+        governor = OverheadGovernor(budget=0.02, sample_rate=1.0)
+        governor.set_level(LEVEL_SAMPLED)
+        set_overhead_governor(governor)
+
+        def request(query: str, sample_rate: float) -> str:
+            # the calls made in the request follow the decision taken at its root
+            governor.sample_rate = sample_rate
+            return self.traced_search(query)
+
+        self.traced_search("sampled", wrapped=lambda query: request(query, 0.0))
+        spans = [span for span in self.exporter.get_finished_spans() if span.name == "app.search"]
+        assert len(spans) == 2
+        assert len({span.context.trace_id for span in self.exporter.get_finished_spans()}) == 1
+
+        self.exporter.clear()
+        self.traced_search("not sampled", wrapped=lambda query: request(query, 1.0))
+        assert self.exporter.get_finished_spans() == ()
+        # the next request takes its own decision
+        self.traced_search("sampled")
+        assert len(self.exporter.get_finished_spans()) > 0
+
+    def test_metrics(self):
+        governor = OverheadGovernor(budget=0.02)
+        assert list(observe_level(None)) == []
+        set_overhead_governor(governor)
+        governor.overhead_ratio = 0.05
+        governor.set_level(LEVEL_NO_ATTRIBUTES)
+        assert [observation.value for observation in observe_level(None)] == [LEVEL_NO_ATTRIBUTES]
+        assert [observation.value for observation in observe_overhead_ratio(None)] == [0.05]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import unittest
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common.payload_offload import (
+    LocalPayloadStore,
+    PayloadOffloader,
+    PayloadStore,
+    set_payload_offloader,
+)
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+
+logger = logging.getLogger(__name__)
+
+RAG_CONTEXT = "retrieved context paragraph. " * 1000
+
+class BlockingPayloadStore(PayloadStore):
+    def __init__(self):
+        self.release = threading.Event()
+        self.written = []
+
+    def write(self, key: str, data: bytes) -> None:
+        self.release.wait(5)
+        self.written.append(key)
+
+    def uri(self, key: str) -> str:
+        return f"memory://{key}"
+
+class TestPayloadOffload(unittest.TestCase):
+
+    def setUp(self):
+        self.out_dir = tempfile.mkdtemp()
+        self.offloader = PayloadOffloader(LocalPayloadStore(self.out_dir), threshold_bytes=1024)
+        set_payload_offloader(self.offloader)
+        self.memory_exporter = InMemorySpanExporter()
+        self.tracer_provider = TracerProvider()
+        self.tracer_provider.add_span_processor(SimpleSpanProcessor(self.memory_exporter))
+        self.tracer = self.tracer_provider.get_tracer("offload_test")
+
+    def tearDown(self):
+        set_payload_offloader(None)
+        self.tracer_provider.shutdown()
+
+    def _hydrate_retrieval(self, output: str):
+        to_wrap = {
+            "output_processor": {
+                "type": "retrieval",
+                "events": [
+                    {
+                        "name": "data.output",
+                        "attributes": [
+                            {"attribute": "response", "accessor": lambda arguments: arguments["result"]}
+                        ]
+                    }
+                ]
+            }
+        }
+        with self.tracer.start_as_current_span("retrieval") as span:
+            SpanHandler().hydrate_events(to_wrap, None, None, [], {}, output, span)
+        return self.memory_exporter.get_finished_spans()[-1]
+
+    def test_large_payload_replaced_with_pointer(self):
+        span = self._hydrate_retrieval(RAG_CONTEXT)
+        self.offloader.shutdown(wait=True)
+
+        attributes = span.events[0].attributes
+        data = RAG_CONTEXT.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        assert attributes["response"].startswith("file://")
+        assert attributes["response.size"] == len(data)
+        assert attributes["response.sha256"] == digest
+        with open(attributes["response"][len("file://"):], "rb") as f:
+            assert f.read() == data
+
+    def test_small_payload_kept_inline(self):
+        span = self._hydrate_retrieval("short answer")
+        assert span.events[0].attributes["response"] == "short answer"
+        assert "response.size" not in span.events[0].attributes
+
+    def test_message_list_offloaded_as_json(self):
+        messages = [json.dumps({"system": RAG_CONTEXT}), json.dumps({"user": "question"})]
+        attributes = self.offloader.offload_attributes({"input": messages})
+        self.offloader.shutdown(wait=True)
+        with open(attributes["input"][len("file://"):]) as f:
+            assert json.load(f) == messages
+
+    def test_payload_truncated_when_writer_is_saturated(self):
+        store = BlockingPayloadStore()
+        offloader = PayloadOffloader(store, threshold_bytes=1024, max_workers=1, max_pending=1)
+        first = offloader.offload_attributes({"response": RAG_CONTEXT})
+        second = offloader.offload_attributes({"response": RAG_CONTEXT})
+        store.release.set()
+        offloader.shutdown(wait=True)
+
+        assert first["response"].startswith("memory://")
+        assert second["response.truncated"] is True
+        assert len(second["response"]) == 1024
+        assert len(store.written) == 1
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import glob
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.pool import ThreadPool
+from unittest.mock import patch
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.exporters.file_exporter import FileSpanExporter
+from monocle_apptrace.instrumentation.common.constants import EXECUTOR_CONTEXT_PROPAGATION, MONOCLE_INSTRUMENTOR
+from monocle_apptrace.instrumentation.common.instrumentor import setup_monocle_telemetry, start_scope, stop_scope
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common import utils
+from monocle_apptrace.instrumentation.common.utils import get_process_context, run_with_process_context
+from monocle_apptrace.instrumentation.common.wrapper import task_wrapper
+
+def to_wrap(name: str) -> dict:
+    return {"package": "app", "object": "Job", "method": name, "span_name": f"app.{name}"}
+
+def traced(name, fn, *args):
+    tracer = trace.get_tracer(MONOCLE_INSTRUMENTOR)
+    return task_wrapper(tracer, SpanHandler(), to_wrap(name))(wrapped=fn, instance=None, args=args, kwargs={})
+
+def embed(text):
+    return traced("embed", len, text)
+
+class TestProcessContextPropagation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.out_dir = tempfile.TemporaryDirectory()
+        cls.exporter = InMemorySpanExporter()
+        cls.file_exporter = FileSpanExporter(out_path=cls.out_dir.name)
+        with patch.dict(os.environ, {EXECUTOR_CONTEXT_PROPAGATION: "true"}):
+            cls.instrumentor = setup_monocle_telemetry(workflow_name="process_context_test",
+                                                       span_processors=[SimpleSpanProcessor(cls.exporter), SimpleSpanProcessor(cls.file_exporter)],
+                                                       union_with_default_methods=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.instrumentor.uninstrument()
+        cls.out_dir.cleanup()
+
+    def setUp(self):
+        self.exporter.clear()
+        for file_path in glob.glob(os.path.join(self.out_dir.name, "*")):
+            os.remove(file_path)
+
+    def spans(self, name):
+        return [span for span in self.exporter.get_finished_spans() if span.name == name]
+
+    def worker_spans(self, name):
+        """ Spans written by the worker processes to their own trace files """
+        spans = []
+        for file_path in glob.glob(os.path.join(self.out_dir.name, "monocle_trace_*.json")):
+            # monocle_trace_<worker pid>_<service name>_...
+            pid = os.path.basename(file_path).split("_")[2]
+            if not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            with open(file_path, encoding="UTF-8") as f:
+                spans.extend(span for span in json.load(f) if span["name"] == name)
+        return spans
+
+    def assert_worker_spans(self, count):
+        batch_span = self.spans("app.batch")[0]
+        embed_spans = self.worker_spans("app.embed")
+        assert len(embed_spans) == count
+        for embed_span in embed_spans:
+            assert embed_span["context"]["trace_id"] == f"0x{batch_span.context.trace_id:032x}"
+            assert embed_span["attributes"]["scope.job"] == "nightly"
+
+    def test_run_with_process_context(self):
+        def batch():
+            carrier = get_process_context()
+            # a thread without the caller's context, like a worker process
+            worker = threading.Thread(target=run_with_process_context, args=(carrier, embed, "hello"))
+            worker.start()
+            worker.join()
+        token = start_scope("job", "nightly")
+        try:
+            traced("batch", batch)
+        finally:
+            stop_scope(token)
+
+        batch_span = self.spans("app.batch")[0]
+        embed_span = self.spans("app.embed")[0]
+        worker_workflow = [span for span in self.spans("workflow") if span.parent and span.parent.span_id == batch_span.context.span_id]
+        assert len(worker_workflow) == 1
+        assert embed_span.context.trace_id == batch_span.context.trace_id
+        assert embed_span.parent.span_id == worker_workflow[0].context.span_id
+        assert embed_span.attributes["scope.job"] == "nightly"
+
+    def test_process_pool_executor(self):
+        def batch(texts):
+            with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("fork")) as executor:
+                return list(executor.map(embed, texts))
+        token = start_scope("job", "nightly")
+        try:
+            assert traced("batch", batch, ["a", "bb", "ccc"]) == [1, 2, 3]
+        finally:
+            stop_scope(token)
+        self.assert_worker_spans(3)
+
+    def test_pool_map(self):
+        def batch(texts):
+            pool = multiprocessing.get_context("fork").Pool(processes=2)
+            try:
+                return pool.map(embed, texts)
+            finally:
+                pool.close()
+                pool.join()
+        token = start_scope("job", "nightly")
+        try:
+            assert traced("batch", batch, ["a", "bb"]) == [1, 2]
+        finally:
+            stop_scope(token)
+        self.assert_worker_spans(2)
+
+    def test_pool_flushes_once_per_chunk(self):
+        flushes = []
+        def batch(texts):
+            with ThreadPool(processes=2) as pool:
+                return [pool.map(embed, texts, chunksize=3), list(pool.imap(embed, texts, chunksize=3)),
+                        sorted(pool.imap_unordered(embed, texts, chunksize=3))]
+        # a thread pool runs the tasks as the workers of a process pool would
+        with patch.object(utils.multiprocessing, "parent_process", return_value=object()), \
+                patch.object(utils, "register_process_shutdown"), \
+                patch.object(utils, "flush_process_spans", side_effect=lambda: flushes.append(1)):
+            texts = ["a", "bb", "ccc", "dddd", "eeeee", "ffffff"]
+            assert traced("batch", batch, texts) == [[1, 2, 3, 4, 5, 6]] * 3
+        assert len(flushes) == 6
+        batch_span = self.spans("app.batch")[0]
+        embed_spans = self.spans("app.embed")
+        assert len(embed_spans) == 18
+        assert all(span.context.trace_id == batch_span.context.trace_id for span in embed_spans)
+
+    def test_file_exporter_after_fork(self):
+        exporter = FileSpanExporter(out_path=self.out_dir.name)
+        exporter.file_handles[1] = (open(os.path.join(self.out_dir.name, "inherited.json"), "w"), "inherited.json", None, True)
+        pid = os.fork()
+        if pid == 0:
+            reinitialized = exporter.file_handles == {} and exporter.file_prefix == f"monocle_trace_{os.getpid()}_"
+            # a nested fork replaces the pid of its parent
+            nested_pid = os.fork()
+            if nested_pid == 0:
+                os._exit(0 if exporter.file_prefix == f"monocle_trace_{os.getpid()}_" else 1)
+            _, nested_status = os.waitpid(nested_pid, 0)
+            os._exit(0 if reinitialized and os.waitstatus_to_exitcode(nested_status) == 0 else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert 1 in exporter.file_handles
+        exporter.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
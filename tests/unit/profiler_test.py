@@ -0,0 +1,139 @@
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common.profiler import (
+    AccessorProfiler,
+    LatencyHistogram,
+    bucket_bounds,
+    bucket_index,
+    format_report,
+    main,
+)
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.wrapper import task_wrapper
+
+def failing_accessor(arguments):
+    raise ValueError("no provider")
+
+TO_WRAP = {
+    "package": "app.retriever",
+    "object": "Retriever",
+    "method": "search",
+    "span_name": "app.search",
+    "output_processor": {
+        "type": "retrieval",
+        "attributes": [
+            [
+                {"attribute": "name", "accessor": lambda arguments: "retriever"},
+                {"attribute": "provider", "accessor": failing_accessor},
+            ]
+        ],
+        "events": [
+            {"name": "data.output", "attributes": [{"attribute": "response", "accessor": lambda arguments: arguments["result"]}]}
+        ]
+    }
+}
+
+def search(query: str) -> str:
+    return f"results for {query}"
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_buckets_cover_values(self):
+        for value in [0, 1, 7, 8, 9, 15, 16, 1000, 123456789, 2**40 + 17]:
+            lower, upper = bucket_bounds(bucket_index(value))
+            assert lower <= value < upper, value
+            assert upper - lower <= max(1, lower // 4)
+
+    def test_quantiles(self):
+        histogram = LatencyHistogram()
+        for _ in range(98):
+            histogram.record(1000)
+        histogram.record(1_000_000, error=True)
+        histogram.record(1_000_000)
+        assert 800 < histogram.quantile(0.5) < 1200
+        assert 800_000 < histogram.quantile(0.99) < 1_200_000
+        assert histogram.errors == 1
+
+class TestAccessorProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.tracer_provider = TracerProvider()
+        self.tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.tracer = self.tracer_provider.get_tracer("profiler_test")
+        self.profiler = AccessorProfiler()
+
+    def tearDown(self):
+        self.tracer_provider.shutdown()
+
+    def traced_search(self, query):
+        to_wrap, handler = self.profiler.profile_method(TO_WRAP, "default", SpanHandler())
+        return task_wrapper(self.tracer, handler, to_wrap)(wrapped=search, instance=None, args=(query,), kwargs={})
+
+    def test_profiles_accessors_and_handler(self):
+        for _ in range(10):
+            assert self.traced_search("monocle") == "results for monocle"
+
+        span = [span for span in self.exporter.get_finished_spans() if span.name == "app.search"][-1]
+        assert span.attributes["entity.1.name"] == "retriever"
+        assert span.events[0].attributes["response"] == "results for monocle"
+
+        rows = {row["site"]: row for row in self.profiler.report()}
+        assert rows["entity.1.name"]["entity"] == "app.search"
+        assert rows["entity.1.name"]["calls"] == 10
+        assert rows["entity.1.name"]["error_rate"] == 0
+        assert rows["entity.1.provider"]["error_rate"] == 1
+        assert rows["events.data.output.response"]["calls"] == 10
+        for method in ["pre_tracing", "skip_span", "hydrate_span", "post_tracing"]:
+            assert rows[f"default.{method}"]["calls"] >= 10
+        # profiling keeps the original wrapper method untouched
+        assert TO_WRAP["output_processor"]["attributes"][0][1]["accessor"] is failing_accessor
+
+    def test_report_is_ranked_and_printed(self):
+        slow = self.profiler.timed(lambda: time.sleep(0.002), "app.search", "slow")
+        fast = self.profiler.timed(lambda: None, "app.search", "fast")
+        slow()
+        fast()
+        rows = self.profiler.report()
+        assert [row["site"] for row in rows] == ["slow", "fast"]
+
+        table = format_report(rows)
+        assert table.splitlines()[0].split()[:2] == ["entity", "site"]
+        assert "slow" in table.splitlines()[1]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            with open(path, "w") as f:
+                json.dump(rows, f)
+            output = io.StringIO()
+            with redirect_stdout(output):
+                main([path, "--sort", "calls", "--top", "1"])
+            assert len(output.getvalue().splitlines()) == 2
+
+    def test_profiling_overhead(self):
+        calls = 20000
+        accessor = TO_WRAP["output_processor"]["attributes"][0][0]["accessor"]
+        timed = self.profiler.timed(accessor, "app.search", "entity.1.name")
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            accessor(None)
+        plain_ns = time.perf_counter_ns() - start
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            timed(None)
+        profiled_ns = time.perf_counter_ns() - start
+        # the per call cost has to stay small enough to leave profiling on in staging
+        assert (profiled_ns - plain_ns) / calls < 3000
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import logging
+import unittest
+
+from common.dummy_class import DummyClass
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.exporters.file_exporter import FileSpanExporter
+from monocle_apptrace.instrumentation.common.constants import (
+    APP_HOSTING_TYPE,
+    MONOCLE_INSTRUMENTOR,
+    MONOCLE_SDK_LANGUAGE,
+    MONOCLE_SDK_VERSION,
+    WORKFLOW_NAME,
+)
+from monocle_apptrace.instrumentation.common.instrumentor import setup_monocle_telemetry
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.utils import get_monocle_version
+from monocle_apptrace.instrumentation.common.wrapper import task_wrapper
+from monocle_apptrace.instrumentation.common.wrapper_method import WrapperMethod
+
+logger = logging.getLogger(__name__)
+
+class TestResourceAttributes(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.instrumentor = setup_monocle_telemetry(
+            workflow_name="resource_test",
+            span_processors=[SimpleSpanProcessor(self.exporter)],
+            wrapper_methods=[
+                WrapperMethod(
+                    package="common.dummy_class",
+                    object_name="DummyClass",
+                    method="double_it",
+                    span_name="double_it",
+                    wrapper_method=task_wrapper
+                )
+            ])
+
+    def tearDown(self):
+        self.exporter.clear()
+        if self.instrumentor is not None:
+            self.instrumentor.uninstrument()
+
+    def test_process_attributes_on_resource(self):
+        DummyClass().double_it(2)
+        spans = self.exporter.get_finished_spans()
+        assert len(spans) > 0
+        for span in spans:
+            assert span.resource.attributes[MONOCLE_SDK_VERSION] == get_monocle_version()
+            assert span.resource.attributes[MONOCLE_SDK_LANGUAGE] == "python"
+            # the global tracer provider is set once per process, so other tests may own the resource
+            assert span.resource.attributes[WORKFLOW_NAME] == span.resource.attributes[SERVICE_NAME]
+            assert span.resource.attributes[APP_HOSTING_TYPE].startswith("app_hosting.")
+            # still on the span for the exporters that write the resource with every span
+            assert span.attributes[MONOCLE_SDK_VERSION] == get_monocle_version()
+            assert span.attributes[WORKFLOW_NAME] == "resource_test"
+            assert span.instrumentation_scope.name == MONOCLE_INSTRUMENTOR
+            assert span.instrumentation_scope.version == get_monocle_version()
+
+    def test_process_attributes_on_span_without_monocle_resource(self):
+        # eg. the processors were added to the SDK tracer provider the app had set before setup_monocle_telemetry
+        provider = TracerProvider(resource=Resource.create({SERVICE_NAME: "app"}))
+        with provider.get_tracer(MONOCLE_INSTRUMENTOR).start_as_current_span("other") as span:
+            SpanHandler.set_default_monocle_attributes(span)
+        assert span.attributes[MONOCLE_SDK_VERSION] == get_monocle_version()
+        assert span.attributes[MONOCLE_SDK_LANGUAGE] == "python"
+        assert span.attributes[WORKFLOW_NAME] == "resource_test"
+
+    def test_skip_export_checks_instrumentation_scope(self):
+        DummyClass().double_it(2)
+        monocle_span = self.exporter.get_finished_spans()[0]
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        with provider.get_tracer("other_library").start_as_current_span("other"):
+            pass
+        other_span = self.exporter.get_finished_spans()[-1]
+        file_exporter = FileSpanExporter()
+        assert not file_exporter.skip_export(monocle_span)
+        assert file_exporter.skip_export(other_span)
+
+if __name__ == '__main__':
+    unittest.main()
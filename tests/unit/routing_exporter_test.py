@@ -0,0 +1,134 @@
+import threading
+import unittest
+
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import SpanContext, TraceFlags
+
+from monocle_apptrace.exporters.routing_exporter import DEFAULT_ROUTE, RouteExporterFactory, RoutingSpanExporter
+
+def make_span(index: int, trace_id: int = 1, tenant: str = None) -> ReadableSpan:
+    attributes = {"scope.tenant_id": tenant} if tenant else {}
+    return ReadableSpan(name=f"span_{index}", context=SpanContext(trace_id=trace_id, span_id=index + 1, is_remote=False,
+                                                            trace_flags=TraceFlags(TraceFlags.SAMPLED)),
+                        attributes=attributes, resource=Resource({"workflow.name": "app"}), start_time=index, end_time=index)
+
+class QueueingExporter(InMemorySpanExporter):
+    """ Uploads its queued spans in an async force_flush, like the S3 exporter """
+    def __init__(self, router_lock):
+        super().__init__()
+        self.router_lock = router_lock
+        self.queued = []
+        self.lock_held_at_shutdown = None
+
+    def export(self, spans):
+        self.queued.extend(spans)
+
+    async def force_flush(self, timeout_millis: int = 30000) -> bool:
+        super().export(self.queued)
+        self.queued = []
+        return True
+
+    def shutdown(self):
+        self.lock_held_at_shutdown = self.router_lock.locked()
+        super().shutdown()
+
+class TestRoutingSpanExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.exporters = {}
+        self.router = RoutingSpanExporter(self.create_exporters, route_attribute="scope.tenant_id", max_routes=2)
+
+    def tearDown(self):
+        self.router.shutdown()
+
+    def create_exporters(self, route: str):
+        self.exporters[route] = InMemorySpanExporter()
+        return [self.exporters[route]]
+
+    def exported(self, route: str):
+        return [span.name for span in self.exporters[route].get_finished_spans()]
+
+    def test_partition_by_scope(self):
+        self.router.export([make_span(0, 1, "acme"), make_span(1, 2, "globex"), make_span(2, 1, "acme")])
+        assert self.router.force_flush()
+        assert self.exported("acme") == ["span_0", "span_2"]
+        assert self.exported("globex") == ["span_1"]
+
+    def test_trace_route_fallback(self):
+        self.router.export([make_span(0, 1, "acme"), make_span(1, 1), make_span(2, 2)])
+        assert self.router.force_flush()
+        assert self.exported("acme") == ["span_0", "span_1"]
+        assert self.exported(DEFAULT_ROUTE) == ["span_2"]
+
+    def test_lru_eviction_flushes_route(self):
+        self.router.export([make_span(0, 1, "acme"), make_span(1, 2, "globex")])
+        # acme becomes the most recently used route, globex is evicted for initech
+        self.router.export([make_span(2, 1, "acme"), make_span(3, 3, "initech")])
+        assert list(self.router.routes) == ["acme", "initech"]
+        assert self.router.evicted_routes == 1
+        assert self.exported("globex") == ["span_1"]
+        assert self.exporters["globex"]._stopped
+        # a new exporter is created when the route comes back
+        self.router.export([make_span(4, 2, "globex")])
+        assert self.router.force_flush()
+        assert self.exported("globex") == ["span_4"]
+
+    def test_evicted_route_flushed_outside_the_lock(self):
+        exporters = {}
+        def create_exporters(route):
+            exporters[route] = QueueingExporter(router.lock)
+            return [exporters[route]]
+        router = RoutingSpanExporter(create_exporters, route_attribute="scope.tenant_id", max_routes=1)
+        router.export([make_span(0, 1, "acme"), make_span(1, 1, "acme")])
+        router.export([make_span(2, 2, "globex")])
+        assert [span.name for span in exporters["acme"].get_finished_spans()] == ["span_0", "span_1"]
+        assert exporters["acme"].lock_held_at_shutdown is False
+        router.shutdown()
+        assert [span.name for span in exporters["globex"].get_finished_spans()] == ["span_2"]
+
+    def test_exporters_created_outside_the_lock(self):
+        lock_held = []
+        exporters = []
+        def create_exporters(route):
+            lock_held.append(self.router.lock.locked())
+            if len(lock_held) == 1:
+                # another thread adds the route while its exporters are created
+                thread = threading.Thread(target=self.router.export, args=([make_span(0, 1, "acme")],))
+                thread.start()
+                thread.join(5)
+            exporters.append(InMemorySpanExporter())
+            return [exporters[-1]]
+        self.router.exporter_factory = create_exporters
+        self.router.export([make_span(1, 1, "acme")])
+        assert lock_held == [False, False]
+        # the route keeps the exporter of the other thread, the one created here is shut down unused
+        added, unused = exporters
+        assert self.router.force_flush()
+        assert [span.name for span in added.get_finished_spans()] == ["span_0", "span_1"]
+        assert unused._stopped and unused.get_finished_spans() == ()
+
+    def test_batch_with_more_routes_than_max_routes(self):
+        self.router.export([make_span(0, 1, "acme")])
+        self.router.export([make_span(1, 2, "globex"), make_span(2, 3, "initech"), make_span(3, 1, "acme")])
+        assert list(self.router.routes) == ["initech", "acme"]
+        assert self.router.force_flush()
+        assert self.exported("globex") == ["span_1"]
+        assert self.exported("acme") == ["span_3"]
+
+    def test_route_by_workflow(self):
+        router = RoutingSpanExporter(self.create_exporters)
+        router.export([make_span(0, 1, "acme")])
+        assert router.force_flush()
+        assert self.exported("app") == ["span_0"]
+        router.shutdown()
+
+    def test_route_exporter_kwargs(self):
+        factory = RouteExporterFactory("s3,file,okahu", "scope.tenant_id")
+        assert factory.get_exporter_kwargs("s3", "acme") == {"key_prefix": "tenant_id=acme/"}
+        assert factory.get_exporter_kwargs("file", "acme") == {"file_prefix": "monocle_trace_acme_"}
+        assert factory.get_exporter_kwargs("okahu", "acme") == {}
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,26 @@
+import asyncio
 import datetime
+import json
 import logging
 import os
 import time
 import unittest
 from unittest.mock import MagicMock, patch
 
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.trace import SpanContext, TraceFlags
+
 from monocle_apptrace.exporters.aws.s3_exporter import S3SpanExporter
+from monocle_apptrace.exporters.batch_span_processor import MonocleBatchSpanProcessor
 
 logger = logging.getLogger(__name__)
 
+def make_span(index: int) -> ReadableSpan:
+    return ReadableSpan(name=f"span_{index}", context=SpanContext(trace_id=1, span_id=index + 1, is_remote=False,
+                                                            trace_flags=TraceFlags(TraceFlags.SAMPLED)),
+                        resource=Resource({"workflow.name": "chatbot"}), start_time=index, end_time=index)
+
 class TestS3SpanExporter(unittest.TestCase):
     @patch('boto3.client')
     def test_file_prefix_in_file_name(self, mock_boto_client):
@@ -30,7 +42,7 @@ class TestS3SpanExporter(unittest.TestCase):
             exporter._S3SpanExporter__upload_to_s3(test_span_data)
 
             # Generate expected file name
-            expected_file_name = f"{file_prefix}{mock_current_time.strftime(exporter.time_format)}.ndjson"
+            expected_file_name = f"{file_prefix}{mock_current_time.strftime(exporter.time_format)}_{exporter.key_builder.instance_id}-000001.ndjson"
 
             # Verify the S3 client was called with the correct file name
             mock_s3_client.put_object.assert_called_once_with(
@@ -60,7 +72,7 @@ class TestS3SpanExporter(unittest.TestCase):
             exporter._S3SpanExporter__upload_to_s3(test_span_data)
 
             # Generate expected file name
-            expected_file_name = f"{file_prefix}{mock_current_time.strftime(exporter.time_format)}.ndjson"
+            expected_file_name = f"{file_prefix}{mock_current_time.strftime(exporter.time_format)}_{exporter.key_builder.instance_id}-000001.ndjson"
 
             # Verify the S3 client was called with the correct file name
             mock_s3_client.put_object.assert_called_once_with(
@@ -69,5 +81,71 @@ class TestS3SpanExporter(unittest.TestCase):
                 Body=test_span_data
             )
 
+    @patch('boto3.client')
+    def test_partitioned_key_and_manifest(self, mock_boto_client):
+        mock_s3_client = MagicMock()
+        mock_boto_client.return_value = mock_s3_client
+        env = {"MONOCLE_S3_KEY_PREFIX": "monocle_trace_", "MONOCLE_EXPORT_KEY_PARTITIONS": "workflow,date,hour",
+               "MONOCLE_EXPORT_MANIFESTS": "true"}
+        with patch.dict(os.environ, env):
+            exporter = S3SpanExporter(bucket_name="test-bucket", region_name="us-east-1", key_prefix="tenant_id=acme/")
+
+        test_span_data = "{\"trace_id\": \"123\"}\n"
+        exporter._S3SpanExporter__upload_to_s3(test_span_data, workflow_name="chatbot")
+        exporter._S3SpanExporter__upload_to_s3(test_span_data, workflow_name="chatbot")
+        keys = [call.kwargs["Key"] for call in mock_s3_client.put_object.call_args_list]
+        utc_now = datetime.datetime.now(datetime.timezone.utc)
+        partition = f"tenant_id=acme/workflow=chatbot/date={utc_now.strftime('%Y-%m-%d')}/hour={utc_now.strftime('%H')}/"
+        # two batches uploaded in the same second get their own keys
+        assert len(set(keys)) == 2
+        for sequence, key in enumerate(keys, 1):
+            assert key.startswith(partition + "monocle_trace_")
+            assert key.endswith(f"_{exporter.key_builder.instance_id}-{sequence:06d}.ndjson")
+
+        # the manifest of the current hour is written on flush
+        asyncio.run(exporter.force_flush())
+        manifest_call = mock_s3_client.put_object.call_args_list[-1]
+        assert manifest_call.kwargs["Key"].startswith(partition + "_manifest_")
+        manifest = json.loads(manifest_call.kwargs["Body"])
+        assert [entry["key"] for entry in manifest["files"]] == keys
+        assert manifest["spans"] == 2
+
+    @patch('boto3.client')
+    def test_manifest_written_by_processor(self, mock_boto_client):
+        mock_s3_client = MagicMock()
+        mock_boto_client.return_value = mock_s3_client
+        env = {"MONOCLE_EXPORT_KEY_PARTITIONS": "workflow,date,hour", "MONOCLE_EXPORT_MANIFESTS": "true"}
+        with patch.dict(os.environ, env):
+            exporter = S3SpanExporter(bucket_name="test-bucket", region_name="us-east-1")
+        def uploaded():
+            return [(call.kwargs["Key"], call.kwargs["Body"]) for call in mock_s3_client.put_object.call_args_list]
+
+        processor = MonocleBatchSpanProcessor(exporter)
+        processor.on_end(make_span(0))
+        assert processor.force_flush()
+        [(batch_key, _), (manifest_key, manifest)] = uploaded()
+        assert "/_manifest_" in manifest_key
+        assert [entry["key"] for entry in json.loads(manifest)["files"]] == [batch_key]
+
+        # the spans still queued by the exporter and the updated manifest are written on shutdown
+        processor.on_end(make_span(1))
+        processor.shutdown()
+        (last_batch_key, _), (last_manifest_key, manifest) = uploaded()[-2:]
+        assert last_manifest_key == manifest_key
+        assert [entry["key"] for entry in json.loads(manifest)["files"]] == [batch_key, last_batch_key]
+
+    @patch('boto3.client')
+    def test_shutdown_writes_queued_spans(self, mock_boto_client):
+        mock_s3_client = MagicMock()
+        mock_boto_client.return_value = mock_s3_client
+        with patch.dict(os.environ, {"MONOCLE_EXPORT_MANIFESTS": "true"}):
+            exporter = S3SpanExporter(bucket_name="test-bucket", region_name="us-east-1")
+        # queued by the exporter until its export interval has passed
+        exporter.export([make_span(0)])
+        assert mock_s3_client.put_object.call_count == 0
+        exporter.shutdown()
+        keys = [call.kwargs["Key"] for call in mock_s3_client.put_object.call_args_list]
+        assert len(keys) == 2 and keys[1].startswith("_manifest_")
+
 if __name__ == '__main__':
     unittest.main()
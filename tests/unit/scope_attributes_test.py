@@ -0,0 +1,45 @@
+import logging
+import unittest
+
+from opentelemetry import baggage
+from opentelemetry.context import attach, detach
+
+from monocle_apptrace.instrumentation.common.constants import MONOCLE_SCOPE_NAME_PREFIX
+from monocle_apptrace.instrumentation.common.utils import get_scope_attributes, remove_scopes, set_scopes
+
+logger = logging.getLogger(__name__)
+
+class TestScopeAttributes(unittest.TestCase):
+
+    def test_snapshot_follows_set_and_remove(self):
+        assert dict(get_scope_attributes()) == {}
+        outer = set_scopes({"conversation": "c1"})
+        inner = set_scopes({"turn": "t1"})
+        snapshot = get_scope_attributes()
+        assert dict(snapshot) == {"scope.conversation": "c1", "scope.turn": "t1"}
+        # unchanged scopes return the same snapshot
+        assert get_scope_attributes() is snapshot
+        remove_scopes(inner)
+        assert dict(get_scope_attributes()) == {"scope.conversation": "c1"}
+        remove_scopes(outer)
+        assert dict(get_scope_attributes()) == {}
+
+    def test_snapshot_is_immutable(self):
+        token = set_scopes({"conversation": "c1"})
+        try:
+            with self.assertRaises(TypeError):
+                get_scope_attributes()["scope.turn"] = "t1"
+        finally:
+            remove_scopes(token)
+
+    def test_baggage_set_outside_set_scopes(self):
+        token = set_scopes({"conversation": "c1"})
+        baggage_token = attach(baggage.set_baggage(f"{MONOCLE_SCOPE_NAME_PREFIX}remote", "r1"))
+        try:
+            assert dict(get_scope_attributes()) == {"scope.conversation": "c1", "scope.remote": "r1"}
+        finally:
+            detach(baggage_token)
+            remove_scopes(token)
+
+if __name__ == '__main__':
+    unittest.main()
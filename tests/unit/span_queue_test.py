@@ -0,0 +1,101 @@
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.trace import SpanContext, Status, StatusCode
+
+from monocle_apptrace.exporters.base_exporter import SpanExporterBase
+from monocle_apptrace.exporters.span_queue import (
+    BLOCK, BLOCK_TIMEOUT, DROP_BY_PRIORITY, DROP_NEWEST, DROP_OLDEST, EVICTED, EXPORT_QUEUE_POLICY_ENV, EXPORT_QUEUE_SIZE_ENV,
+    QUEUE_FULL, SpanRingBuffer, new_span_queue
+)
+
+PARENT = SpanContext(trace_id=1, span_id=1, is_remote=False)
+
+def make_span(index: int, span_type: str = "inference", root: bool = False, error: bool = False) -> ReadableSpan:
+    return ReadableSpan(name=f"span_{index}", context=SpanContext(trace_id=1, span_id=index + 2, is_remote=False),
+                        parent=None if root else PARENT, attributes={"span.type": span_type},
+                        status=Status(StatusCode.ERROR, "failed") if error else Status(StatusCode.UNSET),
+                        start_time=index, end_time=index)
+
+def names(spans):
+    return [span.name for span in spans]
+
+class BatchingExporter(SpanExporterBase):
+    def export(self, spans):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+class TestSpanRingBuffer(unittest.TestCase):
+
+    def fill(self, queue: SpanRingBuffer, count: int, **kwargs):
+        return [queue.put(make_span(index, **kwargs)) for index in range(count)]
+
+    def test_take_in_order(self):
+        queue = SpanRingBuffer(capacity=10)
+        self.fill(queue, 5)
+        assert names(queue.take(3)) == ["span_0", "span_1", "span_2"]
+        assert len(queue) == 2
+        assert names(queue.take(10)) == ["span_3", "span_4"]
+        assert queue.take(10) == []
+
+    def test_drop_newest(self):
+        queue = SpanRingBuffer(capacity=3, policy=DROP_NEWEST)
+        assert self.fill(queue, 5) == [True, True, True, False, False]
+        assert names(queue.take(5)) == ["span_0", "span_1", "span_2"]
+        assert queue.get_dropped() == {(QUEUE_FULL, "inference"): 2}
+
+    def test_drop_oldest(self):
+        queue = SpanRingBuffer(capacity=3, policy=DROP_OLDEST)
+        assert all(self.fill(queue, 5))
+        assert names(queue.take(5)) == ["span_2", "span_3", "span_4"]
+        assert queue.get_dropped() == {(EVICTED, "inference"): 2}
+
+    def test_drop_by_priority(self):
+        queue = SpanRingBuffer(capacity=3, policy=DROP_BY_PRIORITY)
+        queue.put(make_span(0, span_type="workflow", root=True))
+        queue.put(make_span(1, span_type="retrieval"))
+        queue.put(make_span(2, error=True))
+        # the retrieval span is evicted for the new span
+        assert queue.put(make_span(3, span_type="retrieval"))
+        assert queue.put(make_span(4, error=True))
+        # only error and root spans left, an ordinary span is dropped
+        assert not queue.put(make_span(5))
+        assert names(queue.take(5)) == ["span_0", "span_2", "span_4"]
+        assert queue.get_dropped() == {(EVICTED, "retrieval"): 2, (QUEUE_FULL, "inference"): 1}
+
+    def test_block_until_taken(self):
+        queue = SpanRingBuffer(capacity=2, policy=BLOCK, block_timeout=5)
+        self.fill(queue, 2)
+        consumer = threading.Timer(0.05, queue.take, args=(1,))
+        consumer.start()
+        assert queue.put(make_span(2))
+        consumer.join()
+        assert names(queue.take(5)) == ["span_1", "span_2"]
+
+    def test_block_timeout(self):
+        queue = SpanRingBuffer(capacity=1, policy=BLOCK, block_timeout=0.01)
+        assert self.fill(queue, 2) == [True, False]
+        assert queue.get_dropped() == {(BLOCK_TIMEOUT, "inference"): 1}
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            SpanRingBuffer(policy="random")
+        assert new_span_queue("test", policy="random").policy == DROP_NEWEST
+
+    def test_exporter_queue_holds_a_batch(self):
+        assert BatchingExporter().export_queue is None
+        exporter = BatchingExporter()
+        with patch.dict(os.environ, {EXPORT_QUEUE_SIZE_ENV: "10", EXPORT_QUEUE_POLICY_ENV: BLOCK}):
+            exporter.init_export_queue(max_batch_size=500)
+        # drained by the exporting thread once a batch is queued, before the queue is full
+        assert exporter.export_queue.capacity == 500
+        exporter.reinit_after_fork()
+        assert exporter.export_queue.capacity == 500
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from monocle_apptrace.instrumentation.common import reset_method_switches, set_method_switch
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.switchboard import Switchboard, SwitchboardFileWatcher, get_switchboard
+from monocle_apptrace.instrumentation.common.wrapper import task_wrapper
+
+TO_WRAP = {
+    "package": "langchain_core.prompts.base",
+    "object": "BasePromptTemplate",
+    "method": "invoke",
+    "span_name": "prompt.invoke",
+    "output_processor": {
+        "type": "generic",
+        "events": [
+            {"name": "data.output", "attributes": [{"attribute": "response", "accessor": lambda arguments: arguments["result"]}]}
+        ]
+    }
+}
+
+def format_prompt(question: str) -> str:
+    return f"Question: {question}"
+
+class TestSwitchboard(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.tracer_provider = TracerProvider()
+        self.tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        tracer = self.tracer_provider.get_tracer("switchboard_test")
+        self.traced_format_prompt = lambda question: task_wrapper(tracer, SpanHandler(), TO_WRAP)(
+            wrapped=format_prompt, instance=None, args=(question,), kwargs={})
+
+    def tearDown(self):
+        reset_method_switches()
+        self.tracer_provider.shutdown()
+
+    def prompt_spans(self):
+        return [span for span in self.exporter.get_finished_spans() if span.name == "prompt.invoke"]
+
+    def test_no_switch_traces(self):
+        assert self.traced_format_prompt("hi") == "Question: hi"
+        spans = self.prompt_spans()
+        assert len(spans) == 1
+        assert spans[0].events[0].attributes["response"] == "Question: hi"
+
+    def test_disabled_method_is_passed_through(self):
+        set_method_switch(TO_WRAP, enabled=False)
+        assert self.traced_format_prompt("hi") == "Question: hi"
+        assert self.prompt_spans() == []
+
+        set_method_switch(TO_WRAP, enabled=True)
+        self.traced_format_prompt("hi")
+        assert len(self.prompt_spans()) == 1
+
+    def test_disabled_by_span_name(self):
+        set_method_switch({"span_name": "prompt.invoke"}, enabled=False)
+        self.traced_format_prompt("hi")
+        assert self.prompt_spans() == []
+
+    def test_sample_rate(self):
+        set_method_switch(TO_WRAP, sample_rate=0.0)
+        for _ in range(10):
+            self.traced_format_prompt("hi")
+        assert self.prompt_spans() == []
+
+    def test_sampled_out_root_traces_no_children(self):
+        tracer = self.tracer_provider.get_tracer("switchboard_test")
+        inner = lambda question: task_wrapper(tracer, SpanHandler(), {**TO_WRAP, "span_name": "inner"})(
+            wrapped=format_prompt, instance=None, args=(question,), kwargs={})
+        def outer(question: str) -> str:
+            return inner(question) + inner(question)
+        set_method_switch({"span_name": "outer"}, sample_rate=0.0)
+        task_wrapper(tracer, SpanHandler(), {**TO_WRAP, "span_name": "outer"})(
+            wrapped=outer, instance=None, args=("hi",), kwargs={})
+        # the children of a root that wasn't sampled don't start their own traces
+        assert self.exporter.get_finished_spans() == ()
+
+    def test_events_off(self):
+        set_method_switch(TO_WRAP, events=False)
+        self.traced_format_prompt("hi")
+        spans = self.prompt_spans()
+        assert len(spans) == 1
+        assert spans[0].events == ()
+        assert "events" in TO_WRAP["output_processor"]
+
+    def test_file_watcher_reloads(self):
+        board = Switchboard()
+        with tempfile.TemporaryDirectory() as out_dir:
+            file_path = os.path.join(out_dir, "switchboard.json")
+            with open(file_path, "w") as f:
+                json.dump([{"span_name": "http.send", "enabled": False}], f)
+            watcher = SwitchboardFileWatcher(board, file_path, poll_seconds=0.01)
+            watcher.start()
+            try:
+                assert board.lookup({"span_name": "http.send"}).enabled is False
+                with open(file_path, "w") as f:
+                    json.dump([{"package": "requests.sessions", "object": "Session", "method": "request", "sample_rate": 0.5}], f)
+                os.utime(file_path, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+                deadline = time.time() + 5
+                while board.lookup({"span_name": "http.send"}) is not None and time.time() < deadline:
+                    time.sleep(0.01)
+                assert board.lookup({"span_name": "http.send"}) is None
+                assert board.lookup({"package": "requests.sessions", "object": "Session", "method": "request"}).sample_rate == 0.5
+            finally:
+                watcher.stop()
+        assert get_switchboard().switches == {}
+
+if __name__ == '__main__':
+    unittest.main()
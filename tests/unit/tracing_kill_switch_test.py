@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch
+
+import wrapt
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import NoOpTracerProvider
+
+from benchmark.tracing_kill_switch_benchmark import MAX_OVERHEAD_NS, measure
+from monocle_apptrace.instrumentation.common import disable_monocle_tracing, enable_monocle_tracing
+from monocle_apptrace.instrumentation.common.span_handler import SpanHandler
+from monocle_apptrace.instrumentation.common.wrapper import task_wrapper
+
+TO_WRAP = {"package": "app", "object": "Service", "method": "lookup", "span_name": "app.lookup", "output_processor": {"type": "generic"}}
+
+def lookup(key):
+    return key
+
+class CountingSpanHandler(SpanHandler):
+    def __init__(self):
+        super().__init__()
+        self.pre_tracing_calls = 0
+
+    def pre_tracing(self, to_wrap, wrapped, instance, args, kwargs):
+        self.pre_tracing_calls += 1
+        return super().pre_tracing(to_wrap, wrapped, instance, args, kwargs)
+
+class TestTracingKillSwitch(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        self.tracer_provider = TracerProvider()
+        self.tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.handler = CountingSpanHandler()
+
+    def tearDown(self):
+        enable_monocle_tracing()
+        self.tracer_provider.shutdown()
+
+    def instrument(self, tracer):
+        return wrapt.FunctionWrapper(lookup, task_wrapper(tracer, self.handler, TO_WRAP))
+
+    def test_kill_switch(self):
+        traced_lookup = self.instrument(self.tracer_provider.get_tracer("kill_switch_test"))
+        disable_monocle_tracing()
+        assert traced_lookup("key") == "key"
+        assert self.exporter.get_finished_spans() == ()
+        assert self.handler.pre_tracing_calls == 0
+
+        enable_monocle_tracing()
+        traced_lookup("key")
+        assert len(self.exporter.get_finished_spans()) > 0
+        assert self.handler.pre_tracing_calls == 1
+
+    def test_noop_tracer_provider(self):
+        traced_lookup = self.instrument(NoOpTracerProvider().get_tracer("kill_switch_test"))
+        assert traced_lookup("key") == "key"
+        assert self.handler.pre_tracing_calls == 0
+
+    def test_tracer_provider_without_processors(self):
+        tracer_provider = TracerProvider()
+        traced_lookup = self.instrument(tracer_provider.get_tracer("kill_switch_test"))
+        traced_lookup("key")
+        assert self.handler.pre_tracing_calls == 0
+
+        tracer_provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        traced_lookup("key")
+        assert self.handler.pre_tracing_calls == 1
+        assert len(self.exporter.get_finished_spans()) > 0
+
+    def test_disabled_call_skips_the_tracing_path(self):
+        traced_lookup = self.instrument(self.tracer_provider.get_tracer("kill_switch_test"))
+        disable_monocle_tracing()
+        with patch("traceback.extract_stack") as extract_stack:
+            assert traced_lookup("key") == "key"
+        extract_stack.assert_not_called()
+
+    def test_disabled_overhead_is_bounded(self):
+        overheads = measure(calls=5000)
+        assert all(value < MAX_OVERHEAD_NS for value in overheads.values()), overheads
+
+if __name__ == '__main__':
+    unittest.main()
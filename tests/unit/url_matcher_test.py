@@ -0,0 +1,68 @@
+import logging
+import unittest
+
+from opentelemetry.sdk.trace import TracerProvider
+
+from monocle_apptrace.instrumentation.common.url_matcher import (
+    PROPAGATE_AND_SPAN,
+    PROPAGATE_ONLY,
+    UrlMatcher,
+    get_url_matcher,
+    reload_url_matcher,
+)
+from monocle_apptrace.instrumentation.metamodel.requests._helper import RequestSpanHandler, request_skip_span
+
+logger = logging.getLogger(__name__)
+
+class TestUrlMatcher(unittest.TestCase):
+
+    def tearDown(self):
+        reload_url_matcher()
+
+    def test_prefix_match(self):
+        matcher = UrlMatcher(" http://localhost:8000 ,https://api.example.com/v1")
+        assert matcher.match("http://localhost:8000/chat") == PROPAGATE_AND_SPAN
+        assert matcher.match("https://api.example.com/v1/items?id=1") == PROPAGATE_AND_SPAN
+        assert matcher.match("https://api.example.com/v2/items") is None
+        assert matcher.match("https://evil.com/http://localhost:8000") is None
+
+    def test_host_wildcard_and_flags(self):
+        matcher = UrlMatcher(["https://*.internal.svc;propagate", "https://*.example.com/api;span"])
+        assert matcher.match("https://orders.internal.svc/create") == PROPAGATE_ONLY
+        assert matcher.match("https://a.b.example.com/api/run") == PROPAGATE_AND_SPAN
+        # the wildcard doesn't cross path segments
+        assert matcher.match("https://example.org/x.example.com/api") is None
+
+    def test_empty_config_matches_nothing(self):
+        assert UrlMatcher("").match("http://localhost:8000") is None
+
+    def test_reload(self):
+        reload_url_matcher("http://localhost:9000")
+        assert get_url_matcher().match("http://localhost:9000/a") == PROPAGATE_AND_SPAN
+        reload_url_matcher("")
+        assert get_url_matcher().match("http://localhost:9000/a") is None
+
+    def test_requests_propagate_only(self):
+        reload_url_matcher("http://localhost:9000;propagate,http://localhost:9001")
+        tracer = TracerProvider().get_tracer("url_matcher_test")
+        with tracer.start_as_current_span("parent"):
+            kwargs = {"method": "GET", "url": "http://localhost:9000/a"}
+            assert request_skip_span(kwargs) is True
+            # the skip check has no side effect, the headers are injected by pre_tracing
+            assert "headers" not in kwargs
+            RequestSpanHandler().pre_tracing(None, None, None, (), kwargs)
+            assert "traceparent" in kwargs["headers"]
+
+            kwargs = {"method": "GET", "url": "http://localhost:9001/a"}
+            assert request_skip_span(kwargs) is False
+            RequestSpanHandler().pre_tracing(None, None, None, (), kwargs)
+            # injected with the span by pre_task_processing
+            assert "headers" not in kwargs
+
+            kwargs = {"method": "GET", "url": "http://localhost:9002/a"}
+            assert request_skip_span(kwargs) is True
+            RequestSpanHandler().pre_tracing(None, None, None, (), kwargs)
+            assert "headers" not in kwargs
+
+if __name__ == '__main__':
+    unittest.main()
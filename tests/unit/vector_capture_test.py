@@ -0,0 +1,52 @@
+import base64
+import json
+import logging
+import math
+import struct
+import unittest
+from types import SimpleNamespace
+
+from monocle_apptrace.instrumentation.common import utils
+from monocle_apptrace.instrumentation.common.constants import VECTOR_CAPTURE_FLOAT16, VECTOR_CAPTURE_SUMMARY
+from monocle_apptrace.instrumentation.common.utils import format_vector
+from monocle_apptrace.instrumentation.metamodel.openai import _helper as openai_helper
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING = [((i % 7) - 3) / 10 for i in range(3072)]
+
+class TestVectorCapture(unittest.TestCase):
+
+    def tearDown(self):
+        utils.vector_capture_mode = VECTOR_CAPTURE_SUMMARY
+
+    def test_summary_is_compact(self):
+        summary = json.loads(format_vector(EMBEDDING))
+        assert summary["dimension"] == 3072
+        assert summary["dtype"] == "float"
+        assert math.isclose(summary["norm"], math.sqrt(sum(v * v for v in EMBEDDING)), rel_tol=1e-6)
+        assert summary["prefix"] == EMBEDDING[:8]
+        assert "array" not in summary
+
+    def test_float16_array(self):
+        utils.vector_capture_mode = VECTOR_CAPTURE_FLOAT16
+        summary = json.loads(format_vector(EMBEDDING))
+        assert summary["dtype"] == "float16"
+        values = struct.unpack("<3072e", base64.b64decode(summary["array"]))
+        assert all(math.isclose(a, b, abs_tol=1e-3) for a, b in zip(values, EMBEDDING))
+
+    def test_float16_overflow_falls_back_to_summary(self):
+        utils.vector_capture_mode = VECTOR_CAPTURE_FLOAT16
+        summary = json.loads(format_vector([1e6, 0.5]))
+        assert "array" not in summary
+        assert summary["dimension"] == 2
+
+    def test_openai_embeddings_output_is_not_formatted(self):
+        response = SimpleNamespace(data=[SimpleNamespace(index=0, embedding=EMBEDDING)])
+        output = openai_helper.update_output_span_events(response)
+        assert '"dimension": 3072' in output
+        assert len(output) < 300
+        assert json.loads(openai_helper.extract_vector_output(response))["dimension"] == 3072
+
+if __name__ == '__main__':
+    unittest.main()
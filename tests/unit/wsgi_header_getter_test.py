@@ -0,0 +1,52 @@
+import unittest
+
+from opentelemetry import trace
+from opentelemetry.baggage import get_baggage
+from opentelemetry.context import attach, detach
+
+from monocle_apptrace.instrumentation.common.utils import get_current_monocle_span, http_scopes
+from monocle_apptrace.instrumentation.metamodel.flask._helper import WSGIEnvironGetter, flask_pre_tracing
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+TRACEPARENT = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+class TestWSGIHeaderGetter(unittest.TestCase):
+
+    def setUp(self):
+        http_scopes["x-tenant-id"] = "tenant"
+
+    def tearDown(self):
+        http_scopes.pop("x-tenant-id", None)
+
+    def test_environ_keys_precomputed(self):
+        getter = WSGIEnvironGetter()
+        assert getter.environ_keys["traceparent"] == "HTTP_TRACEPARENT"
+        assert getter.environ_keys["x-tenant-id"] == "HTTP_X_TENANT_ID"
+
+    def test_get_reads_environ(self):
+        getter = WSGIEnvironGetter()
+        environ = {"HTTP_X_REQUEST_ID": "abc", "PATH_INFO": "/"}
+        assert getter.get(environ, "x-request-id") == ["abc"]
+        assert getter.get(environ, "traceparent") is None
+        assert getter.keys(environ) == ["x-request-id"]
+
+    def test_pre_tracing_extracts_context_and_scopes(self):
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": "/",
+            "HTTP_TRACEPARENT": TRACEPARENT,
+            "HTTP_X_TENANT_ID": "acme",
+        }
+        token = flask_pre_tracing([environ])
+        try:
+            span_context = trace.get_current_span().get_span_context()
+            assert format(span_context.trace_id, "032x") == TRACE_ID
+            assert get_baggage("monocle.scope.tenant") == "x-tenant-id: acme"
+            # only the ASGI middleware parents the monocle spans to the remote span
+            monocle_span = get_current_monocle_span()
+            assert monocle_span is None or format(monocle_span.get_span_context().trace_id, "032x") != TRACE_ID
+        finally:
+            detach(token)
+
+if __name__ == '__main__':
+    unittest.main()